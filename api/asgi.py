@@ -0,0 +1,360 @@
+"""Front-end ASGI (asynchrone) de l'API de vote.
+
+Mêmes routes que main.py, sur le même stockage des votes (VOTES_STORAGE),
+sans dépendance autre que la bibliothèque standard. Les accès au stockage
+et l'agrégation sont confiés à un pool de threads : la boucle d'événements
+n'est jamais bloquée, et chaque client SSE ne coûte qu'une coroutine.
+
+Usage (depuis le dossier api) :
+    uvicorn asgi:app
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from urllib.parse import parse_qs
+
+from core import (DEFAULT_SESSION, METRICS_CONTENT_TYPE, Metrics, PayloadCache, ResultsBroadcaster, Session,
+                  SessionRegistry, StaticAssets, VotingService, create_storage, encode_json, load_catalog, parse_budget,
+                  parse_weights)
+
+# Participants autorisés et modules, lus depuis data/participants.json et data/modules.json
+catalog = load_catalog()
+
+# Stockage des votes : 'journal' (par défaut, partagé avec main.py), 'sqlite', 'table' ou 'memory'
+VOTES_STORAGE = os.environ.get('VOTES_STORAGE', 'journal')
+if VOTES_STORAGE == 'sql':
+    raise RuntimeError("Le stockage 'sql' nécessite l'application Flask (main.py)")
+
+# Threads des accès au stockage et de l'agrégation
+executor = ThreadPoolExecutor(max_workers=int(os.environ.get('ASGI_THREADS', '8')))
+
+# Taille maximale (octets) d'un corps de requête
+MAX_BODY_SIZE = 1024 * 1024
+
+# Intervalle (secondes) de prise en compte des votes écrits par d'autres processus
+WATCH_INTERVAL = 1.0
+
+# Métriques des requêtes et du chemin critique, exposées sur /api/metrics
+# (METRICS_ENABLED=0 pour les désactiver)
+metrics = Metrics.from_environ()
+
+voting = VotingService(catalog, create_storage(VOTES_STORAGE), metrics)
+
+# Réponses sérialisées des résultats, par version des votes
+results_cache = PayloadCache(metrics)
+
+def compute_results():
+    """Retourne les résultats du tableau de bord"""
+    aggregate = voting.aggregate()
+    with metrics.stage('aggregate'):
+        return aggregate.results(catalog.modules)
+
+def results_body():
+    """Corps JSON des résultats courants, partagé via le cache"""
+    return results_cache.get('results', voting.version(), compute_results)[0]
+
+# Sessions de sondage (data/sessions/<id>/) ; la session 'default' est celle de data/
+sessions = SessionRegistry(
+    VOTES_STORAGE, Session(DEFAULT_SESSION, catalog, voting, results_cache), metrics=metrics)
+
+# Diffusion des résultats en direct (SSE)
+results_broadcaster = ResultsBroadcaster(results_body)
+voting.subscribe(results_broadcaster)
+
+# Fichiers statiques chargés et compressés une seule fois au démarrage
+static_assets = StaticAssets(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+
+CORS_HEADERS = [(b'access-control-allow-origin', b'*')]
+
+_watcher = None
+
+async def run(function, *args):
+    """Exécute un appel bloquant dans le pool de threads"""
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(function, *args))
+
+async def watch_votes():
+    """Intègre périodiquement les votes des autres processus : les deltas partent vers les clients SSE"""
+    while True:
+        await asyncio.sleep(WATCH_INTERVAL)
+        try:
+            await run(voting.version)
+        except Exception:
+            pass
+
+async def read_body(receive):
+    """Lit le corps de la requête ; retourne None s'il dépasse MAX_BODY_SIZE"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return b''
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+async def respond(send, status, body=b'', headers=None, content_type='application/json'):
+    raw_headers = [(b'content-type', content_type.encode('latin-1'))] if content_type else []
+    raw_headers += [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in (headers or {}).items()]
+    raw_headers += CORS_HEADERS
+    await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def respond_json(send, payload, status=200):
+    await respond(send, status, encode_json(payload))
+
+async def health(request):
+    """Point de santé de l'API"""
+    return 200, {"status": "healthy", "timestamp": datetime.now().isoformat()}
+
+async def get_sessions(request):
+    """Retourne la liste des sessions de sondage"""
+    def summaries():
+        return [sessions.get(session_id).summary() for session_id in sessions.ids()]
+    return 200, await run(summaries)
+
+async def get_participant_votes(request, participant):
+    """Retourne les votes d'un participant spécifique"""
+    session = request['session']
+    if not session.catalog.is_participant(participant):
+        return 400, {"error": "Participant non autorisé"}
+    return 200, await run(session.voting.participant_votes, participant) or {}
+
+async def submit_votes(request):
+    """Soumet les votes d'un participant"""
+    try:
+        data = json.loads(request['body'])
+    except ValueError:
+        return 400, {"error": "JSON invalide"}
+    if not isinstance(data, dict):
+        return 400, {"error": "JSON invalide"}
+    participant = data.get('participant')
+    votes = data.get('votes', {})
+
+    session = request['session']
+    error = session.voting.validate(participant, votes)
+    if error:
+        return 400, {"error": error}
+
+    await run(session.voting.submit, participant, votes)
+    return 200, {"message": "Votes enregistrés avec succès", "count": len(votes)}
+
+async def reset_participant_votes(request, participant):
+    """Réinitialise les votes d'un participant"""
+    session = request['session']
+    if not session.catalog.is_participant(participant):
+        return 400, {"error": "Participant non autorisé"}
+    if not await run(session.voting.reset, participant):
+        return 200, {"message": "Aucun vote à réinitialiser"}
+    return 200, {"message": "Votes réinitialisés avec succès"}
+
+async def get_results(scope, send, session):
+    """Retourne les résultats du sondage (agrégation dans le pool de threads)"""
+    if_none_match = dict(scope['headers']).get(b'if-none-match', b'').decode('latin-1')
+    status, body, headers = await run(session.results, if_none_match)
+    await respond(send, status, body, headers)
+
+async def get_results_timeline(scope, send, session):
+    """Chronologie des votes par intervalle (?bucket=1m|1h|1d, 1h par défaut)"""
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    if_none_match = dict(scope['headers']).get(b'if-none-match', b'').decode('latin-1')
+    try:
+        status, body, headers = await run(session.timeline, query.get('bucket', ['1h'])[0], if_none_match)
+    except ValueError as e:
+        await respond_json(send, {"error": str(e)}, 400)
+        return
+    await respond(send, status, body, headers)
+
+async def get_plan(scope, send, session):
+    """Plan de formation optimal (?budget_hours=N[&weights=3,2,1])"""
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    if_none_match = dict(scope['headers']).get(b'if-none-match', b'').decode('latin-1')
+    try:
+        budget_hours = parse_budget(query.get('budget_hours', [None])[0])
+        weights = parse_weights(query.get('weights', [''])[0])
+    except ValueError as e:
+        await respond_json(send, {"error": str(e)}, 400)
+        return
+    status, body, headers = await run(session.plan, budget_hours, weights, if_none_match)
+    await respond(send, status, body, headers)
+
+async def get_rollup_results(scope, send):
+    """Résultats consolidés des sessions (?sessions=a,b ; toutes par défaut)"""
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    session_ids = [session_id for value in query.get('sessions', []) for session_id in value.split(',') if session_id]
+    if_none_match = dict(scope['headers']).get(b'if-none-match', b'').decode('latin-1')
+    try:
+        status, body, headers = await run(sessions.rollup, session_ids, if_none_match)
+    except KeyError:
+        await respond_json(send, {"error": "Session inconnue"}, 404)
+        return
+    await respond(send, status, body, headers)
+
+async def stream_results(scope, receive, send):
+    """Flux SSE des résultats : agrégat complet à la connexion, puis deltas"""
+    global _watcher
+    if _watcher is None or _watcher.done():
+        _watcher = asyncio.ensure_future(watch_votes())
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ] + CORS_HEADERS})
+
+    async def pump():
+        async for chunk in results_broadcaster.astream(executor=executor):
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+    async def wait_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(wait_disconnect())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def serve_static(scope, send, path):
+    """Sert un fichier statique précompressé, avec ses en-têtes de cache"""
+    headers = dict(scope['headers'])
+    result = static_assets.response(
+        path,
+        headers.get(b'accept-encoding', b'').decode('latin-1'),
+        headers.get(b'if-none-match', b'').decode('latin-1'))
+    if result is None:
+        await respond_json(send, {"error": "Introuvable"}, 404)
+        return
+    status, body, response_headers = result
+    content_type = response_headers.pop('Content-Type')
+    await respond(send, status, body, response_headers, content_type)
+
+# Routes sans paramètre : (méthode, chemin) -> gestionnaire retournant (statut, données)
+ROUTES = {
+    ('GET', '/api/health'): health,
+    ('GET', '/api/sessions'): get_sessions,
+    ('POST', '/api/votes'): submit_votes,
+}
+
+# Routes disponibles aussi par session, sous /api/sessions/<id>/
+SESSION_PATHS = ('/api/participants', '/api/modules', '/api/votes', '/api/results', '/api/results/timeline', '/api/plan')
+
+def split_session(path):
+    """(session, chemin) : /api/sessions/<id>/votes devient (id, /api/votes)"""
+    if path.startswith('/api/sessions/'):
+        session_id, _, rest = path[len('/api/sessions/'):].partition('/')
+        return session_id, '/api/' + rest
+    return DEFAULT_SESSION, path
+
+# Routes /api/votes/<participant>
+PARTICIPANT_ROUTES = {
+    'GET': get_participant_votes,
+    'DELETE': reset_participant_votes,
+}
+
+def route_label(method, path):
+    """Gabarit de route des métriques (un participant ou un fichier ne crée pas de série)"""
+    if path.startswith('/api/sessions/'):
+        label = route_label(method, split_session(path)[1])
+        return '/api/sessions/<session_id>' + label[len('/api'):] if label.startswith('/api/') else label
+    if path.startswith('/api/votes/'):
+        return '/api/votes/<participant>'
+    if not path.startswith('/api/'):
+        return '/<path:path>'
+    if path in ('/api/participants', '/api/modules', '/api/results', '/api/results/rollup',
+                '/api/results/timeline', '/api/results/stream', '/api/plan', '/api/metrics') \
+            or (method, path) in ROUTES:
+        return path
+    return 'unmatched'
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    """Application ASGI"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    if not metrics.enabled:
+        await dispatch(scope, receive, send)
+        return
+
+    # Durée jusqu'au début de la réponse (comme main.py, y compris pour le flux SSE)
+    start = time.perf_counter()
+
+    async def send_timed(message):
+        if message['type'] == 'http.response.start':
+            metrics.observe_request(scope['method'], route_label(scope['method'], scope['path']),
+                                    message['status'], time.perf_counter() - start)
+        await send(message)
+
+    await dispatch(scope, receive, send_timed)
+
+async def dispatch(scope, receive, send):
+    """Route une requête HTTP vers son gestionnaire"""
+    method = scope['method']
+    session_id, path = split_session(scope['path'])
+    try:
+        session = sessions.get(session_id) if session_id == DEFAULT_SESSION else await run(sessions.get, session_id)
+        if path != scope['path'] and (session is None or not (path in SESSION_PATHS or path.startswith('/api/votes/'))):
+            await respond_json(send, {"error": "Session inconnue" if session is None else "Introuvable"}, 404)
+        elif method == 'OPTIONS':
+            await respond(send, 204, headers={
+                'Access-Control-Allow-Methods': 'GET, POST, DELETE, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type',
+            }, content_type=None)
+        elif method == 'GET' and path == '/api/participants':
+            await respond(send, 200, session.catalog.encoded('participants', lambda catalog: catalog.participants))
+        elif method == 'GET' and path == '/api/modules':
+            await respond(send, 200, session.catalog.encoded('modules', lambda catalog: catalog.modules))
+        elif method == 'GET' and path == '/api/results':
+            await get_results(scope, send, session)
+        elif method == 'GET' and path == '/api/results/timeline':
+            await get_results_timeline(scope, send, session)
+        elif method == 'GET' and path == '/api/plan':
+            await get_plan(scope, send, session)
+        elif method == 'GET' and path == '/api/results/rollup':
+            await get_rollup_results(scope, send)
+        elif method == 'GET' and path == '/api/metrics' and metrics.enabled:
+            await respond(send, 200, metrics.render(), content_type=METRICS_CONTENT_TYPE)
+        elif method == 'GET' and path == '/api/results/stream':
+            await stream_results(scope, receive, send)
+        elif (method, path) in ROUTES:
+            request = {'scope': scope, 'session': session, 'body': b''}
+            if method == 'POST':
+                request['body'] = await read_body(receive)
+                if request['body'] is None:
+                    await respond_json(send, {"error": "Requête trop volumineuse"}, 413)
+                    return
+            status, payload = await ROUTES[(method, path)](request)
+            await respond_json(send, payload, status)
+        elif path.startswith('/api/votes/') and method in PARTICIPANT_ROUTES:
+            participant = path[len('/api/votes/'):]
+            status, payload = await PARTICIPANT_ROUTES[method]({'scope': scope, 'session': session}, participant)
+            await respond_json(send, payload, status)
+        elif method == 'GET' and not path.startswith('/api/'):
+            await serve_static(scope, send, path.lstrip('/') or 'index.html')
+        else:
+            await respond_json(send, {"error": "Introuvable"}, 404)
+    except Exception as e:
+        metrics.observe_exception(e)
+        await respond_json(send, {"error": str(e)}, 500)
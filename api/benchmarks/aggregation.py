@@ -0,0 +1,127 @@
+"""Micro-benchmarks de l'agrégation des résultats sur des votes synthétiques.
+
+Chaque cas est chronométré sur --repeat itérations (p50/p95/p99, débit),
+puis exécuté une fois sous tracemalloc pour mesurer son pic de mémoire.
+Les cas couvrent les formats servis par main.py / function_app.py
+(results), routes/modules.py (module_results, chart_data) et les
+chemins de mise à jour (delta d'un bulletin, reconstruction complète).
+
+Usage (depuis le dossier api) :
+    python benchmarks/aggregation.py [--participants 10000] [--modules 500]
+        [--votes-per-ballot 10] [--repeat 50] [--seed 42] [--output aggregation.json]
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+from report import API_DIR, environment, latency_summary, peak_rss_mb, write_report
+
+sys.path.insert(0, API_DIR)
+
+from core import Catalog, MemoryVoteStorage, VoteAggregate, VotingService, encode_json  # noqa: E402
+
+
+def synthetic_catalog(module_count):
+    return [
+        {
+            'id': f'm{index // 10 + 1}_{index % 10 + 1}',
+            'title': f'Module de formation {index + 1}',
+            'description': '',
+            'duration': f'{index % 8 + 1} heures'
+        }
+        for index in range(module_count)
+    ]
+
+
+def synthetic_votes(participant_count, modules, votes_per_ballot, rng):
+    """{participant: {timestamp, votes}} avec votes_per_ballot modules distincts par bulletin"""
+    module_ids = [module['id'] for module in modules]
+    per_ballot = min(votes_per_ballot, len(module_ids))
+    return {
+        f'participant-{index}': {
+            'timestamp': f'2025-06-11T09:{index // 60 % 60:02d}:{index % 60:02d}',
+            'votes': {module_id: rng.randint(1, 3) for module_id in rng.sample(module_ids, per_ballot)}
+        }
+        for index in range(participant_count)
+    }
+
+
+def measure(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    summary = latency_summary(durations)
+    summary['ops_per_s'] = len(durations) / sum(durations)
+    summary['peak_alloc_kb'] = peak / 1024
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--participants', type=int, default=10000)
+    parser.add_argument('--modules', type=int, default=500)
+    parser.add_argument('--votes-per-ballot', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='fichier JSON de résultats (sortie standard par défaut)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    modules = synthetic_catalog(args.modules)
+    votes = synthetic_votes(args.participants, modules, args.votes_per_ballot, rng)
+    participants = list(votes)
+    aggregate = VoteAggregate.from_votes(votes)
+
+    def apply_change():
+        participant = rng.choice(participants)
+        current = {'timestamp': '', 'votes': dict(
+            (module['id'], rng.randint(1, 3)) for module in rng.sample(modules, args.votes_per_ballot))}
+        aggregate.apply_change(participant, votes[participant], current)
+        votes[participant] = current
+
+    # Front-end sans agrégat incrémental (function_app) : reconstruction à chaque nouvelle version
+    storage = MemoryVoteStorage()
+    storage.put_many(votes)
+    voting = VotingService(Catalog(participants, modules), storage)
+
+    def rebuild_after_write():
+        participant = rng.choice(participants)
+        storage.put(participant, votes[participant])
+        return voting.aggregate().results(modules)
+
+    cases = {
+        'from_votes': lambda: VoteAggregate.from_votes(votes),
+        'apply_change': apply_change,
+        'results (main.py, function_app.py)': lambda: aggregate.results(modules),
+        'module_results (routes/modules.py)': lambda: aggregate.module_results(modules),
+        'chart_data (routes/modules.py)': lambda: aggregate.chart_data(modules),
+        'results + encode_json': lambda: encode_json(aggregate.results(modules)),
+        'rebuild_after_write (function_app.py)': rebuild_after_write,
+    }
+
+    report = {
+        'benchmark': 'aggregation',
+        **environment(),
+        'dataset': {
+            'participants': args.participants,
+            'modules': args.modules,
+            'votes_per_ballot': args.votes_per_ballot,
+            'seed': args.seed,
+        },
+        'repeat': args.repeat,
+        'cases': {name: measure(function, args.repeat) for name, function in cases.items()},
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Mesure du démarrage à froid de function_app.py.
+
+Chaque essai lance un interpréteur neuf qui importe function_app puis
+appelle une première fois les fonctions HTTP. Sont mesurés : le temps
+d'import, le temps jusqu'à la première réponse de chaque route, et les
+modules les plus coûteux à importer (-X importtime).
+
+Usage (depuis le dossier api) :
+    python benchmarks/cold_start.py [--runs 10] [--output cold_start.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from report import API_DIR, environment, write_report
+
+# Script exécuté dans chaque interpréteur neuf
+PROBE = r'''
+import json, sys, time
+start = time.perf_counter()
+import function_app
+import azure.functions as func
+imported = time.perf_counter()
+
+def call(name, method='GET', body=None, route_params=None):
+    function = getattr(function_app, name).build().get_user_function()
+    request = func.HttpRequest(
+        method=method, url='/api/' + name, headers={}, route_params=route_params or {},
+        body=json.dumps(body).encode('utf-8') if body is not None else b'')
+    begin = time.perf_counter()
+    response = function(request)
+    assert response.status_code < 500, response.get_body()
+    return time.perf_counter() - begin
+
+timings = {
+    'get_modules': call('get_modules'),
+    'get_participants': call('get_participants'),
+    'get_results': call('get_results'),
+    'submit_votes': call('submit_votes', 'POST', {'participant': function_app.PARTICIPANTS[0], 'votes': {function_app.MODULES[0]['id']: 1}}),
+    'get_results_after_vote': call('get_results'),
+}
+json.dump({
+    'import_s': imported - start,
+    'first_response_s': imported - start + timings['get_modules'],
+    'handlers_s': timings,
+}, sys.stdout)
+'''
+
+
+def run_probe(env):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=API_DIR, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def import_profile(env, top=10):
+    """Modules les plus coûteux (temps cumulé, en secondes)"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import function_app'],
+        cwd=API_DIR, env=env, capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        modules.append((int(cumulative) / 1e6, name))
+    return [{'module': name, 'cumulative_s': seconds} for seconds, name in sorted(modules, reverse=True)[:top]]
+
+
+def summarize(values):
+    return {
+        'median': statistics.median(values),
+        'min': min(values),
+        'max': max(values),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--output', help='fichier JSON de résultats (sortie standard par défaut)')
+    args = parser.parse_args()
+
+    # Stockage en mémoire : on mesure le code, pas le réseau
+    env = dict(os.environ, VOTES_STORAGE=os.environ.get('VOTES_STORAGE', 'memory'))
+    runs = [run_probe(env) for _ in range(args.runs)]
+    report = {
+        'benchmark': 'cold_start',
+        **environment(),
+        'runs': args.runs,
+        'import_s': summarize([run['import_s'] for run in runs]),
+        'first_response_s': summarize([run['first_response_s'] for run in runs]),
+        'handlers_s': {
+            name: summarize([run['handlers_s'][name] for run in runs])
+            for name in runs[0]['handlers_s']
+        },
+        'slowest_imports': import_profile(env),
+    }
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
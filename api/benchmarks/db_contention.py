@@ -0,0 +1,129 @@
+"""Contention en écriture sur la base SQLite des utilisateurs, par profil moteur.
+
+Pour chaque profil de models/engine.py, --workers processus (chacun avec
+--threads threads) exécutent --operations transactions « lecture puis
+écriture » (comptage puis insertion d'un utilisateur) sur une base neuve.
+Sont rapportés : débit, p50/p95/p99 des transactions réussies et nombre
+d'échecs (« database is locked »).
+
+Usage (depuis le dossier api) :
+    python benchmarks/db_contention.py [--profiles baseline,development,production]
+        [--workers 4] [--threads 2] [--operations 200] [--output db_contention.json]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from report import API_DIR, environment, latency_summary, write_report
+
+sys.path.insert(0, API_DIR)
+
+
+def create_app(uri, profile):
+    from flask import Flask
+
+    from models.engine import init_db
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    settings = init_db(app, {**os.environ, 'DATABASE_PROFILE': profile})
+    return app, settings
+
+
+def run_worker(uri, profile, worker, threads, operations):
+    """Exécute les transactions d'un processus ; retourne (durées, erreurs)"""
+    from sqlalchemy.exc import OperationalError
+
+    from models.user import User, db
+
+    app, _ = create_app(uri, profile)
+    durations = []
+    errors = Counter()
+    lock = threading.Lock()
+
+    def run_thread(thread):
+        local_durations = []
+        local_errors = Counter()
+        with app.app_context():
+            for operation in range(operations):
+                name = f'user-{worker}-{thread}-{operation}'
+                start = time.perf_counter()
+                try:
+                    db.session.scalar(db.select(db.func.count(User.id)))
+                    db.session.add(User(username=name, email=f'{name}@example.com'))
+                    db.session.commit()
+                except OperationalError as e:
+                    db.session.rollback()
+                    local_errors[str(e.orig)] += 1
+                    continue
+                local_durations.append(time.perf_counter() - start)
+        with lock:
+            durations.extend(local_durations)
+            errors.update(local_errors)
+
+    pool = [threading.Thread(target=run_thread, args=(thread,)) for thread in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return durations, dict(errors)
+
+
+def run_profile(profile, workers, threads, operations):
+    with tempfile.TemporaryDirectory() as directory:
+        uri = 'sqlite:///' + os.path.join(directory, 'app.db')
+        app, settings = create_app(uri, profile)
+        from models.user import db
+        with app.app_context():
+            db.create_all()
+            db.engine.dispose()
+
+        context = multiprocessing.get_context('spawn')
+        start = time.perf_counter()
+        with context.Pool(workers) as pool:
+            results = pool.starmap(run_worker, [(uri, profile, worker, threads, operations) for worker in range(workers)])
+        elapsed = time.perf_counter() - start
+
+    durations = [duration for worker_durations, _ in results for duration in worker_durations]
+    errors = Counter()
+    for _, worker_errors in results:
+        errors.update(worker_errors)
+    summary = latency_summary(durations) if durations else {'count': 0}
+    summary['attempted'] = workers * threads * operations
+    summary['failed'] = sum(errors.values())
+    summary['throughput_tps'] = len(durations) / elapsed
+    summary['elapsed_s'] = elapsed
+    summary['errors'] = dict(errors)
+    summary['settings'] = settings
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default='baseline,development,production')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--operations', type=int, default=200)
+    parser.add_argument('--output', help='fichier JSON de résultats (sortie standard par défaut)')
+    args = parser.parse_args()
+
+    write_report({
+        'benchmark': 'db_contention',
+        **environment(),
+        'workers': args.workers,
+        'threads': args.threads,
+        'operations': args.operations,
+        'profiles': {
+            profile: run_profile(profile, args.workers, args.threads, args.operations)
+            for profile in args.profiles.split(',')
+        },
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
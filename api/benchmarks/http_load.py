@@ -0,0 +1,229 @@
+"""Générateur de charge HTTP pour l'API de vote de main.py.
+
+Trois cibles :
+  flask  : client de test Flask, dans le processus (coût de l'application seule) ;
+  server : main.py servi par un serveur WSGI local multi-thread, via HTTP ;
+  url    : un serveur déjà lancé (--url http://127.0.0.1:8000, ex. uvicorn asgi:app).
+
+Le stockage est pré-rempli de --participants bulletins synthétiques (cibles
+flask et server, stockage en mémoire). Chaque scénario envoie --requests
+requêtes depuis --concurrency threads ; sont rapportés p50/p95/p99, débit,
+codes de statut et pic de mémoire du processus.
+
+Usage (depuis le dossier api) :
+    python benchmarks/http_load.py [--target flask|server|url] [--url URL]
+        [--participants 10000] [--requests 2000] [--concurrency 8] [--output http_load.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+from report import API_DIR, environment, latency_summary, peak_rss_mb, write_report
+
+sys.path.insert(0, API_DIR)
+
+# Scénarios : nom -> proportions des requêtes
+SCENARIOS = {
+    'results': {'results': 1.0},
+    'results_304': {'results_304': 1.0},
+    'submit': {'submit': 1.0},
+    'mixed': {'results': 0.8, 'modules': 0.1, 'submit': 0.1},
+}
+
+
+class FlaskClient:
+    """Client de test Flask : un client par thread"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, data=body, headers=headers or {},
+                                    content_type='application/json' if body else None)
+        return response.status_code, response.headers.get('ETag')
+
+
+class HttpClient:
+    """Client HTTP/1.1 avec connexion persistante (reconnexion si le serveur la ferme)"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.connection = None
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if body:
+            headers['Content-Type'] = 'application/json'
+        for attempt in (1, 2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                if response.getheader('Connection', '').lower() == 'close' or response.version == 10:
+                    self.connection.close()
+                    self.connection = None
+                return response.status, response.getheader('ETag')
+            except (http.client.HTTPException, ConnectionError):
+                self.connection.close()
+                self.connection = None
+                if attempt == 2:
+                    raise
+
+
+def fetch_json(url):
+    with urlopen(url, timeout=30) as response:
+        return json.load(response)
+
+
+def seed_votes(main, participant_count, rng):
+    module_ids = [module['id'] for module in main.MODULES]
+    main.voting.storage.put_many({
+        f'participant-{index}': {
+            'timestamp': '2025-06-11T09:00:00',
+            'votes': {module_id: rng.randint(1, 3) for module_id in rng.sample(module_ids, min(5, len(module_ids)))}
+        }
+        for index in range(participant_count)
+    })
+
+
+def run_scenario(make_client, mix, requests, concurrency, participants, module_ids, seed):
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    durations = []
+    statuses = Counter()
+    errors = Counter()
+    lock = threading.Lock()
+    per_thread = [requests // concurrency + (1 if index < requests % concurrency else 0) for index in range(concurrency)]
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        client = make_client()
+        etag = client.request('GET', '/api/results')[1]
+        local_durations = []
+        local_statuses = Counter()
+        local_errors = Counter()
+        for kind in rng.choices(kinds, weights, k=per_thread[index]):
+            if kind == 'results':
+                args = ('GET', '/api/results')
+            elif kind == 'results_304':
+                args = ('GET', '/api/results', None, {'If-None-Match': etag or ''})
+            elif kind == 'modules':
+                args = ('GET', '/api/modules')
+            else:
+                body = json.dumps({
+                    'participant': rng.choice(participants),
+                    'votes': {module_id: rng.randint(1, 3) for module_id in rng.sample(module_ids, 3)}
+                })
+                args = ('POST', '/api/votes', body)
+            start = time.perf_counter()
+            try:
+                status = client.request(*args)[0]
+            except Exception as e:
+                local_errors[type(e).__name__] += 1
+                continue
+            local_durations.append(time.perf_counter() - start)
+            local_statuses[status] += 1
+        with lock:
+            durations.extend(local_durations)
+            statuses.update(local_statuses)
+            errors.update(local_errors)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    summary = latency_summary(durations) if durations else {'count': 0}
+    summary['throughput_rps'] = len(durations) / elapsed
+    summary['elapsed_s'] = elapsed
+    summary['statuses'] = {str(status): count for status, count in sorted(statuses.items())}
+    summary['errors'] = dict(errors)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=('flask', 'server', 'url'), default='flask')
+    parser.add_argument('--url', help='URL de base du serveur (cible url)')
+    parser.add_argument('--participants', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help='scénario à exécuter (plusieurs possibles, tous par défaut)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='fichier JSON de résultats (sortie standard par défaut)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    server = None
+    if args.target == 'url':
+        if not args.url:
+            parser.error('--url est requis avec --target url')
+        base_url = args.url
+        participant_names = fetch_json(base_url + '/api/participants')
+        module_ids = [module['id'] for module in fetch_json(base_url + '/api/modules')]
+        make_client = lambda: HttpClient(base_url)
+    else:
+        # Stockage en mémoire : on mesure l'application, pas le disque
+        os.environ['VOTES_STORAGE'] = 'memory'
+        os.chdir(API_DIR)
+        import main as app_module
+
+        seed_votes(app_module, args.participants, rng)
+        participant_names = app_module.PARTICIPANTS
+        module_ids = [module['id'] for module in app_module.MODULES]
+        if args.target == 'flask':
+            make_client = lambda: FlaskClient(app_module.app)
+        else:
+            from werkzeug.serving import WSGIRequestHandler, make_server
+
+            class QuietHandler(WSGIRequestHandler):
+                protocol_version = 'HTTP/1.1'
+
+                def log_request(self, *args):
+                    pass
+
+            server = make_server('127.0.0.1', 0, app_module.app, threaded=True, request_handler=QuietHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f'http://127.0.0.1:{server.server_port}'
+            make_client = lambda: HttpClient(base_url)
+
+    try:
+        scenarios = {
+            name: run_scenario(make_client, SCENARIOS[name], args.requests, args.concurrency,
+                               participant_names, module_ids, args.seed)
+            for name in (args.scenario or SCENARIOS)
+        }
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    write_report({
+        'benchmark': 'http_load',
+        **environment(),
+        'target': args.target,
+        'url': args.url,
+        'participants': args.participants if args.target != 'url' else None,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'scenarios': scenarios,
+        'peak_rss_mb': peak_rss_mb(),
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Vérification du journal des votes sous écritures concurrentes multi-processus.
+
+--writers processus (chacun avec --threads threads) écrivent chacun
+--ballots bulletins distincts dans un même journal, avec un seuil de
+compaction bas pour forcer de nombreuses bascules. Pendant ce temps,
+--readers processus rechargent (load) et synchronisent (sync) l'état en
+boucle. Enfin, une lecture est chronométrée pendant qu'un autre processus
+tient le verrou d'écriture.
+
+Contrôles (code de sortie 1 si l'un échoue) :
+  - aucun lecteur ne voit le nombre de bulletins diminuer (rechargement
+    pendant une compaction) ;
+  - le rejeu de l'instantané et du journal retrouve tous les bulletins ;
+  - aucun .compacting ne reste après la dernière compaction ;
+  - un .compacting laissé par un processus arrêté est repris par compact() ;
+  - sync() ne bloque pas derrière le verrou de fichier d'un autre processus.
+
+Usage (depuis le dossier api) :
+    python benchmarks/journal_concurrency.py [--writers 4] [--threads 8] [--ballots 250]
+        [--readers 2] [--compact-threshold 65536] [--output journal_concurrency.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from report import API_DIR, environment, latency_summary, write_report
+
+sys.path.insert(0, API_DIR)
+
+# Durée (secondes) pendant laquelle un autre processus tient le verrou d'écriture
+LOCK_HOLD = 1.0
+
+# Au-delà (secondes), sync() est considérée comme bloquée par ce verrou
+BLOCKED_THRESHOLD = 0.1
+
+
+def open_journal(path, compact_threshold):
+    from core.journal import BallotJournal
+
+    journal = BallotJournal(path, compact_threshold)
+    journal.load()
+    return journal
+
+
+def run_writer(path, compact_threshold, worker, threads, ballots):
+    """Écrit ballots bulletins par thread ; retourne les durées des écritures"""
+    journal = open_journal(path, compact_threshold)
+    durations = []
+    lock = threading.Lock()
+
+    def run_thread(thread):
+        local_durations = []
+        for ballot in range(ballots):
+            start = time.perf_counter()
+            journal.put(f'w{worker}-t{thread}-b{ballot}', {'timestamp': '2025-01-01T00:00:00', 'votes': {'m1_1': 1}})
+            local_durations.append(time.perf_counter() - start)
+        with lock:
+            durations.extend(local_durations)
+
+    pool = [threading.Thread(target=run_thread, args=(thread,)) for thread in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    journal.compact(wait=True)
+    return durations
+
+
+def run_reader(path, compact_threshold, stop, regressions, reloads):
+    """Recharge et synchronise l'état en boucle ; compte les reculs du nombre de bulletins"""
+    journal = open_journal(path, compact_threshold)
+    seen = 0
+    while not stop.is_set():
+        for count in (len(journal.load()), len(journal.sync())):
+            if count < seen:
+                with regressions.get_lock():
+                    regressions.value += 1
+            seen = max(seen, count)
+        with reloads.get_lock():
+            reloads.value += 1
+
+
+def hold_lock(path, ready, release):
+    """Tient le verrou d'écriture du journal comme le ferait un processus en cours d'écriture"""
+    import fcntl
+
+    with open(os.path.splitext(path)[0] + '.journal.lock', 'a+b') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        ready.set()
+        release.wait()
+
+
+def check_concurrency(directory, args):
+    path = os.path.join(directory, 'votes.json')
+    context = multiprocessing.get_context('spawn')
+    stop = context.Event()
+    regressions = context.Value('i', 0)
+    reloads = context.Value('i', 0)
+    readers = [
+        context.Process(target=run_reader, args=(path, args.compact_threshold, stop, regressions, reloads))
+        for _ in range(args.readers)
+    ]
+    for reader in readers:
+        reader.start()
+    start = time.perf_counter()
+    with context.Pool(args.writers) as pool:
+        results = pool.starmap(run_writer, [
+            (path, args.compact_threshold, worker, args.threads, args.ballots) for worker in range(args.writers)
+        ])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    expected = args.writers * args.threads * args.ballots
+    replayed = len(open_journal(path, args.compact_threshold).state)
+    durations = [duration for worker_durations in results for duration in worker_durations]
+    return {
+        'expected_ballots': expected,
+        'replayed_ballots': replayed,
+        'reader_regressions': regressions.value,
+        'reader_reloads': reloads.value,
+        'leftover_compacting': os.path.exists(os.path.splitext(path)[0] + '.journal.compacting'),
+        'throughput_writes_s': expected / elapsed,
+        'writes': latency_summary(durations),
+        'ok': replayed == expected and regressions.value == 0
+        and not os.path.exists(os.path.splitext(path)[0] + '.journal.compacting'),
+    }
+
+
+def check_stale_compacting(directory):
+    """Un .compacting sans compaction en cours (processus arrêté) doit être intégré puis supprimé"""
+    path = os.path.join(directory, 'votes.json')
+    compacting_path = os.path.splitext(path)[0] + '.journal.compacting'
+    with open(compacting_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'op': 'put', 'participant': 'crashed', 'timestamp': '', 'votes': {'m1_1': 2}}) + '\n')
+    journal = open_journal(path, 1024)
+    journal.put('after', {'timestamp': '', 'votes': {'m1_1': 1}})
+    journal.compact(wait=True)
+    replayed = open_journal(path, 1024).state
+    recovered = 'crashed' in replayed and 'after' in replayed and not os.path.exists(compacting_path)
+    return {'recovered': recovered, 'ok': recovered}
+
+
+def check_read_while_locked(directory):
+    """sync() pendant qu'un autre processus tient le verrou d'écriture et qu'un thread local l'attend"""
+    if sys.platform == 'win32':
+        return {'skipped': 'flock indisponible', 'ok': True}
+    path = os.path.join(directory, 'votes.json')
+    journal = open_journal(path, 1024 * 1024)
+    context = multiprocessing.get_context('spawn')
+    ready = context.Event()
+    release = context.Event()
+    holder = context.Process(target=hold_lock, args=(path, ready, release))
+    holder.start()
+    ready.wait()
+    # Libération à heure fixe : avec un journal fautif, sync() attendrait ce verrou
+    threading.Timer(LOCK_HOLD, release.set).start()
+    writer = threading.Thread(target=journal.put, args=('blocked', {'timestamp': '', 'votes': {'m1_1': 3}}))
+    writer.start()
+    time.sleep(0.1)
+    start = time.perf_counter()
+    journal.sync()
+    blocked = time.perf_counter() - start
+    holder.join()
+    writer.join()
+    return {'sync_wait_ms': blocked * 1000, 'ok': blocked < BLOCKED_THRESHOLD}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--ballots', type=int, default=250)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--compact-threshold', type=int, default=64 * 1024)
+    parser.add_argument('--output', help='fichier JSON de résultats (sortie standard par défaut)')
+    args = parser.parse_args()
+
+    checks = {}
+    for name, check in (
+        ('concurrency', lambda directory: check_concurrency(directory, args)),
+        ('stale_compacting', check_stale_compacting),
+        ('read_while_locked', check_read_while_locked),
+    ):
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                checks[name] = check(directory)
+            except Exception as e:
+                checks[name] = {'error': f'{type(e).__name__}: {e}', 'ok': False}
+
+    write_report({
+        'benchmark': 'journal_concurrency',
+        **environment(),
+        'writers': args.writers,
+        'threads': args.threads,
+        'ballots': args.ballots,
+        'readers': args.readers,
+        'compact_threshold': args.compact_threshold,
+        'checks': checks,
+    }, args.output)
+    if not all(check['ok'] for check in checks.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""Précompression des fichiers statiques au build (variantes .gz et .br).
+
+Usage (depuis le dossier api) :
+    python compress_static.py [static]
+
+main.py sert ces variantes telles quelles au lieu de compresser au
+démarrage ; brotli (optionnel) est utilisé ici à la qualité maximale.
+"""
+import os
+import sys
+
+from core.assets import ENCODINGS, MIN_COMPRESS_SIZE, compress, is_compressible
+
+if __name__ == '__main__':
+    root = sys.argv[1] if len(sys.argv) > 1 else 'static'
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            if not is_compressible(path) or os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            for encoding, suffix in ENCODINGS:
+                body = compress(data, encoding, brotli_quality=11)
+                if body is None:
+                    print(f"{path} : {encoding} indisponible (module brotli non installé)")
+                    continue
+                with open(path + suffix, 'wb') as f:
+                    f.write(body)
+                print(f"{path}{suffix} : {len(data)} -> {len(body)} octets")
@@ -0,0 +1,62 @@
+from importlib import import_module
+
+# Les sous-modules sont importés au premier accès à l'un de leurs noms :
+# un front-end ne paie au démarrage que ce qu'il utilise (démarrage à froid).
+_EXPORTS = {
+    'PRIORITIES': 'aggregate',
+    'VoteAggregate': 'aggregate',
+    'StaticAssets': 'assets',
+    'PayloadCache': 'cache',
+    'encode_json': 'cache',
+    'etag_matches': 'cache',
+    'make_etag': 'cache',
+    'Catalog': 'catalog',
+    'CatalogCache': 'catalog',
+    'DATA_DIR': 'catalog',
+    'anonymous_participant': 'catalog',
+    'is_session_id': 'catalog',
+    'legacy_ballots': 'catalog',
+    'load_catalog': 'catalog',
+    'normalize_module_id': 'catalog',
+    'sessions_dir': 'catalog',
+    'ResultsBroadcaster': 'events',
+    'ballot_delta': 'events',
+    'format_event': 'events',
+    'BallotIngestor': 'ingest',
+    'MemoryVoteQueue': 'ingest',
+    'StorageVoteQueue': 'ingest',
+    'create_queue': 'ingest',
+    'BallotJournal': 'journal',
+    'VoteJournal': 'journal',
+    'JournalVoteStorage': 'journal',
+    'METRICS_CONTENT_TYPE': 'metrics',
+    'Metrics': 'metrics',
+    'TrainingPlanner': 'plan',
+    'parse_budget': 'plan',
+    'parse_weights': 'plan',
+    'VotingService': 'service',
+    'create_storage': 'service',
+    'DEFAULT_SESSION': 'sessions',
+    'Session': 'sessions',
+    'SessionRegistry': 'sessions',
+    'VoteStorage': 'storage',
+    'CachedVoteStorage': 'storage',
+    'MemoryVoteStorage': 'storage',
+    'SqliteVoteStorage': 'storage',
+    'TableVoteStorage': 'storage',
+    'VoteTimeline': 'timeline',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
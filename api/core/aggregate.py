@@ -0,0 +1,355 @@
+from array import array
+from threading import Lock
+
+from .catalog import legacy_ballots
+
+# Niveaux de priorité acceptés pour un vote
+PRIORITIES = (1, 2, 3)
+
+# Cases de compteurs par module, indexées directement par la priorité (la case 0 est inutilisée)
+SLOTS = 4
+
+PIE_SLICES = [
+    (1, 'Priorité 1 (Important)', '#dc2626'),
+    (2, 'Priorité 2 (Moyen)', '#2563eb'),
+    (3, 'Priorité 3 (Découverte)', '#16a34a'),
+]
+
+CHART_DATASETS = [
+    (1, 'Priorité 1 (Important)', 'rgba(220, 38, 127, 0.8)', 'rgba(220, 38, 127, 1)'),
+    (2, 'Priorité 2 (Moyen)', 'rgba(59, 130, 246, 0.8)', 'rgba(59, 130, 246, 1)'),
+    (3, 'Priorité 3 (Découverte)', 'rgba(16, 185, 129, 0.8)', 'rgba(16, 185, 129, 1)'),
+]
+
+
+def as_priority(value):
+    """Priorité entière d'une valeur stockée (1.0 devient 1), ou None si ce n'est pas une priorité"""
+    if type(value) is float and value.is_integer():
+        value = int(value)
+    if type(value) is int and value in PRIORITIES:
+        return value
+    return None
+
+
+def _short_title(title):
+    return title[:30] + '...' if len(title) > 30 else title
+
+
+class VoteAggregate:
+    """Compteurs de résultats stockés dans des tableaux compacts.
+
+    Les bulletins forment une matrice participants × modules d'entiers
+    courts : une colonne (bytearray) par module, une ligne par participant,
+    0 pour l'absence de vote. Les compteurs par module et par priorité
+    sont un array plat (4 cases par module, indexées par la priorité),
+    tenu à jour par delta à chaque bulletin ; un rechargement complet les
+    recalcule par réductions de colonnes (bytearray.count). Les résultats
+    sont servis en O(modules) quel que soit le nombre de votes. Le
+    catalogue des modules n'est utilisé qu'à la mise en forme, un même
+    agrégat sert donc tous les front-ends.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._clear()
+
+    def _clear(self):
+        self._module_index = {}
+        self._columns = []
+        self._counts = array('l')
+        self._priority_counts = array('l', [0] * SLOTS)
+        self._modules_voted = 0
+        self._rows = {}
+        self._row_columns = []
+        self._free_rows = []
+        self._capacity = 0
+        self.participants = {}
+
+    @classmethod
+    def from_votes(cls, votes):
+        """Construit l'agrégat à partir de l'ensemble des bulletins (ou de l'ancien format liste)"""
+        aggregate = cls()
+        aggregate.reset(votes)
+        return aggregate
+
+    @classmethod
+    def from_counts(cls, module_stats, participants):
+        """Construit l'agrégat à partir de compteurs déjà calculés.
+
+        module_stats : {module_id: {priorité: nombre}} ;
+        participants : [(participant, vote_count, timestamp)].
+        """
+        aggregate = cls()
+        for module_id, stats in module_stats.items():
+            column = aggregate._column(module_id)
+            for priority in PRIORITIES:
+                aggregate._add_count(column, priority, stats[priority])
+        aggregate.participants = {
+            participant: {'participant': participant, 'vote_count': vote_count, 'timestamp': timestamp}
+            for participant, vote_count, timestamp in participants
+        }
+        return aggregate
+
+    @classmethod
+    def merge(cls, aggregates):
+        """Agrégat consolidé de plusieurs sessions, par somme de leurs compteurs.
+
+        aggregates : {session: agrégat}. Les participants de sessions
+        différentes restent distincts (clé 'session/participant').
+        """
+        merged = cls()
+        for session, aggregate in aggregates.items():
+            module_index, counts, _, _, participant_details = aggregate._state()
+            for module_id, column in module_index.items():
+                offset = column * SLOTS
+                merged_column = merged._column(module_id)
+                for priority in PRIORITIES:
+                    if counts[offset + priority]:
+                        merged._add_count(merged_column, priority, counts[offset + priority])
+            for details in participant_details:
+                merged.participants[f"{session}/{details['participant']}"] = dict(details, session=session)
+        return merged
+
+    def _column(self, module_id):
+        """Indice de colonne d'un module, créée au premier vote"""
+        column = self._module_index.get(module_id)
+        if column is None:
+            column = self._module_index[module_id] = len(self._columns)
+            self._columns.append(bytearray(self._capacity))
+            self._counts.extend([0] * SLOTS)
+        return column
+
+    def _row(self, participant):
+        """Indice de ligne d'un participant, en réutilisant les lignes libérées"""
+        row = self._rows.get(participant)
+        if row is not None:
+            return row
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            row = len(self._row_columns)
+            self._row_columns.append(())
+            if row >= self._capacity:
+                grow = max(self._capacity, 64)
+                for column in self._columns:
+                    column.extend(bytes(grow))
+                self._capacity += grow
+        self._rows[participant] = row
+        return row
+
+    def _add_count(self, column, priority, delta):
+        offset = column * SLOTS
+        before = self._counts[offset + 1] + self._counts[offset + 2] + self._counts[offset + 3]
+        self._counts[offset + priority] += delta
+        self._priority_counts[priority] += delta
+        after = before + delta
+        if not before and after:
+            self._modules_voted += 1
+        elif before and not after:
+            self._modules_voted -= 1
+
+    def _clear_row(self, row):
+        for column in self._row_columns[row]:
+            self._add_count(column, self._columns[column][row], -1)
+            self._columns[column][row] = 0
+        self._row_columns[row] = ()
+
+    def add_ballot(self, participant, vote_data):
+        """Ajoute le bulletin d'un participant aux compteurs"""
+        self.apply_change(participant, None, vote_data)
+
+    def apply_change(self, participant, previous, current):
+        """Remplace le bulletin d'un participant par le nouveau (ou None).
+
+        L'ancien bulletin est relu dans la matrice : previous n'est gardé
+        que pour l'interface des observateurs du journal.
+        """
+        with self._lock:
+            row = self._rows.get(participant)
+            if row is not None:
+                self._clear_row(row)
+            if current is None:
+                if row is not None:
+                    del self._rows[participant]
+                    self._free_rows.append(row)
+                self.participants.pop(participant, None)
+                return
+            row = self._row(participant)
+            participant_votes = current.get('votes', {})
+            voted = []
+            for module_id, priority in participant_votes.items():
+                priority = as_priority(priority)
+                if priority is None:
+                    continue
+                column = self._column(module_id)
+                self._columns[column][row] = priority
+                self._add_count(column, priority, 1)
+                voted.append(column)
+            self._row_columns[row] = tuple(voted)
+            self.participants[participant] = {
+                'participant': participant,
+                'vote_count': len(participant_votes),
+                'timestamp': current.get('timestamp', '')
+            }
+
+    def reset(self, votes):
+        """Reconstruit la matrice à partir de l'ensemble des bulletins.
+
+        Les compteurs sont recalculés en une passe par réductions de
+        colonnes plutôt que par un delta par vote. L'ancien format liste
+        de votes.json est accepté (bulletins anonymes).
+        """
+        if isinstance(votes, list):
+            votes = legacy_ballots(votes)
+        with self._lock:
+            self._clear()
+            self._capacity = len(votes)
+            for participant, vote_data in votes.items():
+                row = self._row(participant)
+                participant_votes = vote_data.get('votes', {})
+                voted = []
+                for module_id, priority in participant_votes.items():
+                    priority = as_priority(priority)
+                    if priority is None:
+                        continue
+                    column = self._column(module_id)
+                    self._columns[column][row] = priority
+                    voted.append(column)
+                self._row_columns[row] = tuple(voted)
+                self.participants[participant] = {
+                    'participant': participant,
+                    'vote_count': len(participant_votes),
+                    'timestamp': vote_data.get('timestamp', '')
+                }
+            for column, cells in enumerate(self._columns):
+                offset = column * SLOTS
+                for priority in PRIORITIES:
+                    count = cells.count(priority)
+                    self._counts[offset + priority] = count
+                    self._priority_counts[priority] += count
+                if any(self._counts[offset + 1:offset + SLOTS]):
+                    self._modules_voted += 1
+
+    def _state(self):
+        """Copie cohérente des compteurs : (index des modules, compteurs, totaux par priorité, modules votés, participants)"""
+        with self._lock:
+            return (
+                self._module_index.copy(),
+                self._counts[:],
+                self._priority_counts[:],
+                self._modules_voted,
+                list(self.participants.values())
+            )
+
+    @staticmethod
+    def _module_counts(modules, module_index, counts):
+        """(module, p1, p2, p3, total) pour les modules du catalogue ayant des votes"""
+        rows = []
+        for module in modules:
+            column = module_index.get(module['id'])
+            if column is None:
+                continue
+            offset = column * SLOTS
+            p1, p2, p3 = counts[offset + 1:offset + SLOTS]
+            total = p1 + p2 + p3
+            if total:  # Seulement les modules avec des votes
+                rows.append((module, p1, p2, p3, total))
+        return rows
+
+    def module_votes(self, modules):
+        """(module, p1, p2, p3, total) des modules du catalogue ayant des votes"""
+        module_index, counts = self._state()[:2]
+        return self._module_counts(modules, module_index, counts)
+
+    def results(self, modules):
+        """Résultats du tableau de bord (main.py, function_app.py)"""
+        module_index, counts, priority_counts, modules_voted, participant_details = self._state()
+
+        chart_data = []
+        detailed_data = []
+        for module, p1, p2, p3, total in self._module_counts(modules, module_index, counts):
+            chart_data.append({
+                'module': _short_title(module['title']),
+                'priority_1': p1,
+                'priority_2': p2,
+                'priority_3': p3,
+                'total': total
+            })
+            detailed_data.append({
+                'module': module['title'],
+                'duration': module['duration'],
+                'priority_1': p1,
+                'priority_2': p2,
+                'priority_3': p3,
+                'total': total
+            })
+
+        total_votes = sum(priority_counts)
+        pie_data = []
+        if total_votes > 0:
+            pie_data = [
+                {'name': name, 'value': priority_counts[priority], 'color': color}
+                for priority, name, color in PIE_SLICES
+            ]
+
+        return {
+            'summary': {
+                'total_votes': total_votes,
+                'participants': len(participant_details),
+                'modules_voted': modules_voted,
+                'total_modules': len(modules)
+            },
+            'chart_data': chart_data,
+            'pie_data': pie_data,
+            'detailed_data': detailed_data,
+            'participant_details': participant_details
+        }
+
+    def _ranked_modules(self, modules, module_index, counts):
+        """Modules du catalogue ayant des votes, triés par total décroissant"""
+        ranked = [
+            (module, {'priority_1': p1, 'priority_2': p2, 'priority_3': p3, 'total': total})
+            for module, p1, p2, p3, total in self._module_counts(modules, module_index, counts)
+        ]
+        ranked.sort(key=lambda item: item[1]['total'], reverse=True)
+        return ranked
+
+    def module_results(self, modules):
+        """Résultats par module (routes/modules.py, /results)"""
+        module_index, counts, priority_counts, _, participant_details = self._state()
+        ranked = self._ranked_modules(modules, module_index, counts)
+        return {
+            'results': [
+                {
+                    'moduleId': module['id'],
+                    'title': module['title'],
+                    'duration': module['duration'],
+                    'votes': vote_counts
+                }
+                for module, vote_counts in ranked
+            ],
+            'summary': {
+                'totalVotes': sum(priority_counts),
+                'totalParticipants': len(participant_details),
+                'totalModules': len(modules),
+                'modulesWithVotes': len(ranked)
+            }
+        }
+
+    def chart_data(self, modules):
+        """Données Chart.js par module (routes/modules.py, /results/chart-data)"""
+        module_index, counts = self._state()[:2]
+        ranked = self._ranked_modules(modules, module_index, counts)
+        return {
+            'labels': [f"{module['title']} ({vote_counts['total']} votes)" for module, vote_counts in ranked],
+            'datasets': [
+                {
+                    'label': label,
+                    'data': [vote_counts[f'priority_{priority}'] for _, vote_counts in ranked],
+                    'backgroundColor': background,
+                    'borderColor': border,
+                    'borderWidth': 1
+                }
+                for priority, label, background, border in CHART_DATASETS
+            ]
+        }
@@ -0,0 +1,145 @@
+import gzip
+import mimetypes
+import os
+import re
+
+from .cache import etag_matches, make_etag
+
+# Fichier à empreinte du build Vite : dans assets/, nom suivi d'un hachage de
+# 8 caractères (assets/index-CYlMB3E3.js). Un nom ordinaire à tirets hors de
+# assets/ (apple-touch-icon.png) n'est pas concerné.
+FINGERPRINT = re.compile(
+    r'(?:^|/)assets/[^/]+-[A-Za-z0-9_-]{8}\.(?:js|css|map|svg|png|jpe?g|gif|webp|avif|woff2?|ttf)$')
+
+# Un fichier à empreinte ne change jamais : il est gardé un an sans revalidation
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Les autres fichiers (index.html) sont revalidés à chaque chargement via l'ETag
+REVALIDATE = 'no-cache'
+
+COMPRESSIBLE = ('.js', '.css', '.html', '.svg', '.json', '.map', '.txt')
+
+# En dessous de cette taille, la compression ne fait rien gagner
+MIN_COMPRESS_SIZE = 1024
+
+# Encodages proposés, par ordre de préférence, et suffixe des variantes précompressées
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Qualité brotli au démarrage ; compress_static.py utilise la qualité maximale
+STARTUP_BROTLI_QUALITY = 5
+
+
+def _brotli():
+    """Module brotli s'il est installé (dépendance optionnelle)"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def compress(data, encoding, brotli_quality=STARTUP_BROTLI_QUALITY):
+    """Compresse data ; retourne None si l'encodage n'est pas disponible"""
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    brotli = _brotli()
+    if brotli is None:
+        return None
+    return brotli.compress(data, quality=brotli_quality)
+
+
+def is_compressible(path):
+    return path.endswith(COMPRESSIBLE)
+
+
+def accepted_encodings(accept_encoding):
+    """Encodages acceptés par le client (en-tête Accept-Encoding, q=0 exclus)"""
+    accepted = set()
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if name and quality > 0:
+            accepted.add(name.strip().lower())
+    if '*' in accepted:
+        accepted.update(encoding for encoding, _ in ENCODINGS)
+    return accepted
+
+
+class StaticAsset:
+    """Un fichier statique et ses variantes compressées, gardés en mémoire"""
+
+    def __init__(self, path, data, variants):
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/') or self.content_type in ('application/javascript', 'image/svg+xml'):
+            self.content_type += '; charset=utf-8'
+        self.cache_control = IMMUTABLE if FINGERPRINT.search(path) else REVALIDATE
+        self.etag = make_etag(data)
+        # Chaque représentation a son propre ETag fort
+        self.variants = {None: (data, self.etag)}
+        for encoding, body in variants.items():
+            self.variants[encoding] = (body, self.etag[:-1] + '-' + encoding + '"')
+
+
+class StaticAssets:
+    """Fichiers statiques chargés et compressés une seule fois au démarrage.
+
+    Les variantes .br / .gz produites au build (compress_static.py) sont
+    reprises telles quelles ; sinon gzip, et brotli s'il est installé,
+    sont calculés au chargement. Les fichiers à empreinte sont servis avec
+    un cache définitif, les autres avec revalidation par ETag.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}
+        for directory, _, files in os.walk(root):
+            for name in files:
+                if name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                    continue
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, root).replace(os.sep, '/')
+                self.assets[relative] = self._load(path)
+
+    @staticmethod
+    def _load(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        variants = {}
+        if is_compressible(path) and len(data) >= MIN_COMPRESS_SIZE:
+            for encoding, suffix in ENCODINGS:
+                if os.path.exists(path + suffix) and os.path.getmtime(path + suffix) >= os.path.getmtime(path):
+                    with open(path + suffix, 'rb') as f:
+                        body = f.read()
+                else:
+                    body = compress(data, encoding)
+                if body is not None and len(body) < len(data):
+                    variants[encoding] = body
+        return StaticAsset(path, data, variants)
+
+    def response(self, path, accept_encoding=None, if_none_match=None):
+        """Retourne (statut, corps, en-têtes), ou None si le fichier n'est pas connu"""
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+        accepted = accepted_encodings(accept_encoding)
+        encoding = next(
+            (encoding for encoding, _ in ENCODINGS if encoding in asset.variants and encoding in accepted), None)
+        body, etag = asset.variants[encoding]
+        headers = {
+            'Content-Type': asset.content_type,
+            'Cache-Control': asset.cache_control,
+            'ETag': etag
+        }
+        if len(asset.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+        if etag_matches(if_none_match, etag):
+            return 304, b'', headers
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        return 200, body, headers
@@ -0,0 +1,108 @@
+import hashlib
+import json
+from threading import Event, Lock
+
+from .metrics import NO_METRICS
+
+# Les résultats changent à chaque vote : le client garde le corps mais revalide toujours
+CACHE_CONTROL = 'no-cache'
+
+
+def encode_json(payload):
+    """Sérialise une réponse JSON en octets UTF-8 compacts"""
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def make_etag(body):
+    """ETag fort dérivé du contenu, identique d'un processus à l'autre"""
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def etag_matches(if_none_match, etag):
+    """Indique si l'en-tête If-None-Match désigne l'ETag courant"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # If-None-Match se compare faiblement : le préfixe W/ est ignoré
+    return any(
+        candidate.strip().removeprefix('W/') == etag
+        for candidate in if_none_match.split(',')
+    )
+
+
+class _Flight:
+    """Calcul en cours d'une vue pour une clé, attendu par les requêtes concurrentes"""
+
+    __slots__ = ('done', 'entry', 'error')
+
+    def __init__(self):
+        self.done = Event()
+        self.entry = None
+        self.error = None
+
+
+class PayloadCache:
+    """Corps de réponse déjà sérialisés, indexés par vue et version des données.
+
+    Tant que la clé de version d'une vue ne change pas, le corps et son ETag
+    sont servis tels quels : ni agrégation ni encodage JSON. Les requêtes
+    concurrentes qui trouvent la même vue périmée sont regroupées (single
+    flight) : une seule calcule, les autres attendent son résultat ou son
+    exception. coalesced compte ces requêtes regroupées.
+    """
+
+    def __init__(self, metrics=NO_METRICS):
+        self._entries = {}
+        self._flights = {}
+        self._lock = Lock()
+        self.metrics = metrics
+        self.coalesced = 0
+
+    def get(self, view, key, build):
+        """Retourne (corps, etag) de la vue, reconstruit si la clé a changé"""
+        entry = self._entries.get(view)
+        if entry is not None and entry[0] == key:
+            return entry[1], entry[2]
+
+        with self._lock:
+            entry = self._entries.get(view)
+            if entry is not None and entry[0] == key:
+                return entry[1], entry[2]
+            flight = self._flights.get((view, key))
+            leader = flight is None
+            if leader:
+                flight = self._flights[(view, key)] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            self.metrics.observe_coalesced(view)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.entry[1], flight.entry[2]
+
+        try:
+            payload = build()
+            with self.metrics.stage('serialize'):
+                body = encode_json(payload)
+            flight.entry = (key, body, make_etag(body))
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.entry is not None:
+                    self._entries[view] = flight.entry
+                del self._flights[(view, key)]
+            flight.done.set()
+        return flight.entry[1], flight.entry[2]
+
+    def conditional(self, view, key, build, if_none_match):
+        """Retourne (statut, corps, en-têtes) en tenant compte de If-None-Match"""
+        body, etag = self.get(view, key, build)
+        headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+        if etag_matches(if_none_match, etag):
+            return 304, b'', headers
+        return 200, body, headers
@@ -0,0 +1,124 @@
+import json
+import os
+import re
+import time
+from threading import Lock
+
+from .cache import encode_json
+
+# Dossier des données du sondage (participants.json, modules.json, votes.json)
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+# Identifiant d'une session : aussi nom de dossier, de fichier et de partition
+SESSION_ID = re.compile(r'[A-Za-z0-9][A-Za-z0-9_-]{0,63}')
+
+# Intervalle minimal (secondes) entre deux vérifications des fichiers du catalogue
+CHECK_INTERVAL = 1.0
+
+
+def normalize_module_id(module_id):
+    """Identifiant canonique d'un module : les anciens 'm1.1' deviennent 'm1_1'"""
+    return module_id.replace('.', '_')
+
+
+class Catalog:
+    """Participants autorisés et modules proposés au vote"""
+
+    def __init__(self, participants, modules, version=None):
+        self.participants = participants
+        self.modules = modules
+        self.module_index = {module['id']: module for module in modules}
+        self.version = version
+        self._encoded = {}
+
+    def is_participant(self, participant):
+        return participant in self.participants
+
+    def encoded(self, key, build):
+        """Corps de réponse dérivé du catalogue, encodé une seule fois"""
+        body = self._encoded.get(key)
+        if body is None:
+            body = self._encoded[key] = encode_json(build(self))
+        return body
+
+
+def sessions_dir(environ=os.environ):
+    """Dossier des sessions : un sous-dossier par session (participants.json, modules.json, votes.json)"""
+    return environ.get('SESSIONS_DIR', os.path.join(DATA_DIR, 'sessions'))
+
+
+def is_session_id(session_id):
+    return bool(session_id) and SESSION_ID.fullmatch(session_id) is not None
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _catalog_paths(data_dir):
+    return os.path.join(data_dir, 'participants.json'), os.path.join(data_dir, 'modules.json')
+
+
+def catalog_version(data_dir=DATA_DIR):
+    """État des fichiers du catalogue (mtime, taille), sans les lire"""
+    return tuple(_file_signature(path) for path in _catalog_paths(data_dir))
+
+
+def load_catalog(data_dir=DATA_DIR):
+    """Charge le catalogue depuis participants.json et modules.json.
+
+    version identifie l'état des fichiers lus (mtime, taille) et sert de
+    clé aux réponses mises en cache.
+    """
+    participants_path, modules_path = _catalog_paths(data_dir)
+    version = catalog_version(data_dir)
+    with open(participants_path, 'r', encoding='utf-8') as f:
+        participants = json.load(f)
+    with open(modules_path, 'r', encoding='utf-8') as f:
+        modules = json.load(f)
+    for module in modules:
+        module['id'] = normalize_module_id(module['id'])
+    return Catalog(participants, modules, version)
+
+
+class CatalogCache:
+    """Catalogue analysé une fois, rechargé seulement quand ses fichiers changent.
+
+    Le mtime et la taille des fichiers sont vérifiés au plus toutes les
+    check_interval secondes : en régime établi, get() ne fait aucune E/S,
+    et une modification du catalogue est prise en compte sans redémarrage.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, check_interval=CHECK_INTERVAL):
+        self.data_dir = data_dir
+        self.check_interval = check_interval
+        self._catalog = None
+        self._next_check = 0.0
+        self._lock = Lock()
+
+    def get(self):
+        catalog = self._catalog
+        if catalog is not None and time.monotonic() < self._next_check:
+            return catalog
+        with self._lock:
+            if self._catalog is None or time.monotonic() >= self._next_check:
+                if self._catalog is None or catalog_version(self.data_dir) != self._catalog.version:
+                    self._catalog = load_catalog(self.data_dir)
+                self._next_check = time.monotonic() + self.check_interval
+            return self._catalog
+
+
+def anonymous_participant(timestamp):
+    """Clé du bulletin d'une soumission anonyme (routes/modules.py), identifiée par son horodatage"""
+    return f'anonyme:{timestamp}'
+
+
+def legacy_ballots(votes):
+    """Regroupe l'ancien format liste ([{moduleId, priority, timestamp}]) en bulletins anonymes"""
+    ballots = {}
+    for vote in votes:
+        timestamp = vote.get('timestamp', '')
+        ballot = ballots.setdefault(anonymous_participant(timestamp), {'timestamp': timestamp, 'votes': {}})
+        ballot['votes'][normalize_module_id(vote['moduleId'])] = vote['priority']
+    return ballots
@@ -0,0 +1,143 @@
+import asyncio
+import json
+from collections import Counter, deque
+from threading import Condition
+
+# Intervalle (secondes) des commentaires keepalive envoyés aux clients inactifs
+HEARTBEAT_INTERVAL = 15
+
+# Nombre d'événements conservés pour les clients en retard
+BACKLOG = 256
+
+
+def ballot_delta(previous, current):
+    """Différence entre deux bulletins : [[module_id, priorité, +n/-n], ...]"""
+    counts = Counter()
+    for module_id, priority in ((previous or {}).get('votes') or {}).items():
+        counts[(module_id, priority)] -= 1
+    for module_id, priority in ((current or {}).get('votes') or {}).items():
+        counts[(module_id, priority)] += 1
+    return [[module_id, priority, delta] for (module_id, priority), delta in counts.items() if delta]
+
+
+def format_event(event, data):
+    """Encode un événement Server-Sent Events"""
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'event: {event}\ndata: {payload}\n\n'.encode('utf-8')
+
+
+class ResultsBroadcaster:
+    """Diffuse les changements de résultats à tous les clients SSE connectés.
+
+    Les événements sont encodés une seule fois et rangés dans un tampon
+    circulaire partagé : chaque client ne garde que le numéro du dernier
+    événement reçu. Un client trop en retard, ou un rechargement complet
+    des votes, reçoit de nouveau l'agrégat complet.
+
+    snapshot est une fonction retournant le corps JSON (str ou bytes) des
+    résultats courants ; elle est partagée par les clients via le cache
+    des réponses, N spectateurs coûtent donc une seule agrégation.
+    """
+
+    def __init__(self, snapshot, backlog=BACKLOG):
+        self.snapshot = snapshot
+        self._events = deque(maxlen=backlog)
+        self._seq = 0
+        self._condition = Condition()
+        self._async_waiters = set()
+
+    def publish(self, event, data, resync=False):
+        with self._condition:
+            self._seq += 1
+            self._events.append((self._seq, format_event(event, data), resync))
+            self._condition.notify_all()
+            waiters = list(self._async_waiters)
+        # Les clients asyncio sont réveillés depuis le thread qui publie
+        for loop, wakeup in waiters:
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def apply_change(self, participant, previous, current):
+        """Observateur du journal : publie le delta d'un bulletin"""
+        changes = ballot_delta(previous, current)
+        if not changes and (previous is None) == (current is None):
+            return
+        self.publish('delta', {
+            'participant': participant,
+            'vote_count': len(current.get('votes', {})) if current else None,
+            'timestamp': current.get('timestamp', '') if current else None,
+            'changes': changes
+        })
+
+    def reset(self, votes):
+        """Observateur du journal : après un rechargement complet, les clients se resynchronisent"""
+        self.publish('reset', {}, resync=True)
+
+    def _snapshot_event(self):
+        """Retourne (numéro de séquence, événement) pour un agrégat cohérent avec la séquence"""
+        while True:
+            seq = self._seq
+            body = self.snapshot()
+            if seq == self._seq:
+                if isinstance(body, bytes):
+                    body = body.decode('utf-8')
+                return seq, format_event('results', body)
+
+    def _pending(self, seq):
+        """Retourne (nouvelle séquence, événements après seq, resynchronisation nécessaire)"""
+        pending = [entry for entry in self._events if entry[0] > seq]
+        lagged = self._seq - seq > len(pending)
+        return self._seq, pending, lagged or any(resync for _, _, resync in pending)
+
+    def stream(self, heartbeat=HEARTBEAT_INTERVAL, on_idle=None):
+        """Générateur d'événements SSE pour un client"""
+        seq, event = self._snapshot_event()
+        yield event
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._seq > seq, timeout=heartbeat)
+                seq, pending, resync = self._pending(seq)
+
+            if resync:
+                seq, event = self._snapshot_event()
+                yield event
+            elif pending:
+                yield b''.join(event for _, event, _ in pending)
+            else:
+                if on_idle is not None:
+                    on_idle()
+                yield b': keepalive\n\n'
+
+    async def astream(self, heartbeat=HEARTBEAT_INTERVAL, executor=None):
+        """Générateur asynchrone d'événements SSE : un client n'occupe aucun thread.
+
+        L'agrégat complet est calculé dans executor (pool de threads) pour
+        ne pas bloquer la boucle d'événements.
+        """
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        waiter = (loop, wakeup)
+        with self._condition:
+            self._async_waiters.add(waiter)
+        try:
+            seq, event = await loop.run_in_executor(executor, self._snapshot_event)
+            yield event
+            while True:
+                if self._seq == seq:
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), heartbeat)
+                    except asyncio.TimeoutError:
+                        pass
+                wakeup.clear()
+                with self._condition:
+                    seq, pending, resync = self._pending(seq)
+
+                if resync:
+                    seq, event = await loop.run_in_executor(executor, self._snapshot_event)
+                    yield event
+                elif pending:
+                    yield b''.join(event for _, event, _ in pending)
+                else:
+                    yield b': keepalive\n\n'
+        finally:
+            with self._condition:
+                self._async_waiters.discard(waiter)
@@ -0,0 +1,237 @@
+"""Ingestion des bulletins par file d'attente.
+
+Le front-end HTTP valide le bulletin, le dépose dans une file et répond
+aussitôt 202 avec un ticket ; un consommateur vide ensuite la file par lots
+et enregistre chaque lot en une seule écriture (VotingService.import_ballots).
+La file est Azure Queue Storage (ou Azurite), ou une file en mémoire pour
+les tests et le développement local.
+"""
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from threading import Condition, Thread
+
+# Nombre maximal de messages enregistrés par lot
+INGEST_BATCH_SIZE = 256
+
+# Messages lus par appel à Azure Queue Storage (maximum du service)
+QUEUE_RECEIVE_SIZE = 32
+
+# Durée (secondes) pendant laquelle un message lu reste invisible aux autres consommateurs
+VISIBILITY_TIMEOUT = 60
+
+# Nombre de lectures d'un message avant son transfert dans la file <nom>-poison
+MAX_DEQUEUE_COUNT = 5
+
+logger = logging.getLogger(__name__)
+
+
+class QueuedMessage:
+    __slots__ = ('id', 'receipt', 'content', 'dequeue_count')
+
+    def __init__(self, id, receipt, content, dequeue_count=1):
+        self.id = id
+        self.receipt = receipt
+        self.content = content
+        self.dequeue_count = dequeue_count
+
+
+class MemoryVoteQueue:
+    """File en mémoire du processus, avec délai de visibilité comme Azure Queue Storage"""
+
+    def __init__(self, visibility_timeout=VISIBILITY_TIMEOUT):
+        self.visibility_timeout = visibility_timeout
+        self._ready = deque()
+        self._in_flight = {}
+        self._condition = Condition()
+        self.poison = []
+
+    def send(self, content):
+        with self._condition:
+            self._ready.append((uuid.uuid4().hex, content, 0))
+            self._condition.notify()
+
+    def _requeue_expired(self):
+        now = time.monotonic()
+        for receipt, (deadline, message) in list(self._in_flight.items()):
+            if deadline <= now:
+                del self._in_flight[receipt]
+                self._ready.append((message.id, message.content, message.dequeue_count))
+
+    def receive(self, max_messages, wait=0.0):
+        """Lit jusqu'à max_messages messages, en attendant au plus wait secondes le premier"""
+        with self._condition:
+            self._requeue_expired()
+            if not self._ready and wait:
+                self._condition.wait(wait)
+                self._requeue_expired()
+            messages = []
+            while self._ready and len(messages) < max_messages:
+                message_id, content, dequeue_count = self._ready.popleft()
+                message = QueuedMessage(message_id, uuid.uuid4().hex, content, dequeue_count + 1)
+                self._in_flight[message.receipt] = (time.monotonic() + self.visibility_timeout, message)
+                messages.append(message)
+            return messages
+
+    def delete(self, message):
+        with self._condition:
+            self._in_flight.pop(message.receipt, None)
+
+    def send_poison(self, message):
+        self.poison.append(message.content)
+        self.delete(message)
+
+    def __len__(self):
+        with self._condition:
+            return len(self._ready) + len(self._in_flight)
+
+
+class StorageVoteQueue:
+    """File Azure Queue Storage (ou Azurite), encodée en base64 comme l'attend le déclencheur Functions"""
+
+    def __init__(self, connection_string, queue_name, visibility_timeout=VISIBILITY_TIMEOUT):
+        from azure.core.exceptions import ResourceExistsError
+        from azure.storage.queue import QueueClient, TextBase64DecodePolicy, TextBase64EncodePolicy
+
+        self.visibility_timeout = visibility_timeout
+        self._clients = {}
+        for name in (queue_name, f'{queue_name}-poison'):
+            client = QueueClient.from_connection_string(
+                connection_string, name,
+                message_encode_policy=TextBase64EncodePolicy(),
+                message_decode_policy=TextBase64DecodePolicy())
+            try:
+                client.create_queue()
+            except ResourceExistsError:
+                pass
+            self._clients[name] = client
+        self.queue = self._clients[queue_name]
+        self.poison_queue = self._clients[f'{queue_name}-poison']
+
+    def send(self, content):
+        self.queue.send_message(content)
+
+    def receive(self, max_messages, wait=0.0):
+        # Le SDK lit par pages de 32 messages au plus (maximum du service)
+        page = self.queue.receive_messages(
+            messages_per_page=QUEUE_RECEIVE_SIZE, visibility_timeout=self.visibility_timeout,
+            max_messages=max_messages)
+        return [
+            QueuedMessage(message.id, message.pop_receipt, message.content, message.dequeue_count)
+            for message in page
+        ]
+
+    def delete(self, message):
+        self.queue.delete_message(message.id, message.receipt)
+
+    def send_poison(self, message):
+        self.poison_queue.send_message(message.content)
+        self.delete(message)
+
+
+def create_queue(connection_string, queue_name):
+    """File Azure Queue Storage si une chaîne de connexion est fournie, sinon file en mémoire"""
+    if connection_string:
+        return StorageVoteQueue(connection_string, queue_name)
+    return MemoryVoteQueue()
+
+
+class BallotIngestor:
+    """Dépôt des bulletins dans la file et enregistrement par lots.
+
+    sessions : fonction session_id -> Session (ou None si elle n'existe
+    pas). Un message est un bulletin NDJSON {participant, votes, timestamp}
+    complété de son ticket et de sa session. Les messages d'un lot sont
+    regroupés par session, puis triés par horodatage : si un participant
+    a voté deux fois, son dernier bulletin l'emporte.
+    """
+
+    def __init__(self, queue, sessions, batch_size=INGEST_BATCH_SIZE):
+        self.queue = queue
+        self.sessions = sessions
+        self.batch_size = batch_size
+        self._worker = None
+
+    def enqueue(self, session_id, participant, votes, timestamp=None):
+        """Dépose un bulletin déjà validé ; retourne son ticket"""
+        ticket = uuid.uuid4().hex
+        self.queue.send(json.dumps({
+            'ticket': ticket,
+            'session': session_id,
+            'participant': participant,
+            'votes': votes,
+            'timestamp': timestamp or datetime.now().isoformat()
+        }, ensure_ascii=False))
+        return ticket
+
+    def ingest(self, contents):
+        """Enregistre des messages (contenus texte) : une écriture par session.
+
+        Retourne le rapport {imported, error_count, errors}. Les erreurs
+        de stockage sont propagées : les messages seront relus.
+        """
+        by_session = {}
+        errors = []
+        for content in contents:
+            try:
+                record = json.loads(content)
+                session_id = record['session']
+            except (ValueError, TypeError, KeyError):
+                errors.append({'ticket': None, 'error': "Message invalide"})
+                continue
+            by_session.setdefault(session_id, []).append(record)
+
+        imported = 0
+        for session_id, records in by_session.items():
+            session = self.sessions(session_id)
+            if session is None:
+                errors += [{'ticket': record.get('ticket'), 'error': "Session inconnue"} for record in records]
+                continue
+            records.sort(key=lambda record: str(record.get('timestamp') or ''))
+            report = session.voting.import_ballots(
+                json.dumps(record, ensure_ascii=False) for record in records)
+            imported += report['imported']
+            for error in report['errors']:
+                errors.append({'ticket': records[error['line'] - 1].get('ticket'), 'error': error['error']})
+        for error in errors:
+            logger.warning("Bulletin rejeté (ticket %s) : %s", error['ticket'], error['error'])
+        return {'imported': imported, 'error_count': len(errors), 'errors': errors}
+
+    def drain(self, max_messages=None, wait=0.0, received=()):
+        """Lit un lot de messages de la file, l'enregistre et supprime les messages traités.
+
+        received : contenus déjà remis par un déclencheur, enregistrés dans
+        la même écriture que le lot. Les messages relus trop souvent partent
+        dans la file poison. Si l'écriture échoue, les messages restent dans
+        la file et redeviennent visibles après le délai de visibilité.
+        """
+        messages = self.queue.receive(max(0, (max_messages or self.batch_size) - len(received)), wait)
+        if not messages and not received:
+            return {'imported': 0, 'error_count': 0, 'errors': []}
+        poisoned = [message for message in messages if message.dequeue_count > MAX_DEQUEUE_COUNT]
+        for message in poisoned:
+            self.queue.send_poison(message)
+        messages = [message for message in messages if message.dequeue_count <= MAX_DEQUEUE_COUNT]
+        report = self.ingest([*received, *(message.content for message in messages)])
+        for message in messages:
+            self.queue.delete(message)
+        return report
+
+    def start_worker(self, wait=1.0):
+        """Consommateur en tâche de fond (file en mémoire, sans déclencheur)"""
+        if self._worker is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.drain(wait=wait)
+                except Exception:
+                    logger.exception("Échec de l'enregistrement d'un lot de bulletins")
+                    time.sleep(wait)
+
+        self._worker = Thread(target=run, name='ballot-ingestor', daemon=True)
+        self._worker.start()
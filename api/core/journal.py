@@ -0,0 +1,500 @@
+import json
+import logging
+import os
+import uuid
+from contextlib import contextmanager
+from threading import Condition, Event, RLock, Thread, get_ident
+
+try:
+    import fcntl
+except ImportError:  # Windows : le verrou ne protège que le processus courant
+    fcntl = None
+
+from .catalog import legacy_ballots
+from .storage import VoteStorage
+
+# Taille du journal (en octets) au-delà de laquelle il est compacté dans l'instantané
+COMPACT_THRESHOLD = 1024 * 1024
+
+# Durée (secondes) d'inactivité après laquelle le thread d'écriture s'arrête
+WRITER_IDLE_TIMEOUT = 5.0
+
+# Taille (octets) lue à la fin du journal pour retrouver la dernière ligne complète
+TAIL_CHUNK = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def _journal_id(line):
+    """Identifiant de l'en-tête d'un journal ({"op":"journal","id":...}), ou None"""
+    if not line.startswith(b'{"op":"journal"'):
+        return None
+    try:
+        return json.loads(line)['id']
+    except (ValueError, KeyError):
+        return None
+
+
+class _PendingWrite:
+    """Enregistrements encodés en attente du thread d'écriture"""
+
+    def __init__(self, data):
+        self.data = data
+        self.done = Event()
+        self.error = None
+
+
+class VoteJournal:
+    """Journal des votes en ajout seul, compacté périodiquement dans un instantané.
+
+    Chaque écriture ajoute une ligne JSON au journal puis fait un fsync ;
+    l'état en mémoire est reconstruit au démarrage en rejouant l'instantané
+    puis le journal. Les enregistrements décrivent un état absolu (bulletin
+    complet ou suppression), le rejeu est donc idempotent : un journal déjà
+    intégré à l'instantané peut être rejoué sans risque après un crash.
+
+    Les sous-classes définissent le format de l'état via empty_state(),
+    restore() et apply(). Les observateurs abonnés reçoivent chaque
+    changement appliqué (apply_change) et l'état complet après un
+    rechargement (reset). version augmente à chaque modification de l'état.
+
+    Les écritures passent par un unique thread d'écriture : les
+    enregistrements soumis en parallèle sont regroupés en une seule
+    écriture et un seul fsync (group commit). Un verrou de fichier
+    (flock sur <base>.lock) sérialise écritures et compactions entre les
+    processus qui partagent le journal (workers gunicorn). Le verrou de
+    l'état en mémoire n'est pris que pour appliquer les enregistrements :
+    les lectures (sync, version) n'attendent pas un fsync ou un autre
+    processus.
+
+    Chaque journal commence par un en-tête portant un identifiant unique :
+    une bascule est détectée même si le nouveau journal réutilise l'inode
+    de l'ancien.
+
+    Une dernière ligne incomplète (écriture interrompue par un crash) est
+    retirée sous le verrou exclusif au chargement et avant toute écriture ;
+    une ligne illisible est ignorée au rejeu.
+    """
+
+    def __init__(self, snapshot_path, compact_threshold=COMPACT_THRESHOLD):
+        self.snapshot_path = snapshot_path
+        self.journal_path = os.path.splitext(snapshot_path)[0] + '.journal'
+        self.compacting_path = self.journal_path + '.compacting'
+        self.lock_path = self.journal_path + '.lock'
+        self.compact_lock_path = self.journal_path + '.compact.lock'
+        self.compact_threshold = compact_threshold
+        self.state = self.restore(self.empty_state())
+        self.version = 0
+        self.observers = []
+        self._lock = RLock()
+        self._write_lock = RLock()
+        self._write_owner = None
+        self._offset = 0
+        self._generation = None
+        self._compactor = None
+        self._lock_file = None
+        self._lock_pid = None
+        self._lock_depth = 0
+        self._queue = []
+        self._queue_ready = Condition()
+        self._writer = None
+
+    def empty_state(self):
+        raise NotImplementedError
+
+    def restore(self, data):
+        """Construit l'état à partir du contenu de l'instantané"""
+        return data
+
+    def apply(self, state, record):
+        """Applique un enregistrement à l'état et retourne le changement pour les observateurs"""
+        raise NotImplementedError
+
+    def subscribe(self, observer):
+        with self._lock:
+            self.observers.append(observer)
+            observer.reset(self.state)
+
+    def load(self):
+        """Reconstruit l'état depuis l'instantané et les journaux"""
+        self._repair_tail()
+        # Verrou partagé : la lecture ne voit jamais une compaction à moitié
+        # faite (instantané remplacé mais .compacting pas encore supprimé)
+        with self._shared():
+            data = self.empty_state()
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    try:
+                        data = json.load(f)
+                    except json.JSONDecodeError:
+                        pass
+            state = self.restore(data)
+            for record in self._read_records(self.compacting_path, 0)[0]:
+                self.apply(state, record)
+            records, offset = self._read_records(self.journal_path, 0)
+            for record in records:
+                self.apply(state, record)
+            generation = self._journal_position()[1]
+        with self._lock:
+            self.state = state
+            self.version += 1
+            self._offset, self._generation = offset, generation
+            for observer in self.observers:
+                observer.reset(state)
+            return state
+
+    def sync(self):
+        """Intègre les enregistrements ajoutés au journal par d'autres processus"""
+        with self._lock:
+            size, generation = self._journal_position()
+            if self._generation is None and self._offset == 0:
+                # Nouveau journal après compaction : il suffit de le lire depuis le début
+                self._generation = generation
+            if generation == self._generation and size >= self._offset:
+                if size > self._offset:
+                    records, self._offset = self._read_records(self.journal_path, self._offset)
+                    for record in records:
+                        self.version += 1
+                        change = self.apply(self.state, record)
+                        if change is not None:
+                            for observer in self.observers:
+                                observer.apply_change(*change)
+                return self.state
+        # Journal basculé par une compaction : rechargement complet, hors du verrou de l'état
+        return self.load()
+
+    @contextmanager
+    def _shared(self):
+        """Verrou de lecture des fichiers, exclu par les écritures et les compactions"""
+        if self._write_owner == get_ident():
+            # Déjà sous le verrou d'écriture (sync pendant une écriture)
+            yield
+            return
+        if fcntl is None:
+            with self._write_lock:
+                yield
+            return
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        # Description de fichier distincte : attend aussi les écritures des autres threads du processus
+        with open(self.lock_path, 'a+b') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH)
+            yield
+
+    @contextmanager
+    def _exclusive(self):
+        """Verrou d'écriture du journal, entre threads et entre processus (distinct du verrou de l'état)"""
+        with self._write_lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                # Après un fork, le descripteur hérité partagerait le verrou du parent
+                if self._lock_file is None or self._lock_pid != os.getpid():
+                    os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+                    self._lock_file = open(self.lock_path, 'a+b')
+                    self._lock_pid = os.getpid()
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            self._write_owner = get_ident()
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    self._write_owner = None
+                    if fcntl is not None:
+                        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def append(self, record):
+        """Ajoute un enregistrement au journal (ajout + fsync) et l'applique à l'état"""
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Ajoute des enregistrements au journal et attend qu'ils soient écrits et appliqués"""
+        pending = _PendingWrite(b''.join(
+            (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+            for record in records
+        ))
+        with self._queue_ready:
+            self._queue.append(pending)
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+            self._queue_ready.notify()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+
+    def _write_loop(self):
+        """Thread d'écriture : chaque tour écrit tous les enregistrements en attente"""
+        while True:
+            with self._queue_ready:
+                if not self._queue_ready.wait_for(lambda: self._queue, timeout=WRITER_IDLE_TIMEOUT):
+                    self._writer = None
+                    return
+                batch, self._queue = self._queue, []
+            try:
+                self._write(b''.join(pending.data for pending in batch))
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            for pending in batch:
+                pending.done.set()
+
+    def _write(self, data):
+        with self._exclusive():
+            os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+            self._truncate_partial()
+            with open(self.journal_path, 'ab') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    # Nouveau journal : en-tête identifiant cette génération
+                    header = {'op': 'journal', 'id': uuid.uuid4().hex}
+                    data = (json.dumps(header, separators=(',', ':')) + '\n').encode('utf-8') + data
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.sync()
+            if self._offset >= self.compact_threshold:
+                self.compact()
+
+    def compact(self, wait=False):
+        """Bascule le journal et écrit l'instantané en arrière-plan.
+
+        Le thread de compaction garde un verrou sur <base>.compact.lock,
+        libéré par le système si le processus meurt : un .compacting sans
+        ce verrou est le reste d'une compaction interrompue, que l'on
+        termine ici.
+        """
+        with self._exclusive():
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            if not os.path.exists(self.journal_path) and not os.path.exists(self.compacting_path):
+                return
+            compact_lock = self._try_compact_lock()
+            if compact_lock is None:
+                return  # Compaction en cours dans un autre processus
+            try:
+                # L'instantané doit inclure les écritures des autres processus (et un .compacting resté)
+                self.sync()
+                if os.path.exists(self.compacting_path):
+                    with self._lock:
+                        snapshot = self._copy_state()
+                    self._write_snapshot(snapshot, compact_lock)
+                    return
+                with self._lock:
+                    os.rename(self.journal_path, self.compacting_path)
+                    self._offset, self._generation = 0, None
+                    snapshot = self._copy_state()
+                self._compactor = Thread(target=self._write_snapshot, args=(snapshot, compact_lock), daemon=True)
+                self._compactor.start()
+            except BaseException:
+                compact_lock.close()
+                raise
+        if wait and self._compactor is not None:
+            self._compactor.join()
+
+    def _try_compact_lock(self):
+        """Verrou de compaction pris sans attendre (fichier ouvert), ou None s'il est déjà pris"""
+        os.makedirs(os.path.dirname(self.compact_lock_path) or '.', exist_ok=True)
+        lock_file = open(self.compact_lock_path, 'a+b')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return None
+        return lock_file
+
+    def _copy_state(self):
+        return type(self.state)(self.state)
+
+    def _write_snapshot(self, snapshot, compact_lock):
+        try:
+            tmp_path = self.snapshot_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            # Remplacement et suppression sous le verrou exclusif : load() voit l'un ou l'autre état, jamais un mélange
+            with self._exclusive():
+                os.replace(tmp_path, self.snapshot_path)
+                os.remove(self.compacting_path)
+        finally:
+            compact_lock.close()
+
+    def _journal_position(self):
+        """(taille, génération) du journal ; la génération est (inode, identifiant d'en-tête)"""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                header = f.readline(256)
+        except FileNotFoundError:
+            return 0, None
+        return stat.st_size, (stat.st_ino, _journal_id(header))
+
+    def _repair_tail(self):
+        """Retire une dernière ligne incomplète laissée par un crash, sans verrou si le journal est intact"""
+        if self._tail_complete():
+            return
+        with self._exclusive():
+            self._truncate_partial()
+
+    def _tail_complete(self):
+        try:
+            with open(self.journal_path, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                if size == 0:
+                    return True
+                f.seek(size - 1)
+                return f.read(1) == b'\n'
+        except FileNotFoundError:
+            return True
+
+    def _truncate_partial(self):
+        """Tronque le journal après sa dernière ligne complète (sous le verrou exclusif).
+
+        Une écriture se fait entièrement sous ce verrou : une ligne
+        incomplète vue ici ne peut être que le reste d'une écriture
+        interrompue, qu'aucun lecteur n'a intégrée.
+        """
+        if self._tail_complete():
+            return
+        with open(self.journal_path, 'r+b') as f:
+            end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(0, end - TAIL_CHUNK)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b'\n')
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            logger.warning("Journal %s : dernière ligne incomplète retirée (%d octets)",
+                           self.journal_path, f.seek(0, os.SEEK_END) - end)
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _read_records(path, offset):
+        """Lit les enregistrements complets à partir d'un offset ; retourne (enregistrements, nouvel offset)"""
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], offset
+        # Une dernière ligne sans retour à la ligne est une écriture en cours
+        end = data.rfind(b'\n') + 1
+        records = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict):
+                logger.warning("Journal %s : ligne illisible ignorée : %.80r", path, line)
+                continue
+            if record.get('op') != 'journal':
+                records.append(record)
+        return records, offset + end
+
+
+class BallotJournal(VoteJournal):
+    """Journal des bulletins par participant ({participant: {timestamp, votes}}).
+
+    Un ancien instantané au format liste (routes/modules.py) et ses
+    enregistrements 'extend' sont convertis en bulletins anonymes.
+    """
+
+    def empty_state(self):
+        return {}
+
+    def restore(self, data):
+        if isinstance(data, list):
+            return legacy_ballots(data)
+        return data
+
+    def apply(self, state, record):
+        if record['op'] == 'extend':
+            for participant, ballot in legacy_ballots(record['votes']).items():
+                state.setdefault(participant, ballot)
+            return None
+        participant = record['participant']
+        previous = state.get(participant)
+        if record['op'] == 'put':
+            current = {'timestamp': record['timestamp'], 'votes': record['votes']}
+            state[participant] = current
+        else:
+            current = None
+            if previous is None:
+                return None
+            del state[participant]
+        return participant, previous, current
+
+    def put(self, participant, vote_data):
+        self.append({'op': 'put', 'participant': participant, **vote_data})
+
+    def delete(self, participant):
+        self.append({'op': 'delete', 'participant': participant})
+
+
+class JournalVoteStorage(VoteStorage):
+    """Stockage des votes adossé à un BallotJournal.
+
+    L'état rejoué est déjà en mémoire : snapshot() ne copie rien et les
+    observateurs (agrégat, diffusion SSE) suivent chaque changement, y
+    compris ceux écrits par d'autres processus.
+    """
+
+    def __init__(self, snapshot_path, compact_threshold=COMPACT_THRESHOLD):
+        self.journal = BallotJournal(snapshot_path, compact_threshold)
+        self.journal.load()
+
+    def subscribe(self, observer):
+        self.journal.subscribe(observer)
+
+    def version(self):
+        self.journal.sync()
+        return self.journal.version
+
+    def snapshot(self):
+        state = self.journal.sync()
+        return self.journal.version, state
+
+    def get(self, participant):
+        return self.journal.sync().get(participant)
+
+    def put(self, participant, vote_data):
+        self.journal.put(participant, vote_data)
+
+    def put_many(self, ballots):
+        self.journal.append_many([
+            {'op': 'put', 'participant': participant, **vote_data}
+            for participant, vote_data in ballots.items()
+        ])
+
+    def delete(self, participant):
+        if participant not in self.journal.sync():
+            return False
+        self.journal.delete(participant)
+        return True
+
+    def _document_path(self, name):
+        return os.path.splitext(self.journal.snapshot_path)[0] + f'.{name}.json'
+
+    def get_document(self, name):
+        try:
+            with open(self._document_path(name), 'r', encoding='utf-8') as f:
+                document = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        document['body'] = document['body'].encode('utf-8')
+        return document
+
+    def put_document(self, name, document):
+        # Écriture atomique : les lecteurs voient l'ancien document ou le nouveau
+        path = self._document_path(name)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({**document, 'body': document['body'].decode('utf-8')}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
@@ -0,0 +1,156 @@
+import os
+import time
+from bisect import bisect_left
+from threading import Lock
+
+# Bornes (secondes) des histogrammes de latence
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Type de contenu de l'exposition texte Prometheus
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Histogram:
+    __slots__ = ('counts', 'total')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.total = 0.0
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe_stage(self.stage, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _labels(names, values):
+    return ','.join('%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                    for name, value in zip(names, values))
+
+
+class Metrics:
+    """Métriques des requêtes et des étapes du chemin critique, au format Prometheus.
+
+    Histogrammes de latence par route, compteurs de requêtes par statut,
+    durée des accès au stockage, de l'agrégation et de la sérialisation
+    JSON, exceptions par type et requêtes regroupées sur un calcul en
+    cours. Désactivé, chaque mesure se réduit à un test de booléen et
+    stage() retourne un contexte vide partagé.
+    """
+
+    def __init__(self, enabled=True, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._requests = {}
+        self._durations = {}
+        self._stages = {}
+        self._exceptions = {}
+        self._coalesced = {}
+        self._lock = Lock()
+
+    @classmethod
+    def from_environ(cls, environ=os.environ):
+        """Métriques activées sauf si METRICS_ENABLED vaut 0"""
+        return cls(enabled=environ.get('METRICS_ENABLED', '1') not in ('0', 'false', 'no'))
+
+    def _observe(self, histograms, key, duration):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms.setdefault(key, _Histogram(len(self.buckets) + 1))
+        histogram.counts[bisect_left(self.buckets, duration)] += 1
+        histogram.total += duration
+
+    def observe_request(self, method, route, status, duration):
+        if not self.enabled:
+            return
+        with self._lock:
+            key = (method, route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._observe(self._durations, (method, route), duration)
+
+    def observe_stage(self, stage, duration):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._observe(self._stages, (stage,), duration)
+
+    def observe_exception(self, exception):
+        if not self.enabled:
+            return
+        with self._lock:
+            key = (type(exception).__name__,)
+            self._exceptions[key] = self._exceptions.get(key, 0) + 1
+
+    def observe_coalesced(self, view):
+        """Compte une requête qui a attendu le calcul en cours d'une vue au lieu de le refaire"""
+        if not self.enabled:
+            return
+        with self._lock:
+            key = (view,)
+            self._coalesced[key] = self._coalesced.get(key, 0) + 1
+
+    def stage(self, name):
+        """Contexte chronométrant une étape ('store', 'aggregate', 'serialize')"""
+        return _StageTimer(self, name) if self.enabled else _NULL_TIMER
+
+    def _render_histogram(self, lines, name, label_names, histograms):
+        for key, histogram in sorted(histograms.items()):
+            labels = _labels(label_names, key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), histogram.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('%s_bucket{%s,le="%s"} %d' % (name, labels, le, cumulative))
+            lines.append('%s_sum{%s} %r' % (name, labels, histogram.total))
+            lines.append('%s_count{%s} %d' % (name, labels, cumulative))
+
+    def render(self):
+        """Exposition au format texte Prometheus (octets)"""
+        lines = []
+        with self._lock:
+            lines += ['# HELP http_requests_total Requêtes traitées par route et statut.',
+                      '# TYPE http_requests_total counter']
+            lines += ['http_requests_total{%s} %d' % (_labels(('method', 'route', 'status'), key), count)
+                      for key, count in sorted(self._requests.items())]
+            lines += ['# HELP http_request_duration_seconds Durée des requêtes par route.',
+                      '# TYPE http_request_duration_seconds histogram']
+            self._render_histogram(lines, 'http_request_duration_seconds', ('method', 'route'), self._durations)
+            lines += ['# HELP votes_stage_duration_seconds Durée des étapes : stockage, agrégation, sérialisation JSON.',
+                      '# TYPE votes_stage_duration_seconds histogram']
+            self._render_histogram(lines, 'votes_stage_duration_seconds', ('stage',), self._stages)
+            lines += ['# HELP http_exceptions_total Exceptions levées par les gestionnaires, par type.',
+                      '# TYPE http_exceptions_total counter']
+            lines += ['http_exceptions_total{%s} %d' % (_labels(('type',), key), count)
+                      for key, count in sorted(self._exceptions.items())]
+            lines += ['# HELP votes_coalesced_requests_total Requêtes servies par un calcul déjà en cours (single flight).',
+                      '# TYPE votes_coalesced_requests_total counter']
+            lines += ['votes_coalesced_requests_total{%s} %d' % (_labels(('view',), key), count)
+                      for key, count in sorted(self._coalesced.items())]
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+# Métriques désactivées : valeur par défaut des composants instrumentés
+NO_METRICS = Metrics(enabled=False)
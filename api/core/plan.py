@@ -0,0 +1,163 @@
+import math
+import re
+from array import array
+from collections import OrderedDict
+from threading import Lock
+
+from .aggregate import PRIORITIES
+
+# Poids par défaut des priorités 1, 2 et 3 dans le score d'un module
+DEFAULT_WEIGHTS = (3.0, 2.0, 1.0)
+
+# Résolution du sac à dos : les durées sont arrondies au quart d'heure
+# supérieur, le budget au quart d'heure inférieur, pour ne jamais le dépasser
+UNITS_PER_HOUR = 4
+
+# Budget maximal accepté, en heures
+MAX_BUDGET_HOURS = 2000
+
+# Nombre de tables de programmation dynamique gardées en cache
+PLAN_CACHE_SIZE = 32
+
+_DURATION = re.compile(
+    r'^\s*(?:(?P<hours>\d+(?:[.,]\d+)?)\s*(?:h|heures?|hours?)\s*(?P<minutes_part>\d+)?\s*(?:min(?:utes?)?)?'
+    r'|(?P<minutes>\d+)\s*min(?:utes?)?)\s*$',
+    re.IGNORECASE)
+
+
+def parse_duration(text):
+    """Durée en heures d'un libellé ('4 heures', '1h30', '90 minutes'), ou None s'il est illisible"""
+    match = _DURATION.match(text or '')
+    if match is None:
+        return None
+    if match['minutes']:
+        return int(match['minutes']) / 60
+    hours = float(match['hours'].replace(',', '.'))
+    return hours + int(match['minutes_part'] or 0) / 60
+
+
+def parse_weights(text):
+    """Poids des priorités 1, 2, 3 depuis '3,2,1' ; DEFAULT_WEIGHTS si text est vide"""
+    if not text:
+        return DEFAULT_WEIGHTS
+    try:
+        weights = tuple(float(weight) for weight in text.split(','))
+    except ValueError:
+        raise ValueError("Les poids doivent être des nombres, ex. weights=3,2,1")
+    if len(weights) != len(PRIORITIES) or any(weight < 0 or not math.isfinite(weight) for weight in weights):
+        raise ValueError("Trois poids positifs sont attendus (priorités 1, 2 et 3), ex. weights=3,2,1")
+    return weights
+
+
+def parse_budget(text):
+    """Budget en heures (0 < budget <= MAX_BUDGET_HOURS)"""
+    try:
+        budget = float(text)
+    except (TypeError, ValueError):
+        raise ValueError("budget_hours doit être un nombre d'heures")
+    if not 0 < budget <= MAX_BUDGET_HOURS:
+        raise ValueError(f"budget_hours doit être compris entre 0 et {MAX_BUDGET_HOURS}")
+    return budget
+
+
+class TrainingPlanner:
+    """Plan de formation : meilleur ensemble de modules dans un budget d'heures.
+
+    Le score d'un module est la somme pondérée de ses votes par priorité.
+    La sélection est un sac à dos 0/1 résolu exactement par programmation
+    dynamique sur les durées en quarts d'heure, en O(modules × budget).
+    Les tables sont gardées en cache (LRU) par (version des votes, poids,
+    budget) : un plan déjà demandé est reconstruit sans recalcul.
+    """
+
+    def __init__(self, cache_size=PLAN_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._tables = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def _candidates(module_votes, weights):
+        """Modules de score positif et de durée lisible : (module, heures, unités, score, votes) ; et les durées illisibles"""
+        candidates = []
+        unreadable = []
+        for module, p1, p2, p3, total in module_votes:
+            hours = parse_duration(module.get('duration'))
+            if hours is None:
+                unreadable.append(module['title'])
+                continue
+            score = weights[0] * p1 + weights[1] * p2 + weights[2] * p3
+            if score > 0:
+                votes = {'priority_1': p1, 'priority_2': p2, 'priority_3': p3, 'total': total}
+                candidates.append((module, hours, math.ceil(hours * UNITS_PER_HOUR - 1e-9), score, votes))
+        return candidates, unreadable
+
+    @staticmethod
+    def _solve(candidates, capacity):
+        """Table best[i][c] : meilleur score des i premiers candidats en c unités"""
+        table = [array('d', bytes(8 * (capacity + 1)))]
+        for _, _, units, score, _ in candidates:
+            previous = table[-1]
+            row = previous[:]
+            for used in range(units, capacity + 1):
+                candidate = previous[used - units] + score
+                if candidate > row[used]:
+                    row[used] = candidate
+            table.append(row)
+        return table
+
+    def _table(self, key, candidates, capacity):
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                return table
+        table = self._solve(candidates, capacity)
+        with self._lock:
+            self._tables[key] = table
+            while len(self._tables) > self.cache_size:
+                self._tables.popitem(last=False)
+        return table
+
+    def plan(self, version, module_votes, budget_hours, weights=DEFAULT_WEIGHTS):
+        """Plan optimal pour un budget en heures.
+
+        module_votes : (module, p1, p2, p3, total) comme VoteAggregate.module_votes.
+        À score égal, le plan le plus court est retenu.
+        """
+        candidates, unreadable = self._candidates(module_votes, weights)
+        capacity = int(budget_hours * UNITS_PER_HOUR)
+        table = self._table((version, weights, capacity), candidates, capacity)
+
+        best = table[-1]
+        used = min(units for units in range(capacity + 1) if best[units] == best[capacity])
+        selected = set()
+        for index in range(len(candidates), 0, -1):
+            if table[index][used] != table[index - 1][used]:
+                selected.add(index - 1)
+                used -= candidates[index - 1][2]
+
+        plan = [candidates[index] for index in sorted(selected)]
+        total_hours = sum(hours for _, hours, _, _, _ in plan)
+        return {
+            'budget_hours': budget_hours,
+            'weights': {f'priority_{priority}': weight for priority, weight in zip(PRIORITIES, weights)},
+            'modules': [
+                {
+                    'moduleId': module['id'],
+                    'module': module['title'],
+                    'duration': module['duration'],
+                    'hours': hours,
+                    'score': score,
+                    'votes': votes
+                }
+                for module, hours, _, score, votes in plan
+            ],
+            'summary': {
+                'total_hours': total_hours,
+                'remaining_hours': budget_hours - total_hours,
+                'total_score': sum(score for _, _, _, score, _ in plan),
+                'selected_modules': len(plan),
+                'candidate_modules': len(candidates),
+                'unreadable_durations': unreadable
+            }
+        }
@@ -0,0 +1,283 @@
+import json
+import os
+from datetime import datetime
+from threading import Lock
+
+from .aggregate import PRIORITIES, VoteAggregate
+from .cache import encode_json
+from .catalog import DATA_DIR, normalize_module_id, sessions_dir
+from .metrics import NO_METRICS
+from .timeline import VoteTimeline
+
+# Nombre de bulletins enregistrés par écriture lors d'un import en masse
+BULK_BATCH_SIZE = 500
+
+# Nombre maximal d'erreurs détaillées dans le rapport d'un import
+BULK_MAX_ERRORS = 100
+
+# Backends qui ne savent pas séparer les votes par session
+UNSHARDED_STORAGES = ('sql',)
+
+
+def create_storage(kind, environ=os.environ, session=None):
+    """Crée un backend de stockage des votes.
+
+    kind vaut 'journal' (fichier JSON + journal), 'sql' (table vote via
+    Flask-SQLAlchemy), 'sqlite' (fichier SQLite local), 'table' (Azure
+    Table Storage ou Azurite) ou 'memory'. Les backends partagés entre
+    instances sont servis derrière un cache de lecture à TTL court.
+
+    Les votes d'une session (session non None) forment un fragment séparé :
+    votes.json du dossier de la session, fichier SQLite dédié ou partition
+    Azure Table dédiée.
+    """
+    from .storage import CACHE_TTL, CachedVoteStorage, MemoryVoteStorage, TableVoteStorage
+
+    if kind == 'journal':
+        from .journal import JournalVoteStorage
+        if session is not None:
+            return JournalVoteStorage(os.path.join(sessions_dir(environ), session, 'votes.json'))
+        return JournalVoteStorage(environ.get('VOTES_FILE', os.path.join(DATA_DIR, 'votes.json')))
+    if kind == 'sql':
+        if session is not None:
+            raise ValueError("Le stockage 'sql' ne gère pas les sessions")
+        from .sql_store import SqlVoteStorage
+        return SqlVoteStorage()
+    if kind == 'memory':
+        return MemoryVoteStorage()
+    if kind == 'sqlite':
+        import tempfile
+        from .storage import SqliteVoteStorage
+        path = environ.get('VOTES_DB_PATH', os.path.join(tempfile.gettempdir(), 'votes.db'))
+        if session is not None:
+            root, extension = os.path.splitext(path)
+            path = f'{root}-{session}{extension}'
+        backend = SqliteVoteStorage(path)
+    elif kind == 'table':
+        connection_string = environ.get('VOTES_STORAGE_CONNECTION') or environ.get('AzureWebJobsStorage')
+        partition = TableVoteStorage.PARTITION if session is None else f'{TableVoteStorage.PARTITION}-{session}'
+        backend = TableVoteStorage(connection_string, environ.get('VOTES_TABLE', 'votes'), partition)
+    else:
+        raise ValueError(f"Stockage des votes inconnu : {kind}")
+    return CachedVoteStorage(backend, ttl=float(environ.get('VOTES_CACHE_TTL', CACHE_TTL)))
+
+
+class VotingService:
+    """Règles du sondage partagées par tous les front-ends.
+
+    Valide et enregistre les bulletins dans le stockage, et fournit
+    l'agrégat des résultats par le chemin le plus rapide du backend :
+    agrégat tenu à jour par delta si le stockage est observable (journal),
+    GROUP BY s'il sait agréger (SQL), sinon recalcul à chaque version.
+    La chronologie est toujours tenue par delta : par les notifications du
+    stockage observable, sinon par les écritures du service et, pour celles
+    des autres processus, par comparaison avec l'instantané d'une nouvelle
+    version (seuls les bulletins modifiés sont recomptés).
+    Les observateurs (diffusion SSE) reçoivent chaque changement de bulletin.
+    Les accès au stockage et l'agrégation sont chronométrés dans metrics.
+    """
+
+    def __init__(self, catalog, storage, metrics=NO_METRICS):
+        self.catalog = catalog
+        self.storage = storage
+        self.metrics = metrics
+        self.observers = []
+        self._observable = hasattr(storage, 'subscribe')
+        self._live = None
+        self._live_timeline = VoteTimeline()
+        self._rebuilt = (None, None)
+        # Stockage non observable : bulletins comptés dans la chronologie, et version de l'instantané comparé
+        self._timeline_votes = {}
+        self._timeline_version = None
+        self._lock = Lock()
+        if self._observable:
+            self._live = VoteAggregate()
+            storage.subscribe(self._live)
+            storage.subscribe(self._live_timeline)
+
+    def subscribe(self, observer):
+        if self._observable:
+            self.storage.subscribe(observer)
+        else:
+            self.observers.append(observer)
+
+    def _notify(self, participant, previous, current):
+        if not self._observable:
+            self._track(participant, current)
+        for observer in self.observers:
+            observer.apply_change(participant, previous, current)
+
+    def validate(self, participant, votes):
+        """Retourne le message d'erreur d'un bulletin invalide, ou None"""
+        if not participant:
+            return "Participant requis"
+        if not self.catalog.is_participant(participant):
+            return "Participant non autorisé"
+        if not votes:
+            return "Aucun vote fourni"
+        if not isinstance(votes, dict):
+            return "Les votes doivent être un objet {module: priorité}"
+        # Entier strict : 1.0 ou True ne sont pas des priorités
+        if any(type(priority) is not int or priority not in PRIORITIES for priority in votes.values()):
+            return "La priorité doit être 1, 2 ou 3"
+        for module_id in votes:
+            if normalize_module_id(module_id) not in self.catalog.module_index:
+                return f"Module inconnu : {module_id}"
+        return None
+
+    @staticmethod
+    def _ballot(votes, timestamp=None):
+        return {
+            'timestamp': timestamp or datetime.now().isoformat(),
+            'votes': {normalize_module_id(module_id): priority for module_id, priority in votes.items()}
+        }
+
+    def submit(self, participant, votes, timestamp=None):
+        """Enregistre (ou remplace) le bulletin d'un participant et le retourne"""
+        vote_data = self._ballot(votes, timestamp)
+        with self.metrics.stage('store'):
+            previous = self.storage.get(participant) if self.observers else None
+            self.storage.put(participant, vote_data)
+        self._notify(participant, previous, vote_data)
+        return vote_data
+
+    def submit_many(self, ballots):
+        """Enregistre des bulletins déjà validés en une seule écriture"""
+        with self.metrics.stage('store'):
+            previous = {participant: self.storage.get(participant) for participant in ballots} if self.observers else {}
+            self.storage.put_many(ballots)
+        for participant, vote_data in ballots.items():
+            self._notify(participant, previous.get(participant), vote_data)
+
+    def _parse_ballot(self, line):
+        """Lit et valide une ligne NDJSON ; retourne (participant, bulletin) ou lève ValueError"""
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise ValueError("JSON invalide")
+        if not isinstance(record, dict):
+            raise ValueError("Chaque ligne doit être un objet {participant, votes}")
+        participant = record.get('participant')
+        votes = record.get('votes')
+        error = self.validate(participant, votes)
+        if error:
+            raise ValueError(error)
+        timestamp = record.get('timestamp')
+        if timestamp is not None:
+            try:
+                datetime.fromisoformat(timestamp)
+            except (TypeError, ValueError):
+                raise ValueError("Horodatage invalide")
+        return participant, self._ballot(votes, timestamp)
+
+    def import_ballots(self, lines, batch_size=BULK_BATCH_SIZE):
+        """Importe des bulletins NDJSON ({participant, votes[, timestamp]} par ligne).
+
+        Les lignes sont validées au fil de la lecture et les bulletins
+        valides enregistrés par lots : la mémoire reste bornée quelle que
+        soit la taille de l'import. Les lignes invalides sont ignorées et
+        signalées dans le rapport.
+        """
+        imported = 0
+        error_count = 0
+        errors = []
+        batch = {}
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                participant, vote_data = self._parse_ballot(line)
+            except ValueError as e:
+                error_count += 1
+                if len(errors) < BULK_MAX_ERRORS:
+                    errors.append({'line': line_number, 'error': str(e)})
+                continue
+            batch[participant] = vote_data
+            if len(batch) >= batch_size:
+                self.submit_many(batch)
+                imported += len(batch)
+                batch = {}
+        if batch:
+            self.submit_many(batch)
+            imported += len(batch)
+        return {'imported': imported, 'error_count': error_count, 'errors': errors}
+
+    def export_ballots(self):
+        """Générateur NDJSON des bulletins, une ligne par participant"""
+        for participant, vote_data in self.storage.iter_ballots():
+            yield encode_json({
+                'participant': participant,
+                'timestamp': vote_data['timestamp'],
+                'votes': vote_data['votes']
+            }) + b'\n'
+
+    def reset(self, participant):
+        """Supprime le bulletin d'un participant ; retourne False s'il n'existait pas"""
+        with self.metrics.stage('store'):
+            previous = self.storage.get(participant) if self.observers else None
+            deleted = self.storage.delete(participant)
+        if not deleted:
+            return False
+        self._notify(participant, previous, None)
+        return True
+
+    def participant_votes(self, participant):
+        """Votes d'un participant ({module_id: priorité}), ou None s'il n'a pas voté"""
+        with self.metrics.stage('store'):
+            vote_data = self.storage.get(participant)
+        return vote_data['votes'] if vote_data else None
+
+    def version(self):
+        """Version des votes, qui change à chaque modification"""
+        with self.metrics.stage('store'):
+            return self.storage.version()
+
+    def aggregate(self):
+        """Agrégat des résultats à jour"""
+        if self._live is not None:
+            self.version()  # intègre les écritures des autres processus
+            return self._live
+        if hasattr(self.storage, 'aggregate'):
+            # GROUP BY : l'agrégation a lieu dans la base
+            with self.metrics.stage('store'):
+                return self.storage.aggregate()
+        with self.metrics.stage('store'):
+            version, votes = self.storage.snapshot()
+        with self._lock:
+            if self._rebuilt[0] != version or self._rebuilt[1] is None:
+                with self.metrics.stage('aggregate'):
+                    self._rebuilt = (version, VoteAggregate.from_votes(votes))
+            return self._rebuilt[1]
+
+    def _track(self, participant, vote_data):
+        """Reporte dans la chronologie un bulletin écrit (ou supprimé) par ce service"""
+        with self._lock:
+            self._timeline_votes.pop(participant, None)
+            if vote_data is not None:
+                self._timeline_votes[participant] = vote_data
+            self._live_timeline.apply_change(participant, None, vote_data)
+
+    def _reconcile_timeline(self, votes):
+        """Aligne la chronologie sur un instantané : seuls les bulletins différents sont recomptés"""
+        known = self._timeline_votes
+        for participant in [participant for participant in known if participant not in votes]:
+            del known[participant]
+            self._live_timeline.apply_change(participant, None, None)
+        for participant, vote_data in votes.items():
+            if known.get(participant) != vote_data:
+                known[participant] = vote_data
+                self._live_timeline.apply_change(participant, None, vote_data)
+
+    def timeline(self):
+        """Chronologie des votes à jour, tenue par delta"""
+        if self._observable:
+            self.version()  # intègre les écritures des autres processus
+            return self._live_timeline
+        with self.metrics.stage('store'):
+            version, votes = self.storage.snapshot()
+        with self._lock:
+            if self._timeline_version != version:
+                with self.metrics.stage('aggregate'):
+                    self._reconcile_timeline(votes)
+                self._timeline_version = version
+            return self._live_timeline
@@ -0,0 +1,216 @@
+import os
+import time
+from threading import Lock
+
+from .aggregate import VoteAggregate
+from .cache import CACHE_CONTROL, PayloadCache, etag_matches, make_etag
+from .catalog import CHECK_INTERVAL, is_session_id, load_catalog, sessions_dir
+from .metrics import NO_METRICS
+from .plan import TrainingPlanner
+from .service import UNSHARDED_STORAGES, VotingService, create_storage
+
+# Session des données historiques (data/participants.json, modules.json, votes)
+DEFAULT_SESSION = 'default'
+
+# Nom du document des résultats matérialisés dans le stockage
+RESULTS_DOCUMENT = 'results'
+
+# Durée (secondes) pendant laquelle le document matérialisé lu est servi depuis la mémoire
+DOCUMENT_TTL = 5.0
+
+
+class Session:
+    """Sondage d'une cohorte : ses participants, son catalogue et son fragment de votes"""
+
+    def __init__(self, session_id, catalog, voting, results_cache=None):
+        self.id = session_id
+        self.catalog = catalog
+        self.voting = voting
+        self.results_cache = results_cache or PayloadCache(voting.metrics)
+        self.planner = TrainingPlanner()
+        self._document = None
+        self._document_expires = 0.0
+
+    def compute_results(self):
+        aggregate = self.voting.aggregate()
+        with self.voting.metrics.stage('aggregate'):
+            return aggregate.results(self.catalog.modules)
+
+    def results(self, if_none_match=None):
+        """(statut, corps, en-têtes) des résultats de la session, mis en cache par version"""
+        return self.results_cache.conditional(
+            'results', self.voting.version(), self.compute_results, if_none_match)
+
+    def timeline(self, bucket, if_none_match=None):
+        """(statut, corps, en-têtes) de la chronologie des votes par intervalle, mise en cache par version.
+
+        Lève ValueError pour un intervalle autre que 1m, 1h ou 1d.
+        """
+
+        def compute_timeline():
+            timeline = self.voting.timeline()
+            with self.voting.metrics.stage('aggregate'):
+                return timeline.series(bucket, self.catalog.modules)
+
+        return self.results_cache.conditional(
+            f'timeline:{bucket}', self.voting.version(), compute_timeline, if_none_match)
+
+    def plan(self, budget_hours, weights, if_none_match=None):
+        """(statut, corps, en-têtes) du plan de formation optimal pour un budget en heures et des poids de priorités"""
+        version = self.voting.version()
+
+        def compute_plan():
+            module_votes = self.voting.aggregate().module_votes(self.catalog.modules)
+            with self.voting.metrics.stage('aggregate'):
+                return self.planner.plan(version, module_votes, budget_hours, weights)
+
+        return self.results_cache.conditional('plan', (version, weights, budget_hours), compute_plan, if_none_match)
+
+    def materialize(self):
+        """Calcule les résultats et les enregistre dans le stockage avec leur version ; retourne la version"""
+        version = self.voting.version()
+        body, etag = self.results_cache.get('results', version, self.compute_results)
+        document = {
+            'body': body,
+            'etag': etag,
+            'version': str(version),
+            'materialized_at': time.time()
+        }
+        self.voting.storage.put_document(RESULTS_DOCUMENT, document)
+        self._document, self._document_expires = document, time.monotonic() + DOCUMENT_TTL
+        return version
+
+    def _materialized_document(self):
+        """Document matérialisé, relu dans le stockage au plus toutes les DOCUMENT_TTL secondes"""
+        if time.monotonic() < self._document_expires:
+            return self._document
+        document = self.voting.storage.get_document(RESULTS_DOCUMENT)
+        if document is not None and not document.get('etag'):
+            document['etag'] = make_etag(document['body'])
+        self._document, self._document_expires = document, time.monotonic() + DOCUMENT_TTL
+        return document
+
+    def materialized_results(self, max_staleness, if_none_match=None):
+        """(statut, corps, en-têtes) depuis le document matérialisé.
+
+        Si le document manque ou date de plus de max_staleness secondes, les
+        résultats sont calculés à la demande. L'en-tête Age donne l'ancienneté
+        du document servi, X-Results-Source sa provenance. Le document et son
+        ETag, calculé à la matérialisation, sont gardés en mémoire DOCUMENT_TTL
+        secondes : une requête ne relit pas le stockage et ne hache pas le corps.
+        """
+        document = self._materialized_document()
+        age = time.time() - document['materialized_at'] if document is not None else None
+        if document is None or age > max_staleness:
+            status, body, headers = self.results(if_none_match)
+            return status, body, {**headers, 'Age': '0', 'X-Results-Source': 'computed'}
+        etag = document['etag']
+        headers = {
+            'ETag': etag,
+            'Cache-Control': CACHE_CONTROL,
+            'Age': str(max(0, int(age))),
+            'X-Results-Source': 'materialized',
+            'X-Results-Version': document['version']
+        }
+        if etag_matches(if_none_match, etag):
+            return 304, b'', headers
+        return 200, document['body'], headers
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'participants': len(self.catalog.participants),
+            'modules': len(self.catalog.modules)
+        }
+
+
+class SessionRegistry:
+    """Sessions de sondage ouvertes à la demande, chacune isolée des autres.
+
+    Une session est un dossier de SESSIONS_DIR contenant participants.json
+    et modules.json ; ses votes vont dans un fragment de stockage dédié.
+    Chaque session a son propre service, son agrégat, ses verrous et son
+    cache de réponses : une grande session ne ralentit pas les autres. La
+    consolidation fusionne les agrégats des sessions, sans relire les votes.
+    Avec un stockage qui ne sait pas fragmenter les votes (UNSHARDED_STORAGES),
+    seule la session par défaut existe : les dossiers de SESSIONS_DIR sont ignorés.
+    """
+
+    def __init__(self, storage_kind, default=None, environ=os.environ, metrics=NO_METRICS,
+                 check_interval=CHECK_INTERVAL):
+        self.storage_kind = storage_kind
+        self.sharded = storage_kind not in UNSHARDED_STORAGES
+        self.environ = environ
+        self.metrics = metrics
+        self.root = sessions_dir(environ)
+        self.check_interval = check_interval
+        self._sessions = {DEFAULT_SESSION: default} if default is not None else {}
+        self._ids = None
+        self._next_scan = 0.0
+        self._rollups = PayloadCache(metrics)
+        self._lock = Lock()
+
+    def ids(self):
+        """Identifiants des sessions, dossiers relus au plus toutes les check_interval secondes"""
+        if self._ids is None or time.monotonic() >= self._next_scan:
+            try:
+                names = os.listdir(self.root) if self.sharded else []
+            except FileNotFoundError:
+                names = []
+            found = sorted(
+                name for name in names
+                if is_session_id(name) and name != DEFAULT_SESSION
+                and os.path.isfile(os.path.join(self.root, name, 'participants.json'))
+                and os.path.isfile(os.path.join(self.root, name, 'modules.json'))
+            )
+            self._ids = ([DEFAULT_SESSION] if DEFAULT_SESSION in self._sessions else []) + found
+            self._next_scan = time.monotonic() + self.check_interval
+        return self._ids
+
+    def get(self, session_id):
+        """Session ouverte (créée au premier accès), ou None si elle n'existe pas"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            return session
+        if not self.sharded or not is_session_id(session_id) or session_id == DEFAULT_SESSION:
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session_dir = os.path.join(self.root, session_id)
+                try:
+                    catalog = load_catalog(session_dir)
+                except FileNotFoundError:
+                    return None
+                storage = create_storage(self.storage_kind, self.environ, session=session_id)
+                session = Session(session_id, catalog, VotingService(catalog, storage, self.metrics))
+                self._sessions[session_id] = session
+            return session
+
+    def _rollup_payload(self, sessions):
+        aggregate = VoteAggregate.merge({session.id: session.voting.aggregate() for session in sessions})
+        # Catalogue consolidé : union des modules, dans l'ordre des sessions
+        modules = {}
+        for session in sessions:
+            for module in session.catalog.modules:
+                modules.setdefault(module['id'], module)
+        with self.metrics.stage('aggregate'):
+            results = aggregate.results(list(modules.values()))
+        results['sessions'] = [session.id for session in sessions]
+        return results
+
+    def rollup(self, session_ids=None, if_none_match=None):
+        """(statut, corps, en-têtes) des résultats consolidés des sessions (toutes par défaut).
+
+        Lève KeyError pour une session inconnue. La réponse est mise en
+        cache par combinaison des versions des sessions.
+        """
+        sessions = []
+        for session_id in session_ids or self.ids():
+            session = self.get(session_id)
+            if session is None:
+                raise KeyError(session_id)
+            sessions.append(session)
+        view = 'rollup:' + ','.join(session.id for session in sessions)
+        key = tuple(session.voting.version() for session in sessions)
+        return self._rollups.conditional(view, key, lambda: self._rollup_payload(sessions), if_none_match)
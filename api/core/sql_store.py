@@ -0,0 +1,150 @@
+"""Stockage des votes dans SQLite (table vote, via Flask-SQLAlchemy).
+
+Les méthodes doivent être appelées dans un contexte d'application Flask
+dont l'extension db est initialisée. Ce module n'est importé que lorsque
+le backend SQL est choisi, Flask-SQLAlchemy restant optionnel.
+"""
+from datetime import datetime
+
+from sqlalchemy import case, delete, func, insert, select, update
+
+from models.user import db
+from models.vote import Vote, VoteVersion
+
+from .aggregate import PRIORITIES, VoteAggregate
+from .catalog import anonymous_participant, normalize_module_id
+from .journal import BallotJournal
+from .storage import VoteStorage
+
+
+def _isoformat(timestamp):
+    return timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp
+
+
+class SqlVoteStorage(VoteStorage):
+    """Bulletins stockés une ligne par vote dans la table vote.
+
+    Les anciens votes anonymes (participant NULL) d'une même soumission
+    forment un bulletin identifié par leur horodatage. aggregate() calcule les
+    résultats par GROUP BY, sans charger les votes en mémoire.
+    """
+
+    def version(self):
+        """Version des votes, partagée par tous les processus utilisant la base"""
+        return db.session.scalar(select(VoteVersion.version).where(VoteVersion.id == 1)) or 0
+
+    def _bump_version(self):
+        """Incrémente la version dans la transaction de l'écriture en cours"""
+        updated = db.session.execute(
+            update(VoteVersion).where(VoteVersion.id == 1).values(version=VoteVersion.version + 1)
+        ).rowcount
+        if not updated:
+            db.session.add(VoteVersion(id=1, version=1))
+
+    def snapshot(self):
+        version = self.version()
+        votes = {}
+        rows = db.session.execute(
+            select(Vote.participant, Vote.module_id, Vote.priority, Vote.timestamp).order_by(Vote.id)
+        )
+        for participant, module_id, priority, timestamp in rows:
+            timestamp = timestamp.isoformat()
+            ballot = votes.setdefault(participant or anonymous_participant(timestamp), {'timestamp': timestamp, 'votes': {}})
+            ballot['votes'][normalize_module_id(module_id)] = priority
+        return version, votes
+
+    def get(self, participant):
+        rows = db.session.execute(
+            select(Vote.module_id, Vote.priority, Vote.timestamp).where(Vote.participant == participant).order_by(Vote.id)
+        ).all()
+        if not rows:
+            return None
+        return {
+            'timestamp': rows[0][2].isoformat(),
+            'votes': {normalize_module_id(module_id): priority for module_id, priority, _ in rows}
+        }
+
+    def iter_ballots(self):
+        # Lignes triées par bulletin et lues par paquets : les votes d'un bulletin sont consécutifs
+        rows = db.session.execute(
+            select(Vote.participant, Vote.module_id, Vote.priority, Vote.timestamp)
+            .order_by(Vote.participant, Vote.timestamp, Vote.id)
+            .execution_options(yield_per=1000)
+        )
+        key = ballot = None
+        for participant, module_id, priority, timestamp in rows:
+            timestamp = timestamp.isoformat()
+            row_key = participant or anonymous_participant(timestamp)
+            if row_key != key:
+                if ballot is not None:
+                    yield key, ballot
+                key, ballot = row_key, {'timestamp': timestamp, 'votes': {}}
+            ballot['votes'][normalize_module_id(module_id)] = priority
+        if ballot is not None:
+            yield key, ballot
+
+    def put_many(self, ballots, commit=True):
+        participants = list(ballots)
+        db.session.execute(delete(Vote).where(Vote.participant.in_(participants)))
+        rows = []
+        for participant, vote_data in ballots.items():
+            timestamp = datetime.fromisoformat(vote_data['timestamp'])
+            rows.extend(
+                {'participant': participant, 'module_id': module_id, 'priority': priority, 'timestamp': timestamp}
+                for module_id, priority in vote_data['votes'].items()
+            )
+        if rows:
+            db.session.execute(insert(Vote), rows)
+        self._bump_version()
+        if commit:
+            db.session.commit()
+
+    def delete(self, participant):
+        deleted = db.session.execute(delete(Vote).where(Vote.participant == participant)).rowcount
+        if deleted:
+            self._bump_version()
+        db.session.commit()
+        return deleted > 0
+
+    def module_priority_counts(self):
+        """Nombre de votes par module et par priorité (GROUP BY module_id, priority)"""
+        module_stats = {}
+        rows = db.session.execute(
+            select(Vote.module_id, Vote.priority, func.count())
+            .group_by(Vote.module_id, Vote.priority)
+        )
+        for module_id, priority, count in rows:
+            if priority in PRIORITIES:
+                stats = module_stats.setdefault(normalize_module_id(module_id), {p: 0 for p in PRIORITIES})
+                stats[priority] += count
+        return module_stats
+
+    def aggregate(self):
+        """Construit l'agrégat des résultats à partir de requêtes GROUP BY"""
+        # Les votes anonymes sont regroupés par soumission (horodatage)
+        submission = case((Vote.participant.is_(None), Vote.timestamp))
+        participants = db.session.execute(
+            select(Vote.participant, submission, func.count(), func.max(Vote.timestamp))
+            .group_by(Vote.participant, submission)
+            .order_by(func.min(Vote.id))
+        )
+        return VoteAggregate.from_counts(self.module_priority_counts(), [
+            (participant or anonymous_participant(_isoformat(submitted)), vote_count, _isoformat(timestamp))
+            for participant, submitted, vote_count, timestamp in participants
+        ])
+
+
+def migrate_json_votes(snapshot_path):
+    """Importe une seule fois les votes du fichier JSON (et de son journal) dans la table vote.
+
+    Les deux formats existants sont acceptés : bulletins par participant
+    (main.py) et ancienne liste de votes anonymes (routes/modules.py).
+    Retourne le nombre de votes importés, 0 si la table contient déjà des votes.
+    """
+    if db.session.scalar(select(func.count()).select_from(Vote)):
+        return 0
+
+    state = BallotJournal(snapshot_path).load()
+    if state:
+        SqlVoteStorage().put_many(state)
+    return sum(len(vote_data['votes']) for vote_data in state.values())
@@ -0,0 +1,357 @@
+import hashlib
+import json
+import sqlite3
+import time
+from threading import Lock, local
+from urllib.parse import quote
+
+# Durée (secondes) pendant laquelle un instantané des votes est servi depuis la mémoire
+CACHE_TTL = 2.0
+
+# Nombre maximal d'entités par transaction Azure Table (même partition)
+TABLE_BATCH_SIZE = 100
+
+# Taille maximale (octets) d'une propriété binaire Azure Table
+TABLE_PROPERTY_SIZE = 64 * 1024
+
+# Nombre maximal de propriétés binaires d'un document (entité de 1 Mo au plus)
+TABLE_DOCUMENT_CHUNKS = 15
+
+
+class VoteStorage:
+    """Interface des backends de stockage des bulletins.
+
+    Un bulletin est {timestamp, votes} indexé par participant. snapshot()
+    retourne (version, bulletins) : la version change à chaque écriture et
+    est identique d'une instance à l'autre pour un même contenu.
+    """
+
+    def snapshot(self):
+        raise NotImplementedError
+
+    def version(self):
+        """Version courante des votes, sans forcément les relire"""
+        return self.snapshot()[0]
+
+    def get(self, participant):
+        return self.snapshot()[1].get(participant)
+
+    def iter_ballots(self):
+        """Parcourt les bulletins (participant, bulletin) sans les charger tous à la fois"""
+        yield from list(self.snapshot()[1].items())
+
+    def put(self, participant, vote_data):
+        self.put_many({participant: vote_data})
+
+    def put_many(self, ballots):
+        """Enregistre plusieurs bulletins en une seule écriture"""
+        raise NotImplementedError
+
+    def delete(self, participant):
+        """Supprime un bulletin ; retourne False s'il n'existait pas"""
+        raise NotImplementedError
+
+    def get_document(self, name):
+        """Document matérialisé (ex. résultats) : {body, etag, version, materialized_at}, ou None"""
+        raise NotImplementedError(f"{type(self).__name__} ne stocke pas de documents")
+
+    def put_document(self, name, document):
+        """Enregistre un document matérialisé : body (octets), etag et version (texte), materialized_at (epoch)"""
+        raise NotImplementedError(f"{type(self).__name__} ne stocke pas de documents")
+
+
+class MemoryVoteStorage(VoteStorage):
+    """Stockage en mémoire du processus (tests, développement)"""
+
+    def __init__(self):
+        self._votes = {}
+        self._version = 0
+        self._documents = {}
+        self._lock = Lock()
+
+    def snapshot(self):
+        with self._lock:
+            return self._version, dict(self._votes)
+
+    def version(self):
+        return self._version
+
+    def get(self, participant):
+        return self._votes.get(participant)
+
+    def put_many(self, ballots):
+        with self._lock:
+            self._votes.update(ballots)
+            self._version += 1
+
+    def delete(self, participant):
+        with self._lock:
+            if self._votes.pop(participant, None) is None:
+                return False
+            self._version += 1
+            return True
+
+    def get_document(self, name):
+        return self._documents.get(name)
+
+    def put_document(self, name, document):
+        self._documents[name] = dict(document)
+
+
+class SqliteVoteStorage(VoteStorage):
+    """Stockage local dans un fichier SQLite (mode WAL), partagé par les processus de la machine"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS ballot ('
+                'participant TEXT PRIMARY KEY, timestamp TEXT NOT NULL, votes TEXT NOT NULL)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS document ('
+                'name TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT NOT NULL, version TEXT NOT NULL, '
+                'materialized_at REAL NOT NULL)')
+            self._local.connection = connection
+        return connection
+
+    def _bump_version(self, connection):
+        connection.execute(
+            "INSERT INTO meta (key, value) VALUES ('version', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1")
+
+    def snapshot(self):
+        connection = self._connection()
+        connection.execute('BEGIN')
+        try:
+            row = connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            rows = connection.execute('SELECT participant, timestamp, votes FROM ballot ORDER BY rowid').fetchall()
+        finally:
+            connection.execute('COMMIT')
+        votes = {
+            participant: {'timestamp': timestamp, 'votes': json.loads(participant_votes)}
+            for participant, timestamp, participant_votes in rows
+        }
+        return (row[0] if row else 0), votes
+
+    def version(self):
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else 0
+
+    def get(self, participant):
+        row = self._connection().execute(
+            'SELECT timestamp, votes FROM ballot WHERE participant = ?', (participant,)).fetchone()
+        if row is None:
+            return None
+        return {'timestamp': row[0], 'votes': json.loads(row[1])}
+
+    def iter_ballots(self):
+        rows = self._connection().execute('SELECT participant, timestamp, votes FROM ballot ORDER BY rowid')
+        for participant, timestamp, participant_votes in rows:
+            yield participant, {'timestamp': timestamp, 'votes': json.loads(participant_votes)}
+
+    def put_many(self, ballots):
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            # ON CONFLICT conserve le rowid, donc l'ordre d'arrivée des participants
+            connection.executemany(
+                'INSERT INTO ballot (participant, timestamp, votes) VALUES (?, ?, ?) '
+                'ON CONFLICT(participant) DO UPDATE SET timestamp = excluded.timestamp, votes = excluded.votes',
+                [
+                    (participant, vote_data['timestamp'], json.dumps(vote_data['votes'], ensure_ascii=False))
+                    for participant, vote_data in ballots.items()
+                ])
+            self._bump_version(connection)
+
+    def delete(self, participant):
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            deleted = connection.execute('DELETE FROM ballot WHERE participant = ?', (participant,)).rowcount
+            if deleted:
+                self._bump_version(connection)
+        return deleted > 0
+
+    def get_document(self, name):
+        row = self._connection().execute(
+            'SELECT body, etag, version, materialized_at FROM document WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            return None
+        return {'body': bytes(row[0]), 'etag': row[1], 'version': row[2], 'materialized_at': row[3]}
+
+    def put_document(self, name, document):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO document (name, body, etag, version, materialized_at) VALUES (?, ?, ?, ?, ?)',
+            (name, document['body'], document['etag'], document['version'], document['materialized_at']))
+
+
+class TableVoteStorage(VoteStorage):
+    """Stockage partagé dans Azure Table Storage (ou l'émulateur Azurite).
+
+    Tous les bulletins d'un sondage sont dans une même partition, ce qui
+    permet d'écrire jusqu'à 100 bulletins par transaction ; chaque session
+    a la sienne. La version est une empreinte des
+    ETags des entités : elle change à chaque écriture sans compteur à tenir.
+    """
+
+    PARTITION = 'ballots'
+
+    # Préfixe des partitions de documents : ':' ne peut pas apparaître dans
+    # un identifiant de session, donc jamais dans une partition de bulletins
+    DOCUMENTS_PREFIX = 'documents:'
+
+    def __init__(self, connection_string, table_name='votes', partition=PARTITION):
+        from azure.core.exceptions import ResourceExistsError
+        from azure.data.tables import TableClient
+
+        self.partition = partition
+        self.table = TableClient.from_connection_string(connection_string, table_name)
+        try:
+            self.table.create_table()
+        except ResourceExistsError:
+            pass
+
+    @staticmethod
+    def _row_key(participant):
+        # Les caractères / \ # ? sont interdits dans une RowKey
+        return quote(participant, safe='')
+
+    def _entity(self, participant, vote_data):
+        return {
+            'PartitionKey': self.partition,
+            'RowKey': self._row_key(participant),
+            'participant': participant,
+            'submitted_at': vote_data['timestamp'],
+            'votes': json.dumps(vote_data['votes'], ensure_ascii=False)
+        }
+
+    def snapshot(self):
+        votes = {}
+        etags = []
+        entities = self.table.query_entities(
+            f"PartitionKey eq '{self.partition}'", select=['RowKey', 'participant', 'submitted_at', 'votes'])
+        for entity in entities:
+            votes[entity['participant']] = {'timestamp': entity['submitted_at'], 'votes': json.loads(entity['votes'])}
+            etags.append(f"{entity['RowKey']}:{entity.metadata['etag']}")
+        version = hashlib.blake2b('\n'.join(sorted(etags)).encode('utf-8'), digest_size=8).hexdigest()
+        return version, votes
+
+    def iter_ballots(self):
+        # Les entités sont lues page par page au fil de l'itération
+        entities = self.table.query_entities(
+            f"PartitionKey eq '{self.partition}'", select=['participant', 'submitted_at', 'votes'])
+        for entity in entities:
+            yield entity['participant'], {'timestamp': entity['submitted_at'], 'votes': json.loads(entity['votes'])}
+
+    def get(self, participant):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            entity = self.table.get_entity(self.partition, self._row_key(participant))
+        except ResourceNotFoundError:
+            return None
+        return {'timestamp': entity['submitted_at'], 'votes': json.loads(entity['votes'])}
+
+    def put_many(self, ballots):
+        from azure.data.tables import UpdateMode
+
+        operations = [
+            ('upsert', self._entity(participant, vote_data), {'mode': UpdateMode.REPLACE})
+            for participant, vote_data in ballots.items()
+        ]
+        for start in range(0, len(operations), TABLE_BATCH_SIZE):
+            self.table.submit_transaction(operations[start:start + TABLE_BATCH_SIZE])
+
+    def delete(self, participant):
+        if self.get(participant) is None:
+            return False
+        self.table.delete_entity(self.partition, self._row_key(participant))
+        return True
+
+    def get_document(self, name):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            entity = self.table.get_entity(self.DOCUMENTS_PREFIX + self.partition, name)
+        except ResourceNotFoundError:
+            return None
+        body = b''.join(bytes(entity[f'body_{index}']) for index in range(entity['chunks']))
+        return {'body': body, 'etag': entity['etag'], 'version': entity['version'],
+                'materialized_at': entity['materialized_at']}
+
+    def put_document(self, name, document):
+        from azure.data.tables import UpdateMode
+
+        # Le corps est découpé en propriétés binaires de 64 Ko au plus
+        body = document['body']
+        chunks = [body[start:start + TABLE_PROPERTY_SIZE] for start in range(0, len(body), TABLE_PROPERTY_SIZE)] or [b'']
+        if len(chunks) > TABLE_DOCUMENT_CHUNKS:
+            raise ValueError(f"Document {name} trop volumineux pour une entité Azure Table ({len(body)} octets)")
+        entity = {
+            'PartitionKey': self.DOCUMENTS_PREFIX + self.partition,
+            'RowKey': name,
+            'etag': document['etag'],
+            'version': document['version'],
+            'materialized_at': float(document['materialized_at']),
+            'chunks': len(chunks),
+        }
+        entity.update({f'body_{index}': chunk for index, chunk in enumerate(chunks)})
+        self.table.upsert_entity(entity, mode=UpdateMode.REPLACE)
+
+
+class CachedVoteStorage(VoteStorage):
+    """Cache de lecture en mémoire, avec TTL court, devant un autre backend.
+
+    Les lectures sont servies depuis le dernier instantané tant qu'il a
+    moins de ttl secondes ; une écriture de l'instance l'invalide, elle
+    relit donc toujours ses propres écritures.
+    """
+
+    def __init__(self, backend, ttl=CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._snapshot = None
+        self._expires = 0.0
+        self._lock = Lock()
+
+    def snapshot(self):
+        if self._snapshot is not None and time.monotonic() < self._expires:
+            return self._snapshot
+        with self._lock:
+            # Une seule relecture du backend pour les requêtes concurrentes
+            if self._snapshot is None or time.monotonic() >= self._expires:
+                self._snapshot = self.backend.snapshot()
+                self._expires = time.monotonic() + self.ttl
+            return self._snapshot
+
+    def invalidate(self):
+        self._expires = 0.0
+
+    def iter_ballots(self):
+        # L'export lit le backend en flux plutôt que de charger un instantané complet
+        return self.backend.iter_ballots()
+
+    def put_many(self, ballots):
+        self.backend.put_many(ballots)
+        self.invalidate()
+
+    def delete(self, participant):
+        deleted = self.backend.delete(participant)
+        if deleted:
+            self.invalidate()
+        return deleted
+
+    def get_document(self, name):
+        return self.backend.get_document(name)
+
+    def put_document(self, name, document):
+        self.backend.put_document(name, document)
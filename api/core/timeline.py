@@ -0,0 +1,151 @@
+from array import array
+from datetime import datetime
+from threading import Lock
+
+from .aggregate import SLOTS, as_priority
+from .catalog import legacy_ballots
+
+# Intervalles de la chronologie : champs remis à zéro pour obtenir le début de l'intervalle
+BUCKETS = {
+    '1m': {'second': 0, 'microsecond': 0},
+    '1h': {'minute': 0, 'second': 0, 'microsecond': 0},
+    '1d': {'hour': 0, 'minute': 0, 'second': 0, 'microsecond': 0},
+}
+
+
+def bucket_starts(timestamp):
+    """Débuts des intervalles (dans l'ordre de BUCKETS) d'un horodatage ISO, ou None s'il est invalide"""
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is not None:
+        # Heure locale, comme les horodatages datetime.now() des bulletins
+        moment = moment.astimezone().replace(tzinfo=None)
+    return tuple(moment.replace(**fields).isoformat() for fields in BUCKETS.values())
+
+
+class VoteTimeline:
+    """Chronologie des votes : compteurs par intervalle, module et priorité.
+
+    Chaque bulletin compte dans l'intervalle de son horodatage, pour chaque
+    taille d'intervalle de BUCKETS. Les compteurs sont tenus à jour par
+    delta à chaque bulletin (l'horodatage n'est analysé qu'à l'écriture) :
+    une chronologie est servie en O(intervalles), quel que soit le nombre
+    de votes. Un bulletin sans horodatage valide n'est compté que dans
+    undated.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._clear()
+
+    def _clear(self):
+        # {taille: {début: {module_id: array de SLOTS compteurs}}}
+        self._buckets = {bucket: {} for bucket in BUCKETS}
+        # Contribution de chaque participant : (débuts, votes), pour la retirer au remplacement
+        self._ballots = {}
+        self.undated = 0
+
+    @classmethod
+    def from_votes(cls, votes):
+        """Construit la chronologie à partir de l'ensemble des bulletins"""
+        timeline = cls()
+        timeline.reset(votes)
+        return timeline
+
+    def _apply(self, starts, votes, delta):
+        if starts is None:
+            self.undated += delta
+            return
+        for bucket, start in zip(BUCKETS, starts):
+            modules = self._buckets[bucket].setdefault(start, {})
+            for module_id, priority in votes.items():
+                counts = modules.get(module_id)
+                if counts is None:
+                    counts = modules[module_id] = array('l', [0] * SLOTS)
+                counts[priority] += delta
+                if not any(counts):
+                    del modules[module_id]
+            if not modules:
+                del self._buckets[bucket][start]
+
+    def _add(self, participant, vote_data):
+        starts = bucket_starts(vote_data.get('timestamp'))
+        votes = {}
+        for module_id, priority in vote_data.get('votes', {}).items():
+            priority = as_priority(priority)
+            if priority is not None:
+                votes[module_id] = priority
+        self._ballots[participant] = (starts, votes)
+        self._apply(starts, votes, 1)
+
+    def add_ballot(self, participant, vote_data):
+        """Ajoute le bulletin d'un participant aux compteurs"""
+        self.apply_change(participant, None, vote_data)
+
+    def apply_change(self, participant, previous, current):
+        """Remplace le bulletin d'un participant par le nouveau (ou None)"""
+        with self._lock:
+            contribution = self._ballots.pop(participant, None)
+            if contribution is not None:
+                self._apply(*contribution, -1)
+            if current is not None:
+                self._add(participant, current)
+
+    def reset(self, votes):
+        """Reconstruit les compteurs à partir de l'ensemble des bulletins (ou de l'ancien format liste)"""
+        if isinstance(votes, list):
+            votes = legacy_ballots(votes)
+        with self._lock:
+            self._clear()
+            for participant, vote_data in votes.items():
+                self._add(participant, vote_data)
+
+    def series(self, bucket, modules):
+        """Chronologie pour une taille d'intervalle de BUCKETS, intervalles non vides par ordre chronologique"""
+        if bucket not in BUCKETS:
+            raise ValueError(f"Intervalle inconnu : {bucket} (valeurs possibles : {', '.join(BUCKETS)})")
+        with self._lock:
+            buckets = sorted(
+                (start, [(module_id, counts[:]) for module_id, counts in bucket_modules.items()])
+                for start, bucket_modules in self._buckets[bucket].items()
+            )
+            undated = self.undated
+
+        catalog = {module['id']: (position, module['title']) for position, module in enumerate(modules)}
+        series = []
+        total_votes = 0
+        for start, module_counts in buckets:
+            module_counts = sorted(
+                (catalog[module_id], counts) for module_id, counts in module_counts if module_id in catalog)
+            p1 = sum(counts[1] for _, counts in module_counts)
+            p2 = sum(counts[2] for _, counts in module_counts)
+            p3 = sum(counts[3] for _, counts in module_counts)
+            total_votes += p1 + p2 + p3
+            series.append({
+                'start': start,
+                'priority_1': p1,
+                'priority_2': p2,
+                'priority_3': p3,
+                'total': p1 + p2 + p3,
+                'modules': [
+                    {
+                        'module': title,
+                        'priority_1': counts[1],
+                        'priority_2': counts[2],
+                        'priority_3': counts[3],
+                        'total': counts[1] + counts[2] + counts[3]
+                    }
+                    for (_, title), counts in module_counts
+                ]
+            })
+        return {
+            'bucket': bucket,
+            'series': series,
+            'summary': {
+                'buckets': len(series),
+                'total_votes': total_votes,
+                'undated_ballots': undated
+            }
+        }
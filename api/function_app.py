@@ -1,131 +1,136 @@
 import azure.functions as func
 import json
+import logging
 import os
+import time
 from datetime import datetime
+from functools import wraps
 
-# Liste des participants autorisés
-PARTICIPANTS = [
-    "Julien.R",
-    "Cathy.D", 
-    "Az-Eddine.E",
-    "Gaëlline.L",
-    "Olivier.M",
-    "Stéphanie.P",
-    "Pierre-Louis.W"
-]
-
-# Données des modules
-MODULES = [
-    {
-        "id": "m1_1",
-        "title": "Introduction au Cloud Azure",
-        "description": "Concepts fondamentaux du cloud computing, les modèles de service (IaaS, PaaS, SaaS) et les avantages d'Azure.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m1_2", 
-        "title": "Panorama des services PaaS Azure",
-        "description": "Présentation des principaux services PaaS d'Azure : App Service, Azure SQL Database, Azure Storage, Azure Functions, etc.",
-        "duration": "5 heures"
-    },
-    {
-        "id": "m1_3",
-        "title": "Mise en place d'un environnement de démonstration", 
-        "description": "Création et configuration d'un environnement Azure pour les démonstrations pratiques.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m1_4",
-        "title": "Gestion des environnements multiples",
-        "description": "Stratégies et outils pour gérer efficacement plusieurs environnements (développement, test, production) sur Azure.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m2_1",
-        "title": "Gestion des identités et des accès (RBAC)",
-        "description": "Mise en œuvre du contrôle d'accès basé sur les rôles (RBAC) pour sécuriser les ressources Azure.",
-        "duration": "5 heures"
-    },
-    {
-        "id": "m2_2",
-        "title": "Sécurisation des secrets avec Azure Key Vault",
-        "description": "Utilisation d'Azure Key Vault pour stocker et gérer de manière sécurisée les clés, secrets et certificats.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m2_3",
-        "title": "Gouvernance et conformité avec Azure Policy",
-        "description": "Application des politiques Azure pour assurer la conformité et la gouvernance des ressources.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m2_4",
-        "title": "Audit et surveillance des accès",
-        "description": "Mise en place de l'audit et de la surveillance pour suivre les activités et les accès aux ressources Azure.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m2_5",
-        "title": "Intégration avec Azure AD Connect",
-        "description": "Synchronisation des identités entre l'Active Directory on-premise et Azure Active Directory.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m3_1",
-        "title": "Monitoring et alertes avec Azure Monitor",
-        "description": "Utilisation d'Azure Monitor pour collecter, analyser et agir sur les données de télémétrie de vos environnements Azure.",
-        "duration": "5 heures"
-    },
-    {
-        "id": "m3_2",
-        "title": "Analyse des logs avec KQL",
-        "description": "Apprentissage du langage de requête Kusto (KQL) pour interroger les logs dans Azure Log Analytics.",
-        "duration": "5 heures"
-    },
-    {
-        "id": "m3_3",
-        "title": "Création de tableaux de bord personnalisés",
-        "description": "Conception et implémentation de tableaux de bord Azure pour visualiser les métriques et les logs clés.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m3_4",
-        "title": "Optimisation des coûts Azure",
-        "description": "Stratégies et outils pour analyser et optimiser les dépenses liées à l'utilisation des services Azure.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m4_1",
-        "title": "Déploiement Continu avec Azure DevOps",
-        "description": "Intégration d'Azure DevOps dans les projets Azure PaaS pour automatiser les déploiements et améliorer la qualité du code.",
-        "duration": "7 heures"
-    },
-    {
-        "id": "m4_2",
-        "title": "Infrastructure as Code (IaC) avec ARM Templates et Bicep",
-        "description": "Principes de l'Infrastructure as Code et l'utilisation d'ARM Templates et Bicep pour déployer des infrastructures Azure reproductibles.",
-        "duration": "8 heures"
-    },
-    {
-        "id": "m4_3",
-        "title": "Fonctions Serverless et Logic Apps",
-        "description": "Développement serverless sur Azure avec Azure Functions et l'automatisation des workflows avec Logic Apps.",
-        "duration": "8 heures"
-    },
-    {
-        "id": "m5_1",
-        "title": "Azure Virtual Networks (VNets)",
-        "description": "Configuration et gestion des réseaux virtuels Azure pour sécuriser et optimiser les services PaaS.",
-        "duration": "8 heures"
-    }
-]
+from core import (DEFAULT_SESSION, METRICS_CONTENT_TYPE, BallotIngestor, MemoryVoteQueue, Metrics, PayloadCache,
+                  Session, SessionRegistry, VotingService, create_queue, create_storage, load_catalog, parse_budget,
+                  parse_weights)
+
+# Participants autorisés et modules, lus depuis data/participants.json et data/modules.json
+catalog = load_catalog()
+PARTICIPANTS = catalog.participants
+MODULES = catalog.modules
+
+# Réponses constantes encodées une seule fois, au chargement du module
+PARTICIPANTS_BODY = json.dumps(PARTICIPANTS).encode('utf-8')
+MODULES_BODY = json.dumps(MODULES).encode('utf-8')
 
 app = func.FunctionApp()
 
-# Stockage en mémoire pour les votes (dans un vrai déploiement, utiliser Azure Storage)
-votes_storage = {}
+# Métriques des requêtes et du chemin critique, exposées sur /api/metrics
+# (METRICS_ENABLED=0 pour les désactiver)
+metrics = Metrics.from_environ()
+
+def timed(route):
+    """Décorateur mesurant la durée et le statut des réponses d'un gestionnaire"""
+    def decorator(handler):
+        if not metrics.enabled:
+            return handler
+
+        @wraps(handler)
+        def wrapper(req: func.HttpRequest) -> func.HttpResponse:
+            start = time.perf_counter()
+            status = 500
+            try:
+                response = handler(req)
+                status = response.status_code
+                return response
+            except Exception as e:
+                metrics.observe_exception(e)
+                raise
+            finally:
+                metrics.observe_request(req.method, route, status, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def error_response(e):
+    """Réponse 500 d'une exception, comptée dans les métriques"""
+    metrics.observe_exception(e)
+    return func.HttpResponse(
+        json.dumps({"error": str(e)}),
+        status_code=500,
+        mimetype="application/json"
+    )
+
+def storage_kind():
+    """Stockage des votes selon la configuration.
+
+    VOTES_STORAGE vaut 'table' (Azure Table Storage ou Azurite), 'sqlite'
+    (fichier local) ou 'memory'. Par défaut : 'table' si une chaîne de
+    connexion est configurée, sinon 'sqlite'.
+    """
+    connection_string = os.environ.get('VOTES_STORAGE_CONNECTION') or os.environ.get('AzureWebJobsStorage')
+    return os.environ.get('VOTES_STORAGE', 'table' if connection_string else 'sqlite')
+
+def create_voting():
+    """Crée le service de vote de la session par défaut"""
+    return VotingService(catalog, create_storage(storage_kind()), metrics)
+
+# Votes partagés entre les instances, avec cache de lecture à TTL court.
+# Le service est créé à la première requête qui en a besoin : le démarrage
+# à froid n'ouvre ni connexion ni table.
+_voting = None
+
+def get_voting():
+    """Retourne le service de vote, créé au premier appel"""
+    global _voting
+    if _voting is None:
+        _voting = create_voting()
+    return _voting
+
+# Réponses sérialisées des résultats, par version des votes
+results_cache = PayloadCache(metrics)
+
+# Sessions de sondage (dossiers de data/sessions), ouvertes à la demande ;
+# la session 'default' est celle de data/
+_sessions = None
+
+def get_sessions():
+    """Retourne le registre des sessions, créé au premier appel"""
+    global _sessions
+    if _sessions is None:
+        _sessions = SessionRegistry(
+            storage_kind(), Session(DEFAULT_SESSION, catalog, get_voting(), results_cache), metrics=metrics)
+    return _sessions
+
+# Enregistrement des votes : 'direct' (dans la requête HTTP, par défaut) ou
+# 'queue' (bulletin déposé dans la file VOTES_QUEUE, réponse 202 avec un
+# ticket, puis enregistrement par lots par la fonction ingest_votes)
+VOTES_INGESTION = os.environ.get('VOTES_INGESTION', 'direct')
+VOTES_QUEUE = os.environ.get('VOTES_QUEUE', 'votes-ingest')
+
+_ingestor = None
+
+def get_ingestor():
+    """Retourne la file d'ingestion, créée au premier appel.
+
+    Sans chaîne de connexion (tests, développement local), la file est en
+    mémoire et vidée par un thread du processus.
+    """
+    global _ingestor
+    if _ingestor is None:
+        connection_string = os.environ.get('VOTES_QUEUE_CONNECTION') or os.environ.get('AzureWebJobsStorage')
+        ingestor = BallotIngestor(create_queue(connection_string, VOTES_QUEUE), get_sessions().get)
+        if isinstance(ingestor.queue, MemoryVoteQueue):
+            ingestor.start_worker()
+        _ingestor = ingestor
+    return _ingestor
+
+# Résultats matérialisés : si RESULTS_MATERIALIZE=1, la fonction minuteur
+# materialize_results enregistre les résultats de chaque session dans le
+# stockage (planning CRON RESULTS_SCHEDULE) ; les requêtes servent ce document
+# tant qu'il date de moins de RESULTS_MAX_STALENESS secondes, sinon calculent
+# les résultats à la demande
+RESULTS_MATERIALIZE = os.environ.get('RESULTS_MATERIALIZE', '0') == '1'
+RESULTS_SCHEDULE = os.environ.get('RESULTS_SCHEDULE', '0 * * * * *')
+RESULTS_MAX_STALENESS = float(os.environ.get('RESULTS_MAX_STALENESS', '120'))
 
 @app.route(route="health", methods=["GET"])
+@timed("health")
 def health(req: func.HttpRequest) -> func.HttpResponse:
     return func.HttpResponse(
         json.dumps({"status": "healthy", "timestamp": datetime.now().isoformat()}),
@@ -133,69 +138,80 @@ def health(req: func.HttpRequest) -> func.HttpResponse:
     )
 
 @app.route(route="participants", methods=["GET"])
+@timed("participants")
 def get_participants(req: func.HttpRequest) -> func.HttpResponse:
     return func.HttpResponse(
-        json.dumps(PARTICIPANTS),
+        PARTICIPANTS_BODY,
         mimetype="application/json"
     )
 
 @app.route(route="modules", methods=["GET"])
+@timed("modules")
 def get_modules(req: func.HttpRequest) -> func.HttpResponse:
     return func.HttpResponse(
-        json.dumps(MODULES),
+        MODULES_BODY,
         mimetype="application/json"
     )
 
-@app.route(route="votes/{participant}", methods=["GET"])
-def get_participant_votes(req: func.HttpRequest) -> func.HttpResponse:
+def find_session(req):
+    """Session de la route (sessions/{session}/...), 'default' pour les routes historiques"""
+    return get_sessions().get(req.route_params.get('session', DEFAULT_SESSION))
+
+def session_not_found():
+    return func.HttpResponse(
+        json.dumps({"error": "Session inconnue"}),
+        status_code=404,
+        mimetype="application/json"
+    )
+
+def participant_votes_response(req):
+    session = find_session(req)
+    if session is None:
+        return session_not_found()
     participant = req.route_params.get('participant')
     
-    if participant not in PARTICIPANTS:
+    if not session.catalog.is_participant(participant):
         return func.HttpResponse(
             json.dumps({"error": "Participant non autorisé"}),
             status_code=400,
             mimetype="application/json"
         )
     
-    participant_votes = votes_storage.get(participant, {})
+    participant_votes = session.voting.participant_votes(participant) or {}
     return func.HttpResponse(
-        json.dumps(participant_votes.get('votes', {})),
+        json.dumps(participant_votes),
         mimetype="application/json"
     )
 
-@app.route(route="votes", methods=["POST"])
-def submit_votes(req: func.HttpRequest) -> func.HttpResponse:
+def submit_votes_response(req):
     try:
+        session = find_session(req)
+        if session is None:
+            return session_not_found()
         req_body = req.get_json()
         participant = req_body.get('participant')
         votes = req_body.get('votes', {})
         
-        if not participant:
-            return func.HttpResponse(
-                json.dumps({"error": "Participant requis"}),
-                status_code=400,
-                mimetype="application/json"
-            )
-            
-        if participant not in PARTICIPANTS:
+        voting = session.voting
+        error = voting.validate(participant, votes)
+        if error:
             return func.HttpResponse(
-                json.dumps({"error": "Participant non autorisé"}),
+                json.dumps({"error": error}),
                 status_code=400,
                 mimetype="application/json"
             )
         
-        if not votes:
+        if VOTES_INGESTION == 'queue':
+            # Enregistrement différé : le bulletin validé part dans la file
+            ticket = get_ingestor().enqueue(session.id, participant, votes)
             return func.HttpResponse(
-                json.dumps({"error": "Aucun vote fourni"}),
-                status_code=400,
+                json.dumps({"message": "Votes reçus, enregistrement en cours", "ticket": ticket, "count": len(votes)}),
+                status_code=202,
                 mimetype="application/json"
             )
         
         # Met à jour ou ajoute les votes du participant
-        votes_storage[participant] = {
-            "timestamp": datetime.now().isoformat(),
-            "votes": votes
-        }
+        voting.submit(participant, votes)
         
         return func.HttpResponse(
             json.dumps({"message": "Votes enregistrés avec succès", "count": len(votes)}),
@@ -203,18 +219,16 @@ def submit_votes(req: func.HttpRequest) -> func.HttpResponse:
         )
     
     except Exception as e:
-        return func.HttpResponse(
-            json.dumps({"error": str(e)}),
-            status_code=500,
-            mimetype="application/json"
-        )
+        return error_response(e)
 
-@app.route(route="votes/{participant}", methods=["DELETE"])
-def reset_participant_votes(req: func.HttpRequest) -> func.HttpResponse:
+def reset_votes_response(req):
     try:
+        session = find_session(req)
+        if session is None:
+            return session_not_found()
         participant = req.route_params.get('participant')
         
-        if participant not in PARTICIPANTS:
+        if not session.catalog.is_participant(participant):
             return func.HttpResponse(
                 json.dumps({"error": "Participant non autorisé"}),
                 status_code=400,
@@ -222,8 +236,7 @@ def reset_participant_votes(req: func.HttpRequest) -> func.HttpResponse:
             )
         
         # Supprime les votes du participant
-        if participant in votes_storage:
-            del votes_storage[participant]
+        if session.voting.reset(participant):
             return func.HttpResponse(
                 json.dumps({"message": "Votes réinitialisés avec succès"}),
                 mimetype="application/json"
@@ -235,105 +248,216 @@ def reset_participant_votes(req: func.HttpRequest) -> func.HttpResponse:
             )
     
     except Exception as e:
+        return error_response(e)
+
+def results_response(req):
+    try:
+        session = find_session(req)
+        if session is None:
+            return session_not_found()
+        if RESULTS_MATERIALIZE:
+            status, body, headers = session.materialized_results(
+                RESULTS_MAX_STALENESS, req.headers.get('If-None-Match'))
+        else:
+            status, body, headers = session.results(req.headers.get('If-None-Match'))
+        return func.HttpResponse(
+            body,
+            status_code=status,
+            headers=headers,
+            mimetype="application/json"
+        )
+    
+    except Exception as e:
+        return error_response(e)
+
+def timeline_response(req):
+    try:
+        session = find_session(req)
+        if session is None:
+            return session_not_found()
+        status, body, headers = session.timeline(req.params.get('bucket', '1h'), req.headers.get('If-None-Match'))
+        return func.HttpResponse(
+            body,
+            status_code=status,
+            headers=headers,
+            mimetype="application/json"
+        )
+
+    except ValueError as e:
         return func.HttpResponse(
             json.dumps({"error": str(e)}),
-            status_code=500,
+            status_code=400,
             mimetype="application/json"
         )
+    except Exception as e:
+        return error_response(e)
+
+def plan_response(req):
+    try:
+        session = find_session(req)
+        if session is None:
+            return session_not_found()
+        budget_hours = parse_budget(req.params.get('budget_hours'))
+        weights = parse_weights(req.params.get('weights'))
+        status, body, headers = session.plan(budget_hours, weights, req.headers.get('If-None-Match'))
+        return func.HttpResponse(
+            body,
+            status_code=status,
+            headers=headers,
+            mimetype="application/json"
+        )
+
+    except ValueError as e:
+        return func.HttpResponse(
+            json.dumps({"error": str(e)}),
+            status_code=400,
+            mimetype="application/json"
+        )
+    except Exception as e:
+        return error_response(e)
+
+@app.route(route="votes/{participant}", methods=["GET"])
+@timed("votes/{participant}")
+def get_participant_votes(req: func.HttpRequest) -> func.HttpResponse:
+    return participant_votes_response(req)
+
+@app.route(route="votes", methods=["POST"])
+@timed("votes")
+def submit_votes(req: func.HttpRequest) -> func.HttpResponse:
+    return submit_votes_response(req)
+
+@app.route(route="votes/{participant}", methods=["DELETE"])
+@timed("votes/{participant}")
+def reset_participant_votes(req: func.HttpRequest) -> func.HttpResponse:
+    return reset_votes_response(req)
 
 @app.route(route="results", methods=["GET"])
+@timed("results")
 def get_results(req: func.HttpRequest) -> func.HttpResponse:
+    return results_response(req)
+
+@app.route(route="results/timeline", methods=["GET"])
+@timed("results/timeline")
+def get_results_timeline(req: func.HttpRequest) -> func.HttpResponse:
+    return timeline_response(req)
+
+@app.route(route="plan", methods=["GET"])
+@timed("plan")
+def get_plan(req: func.HttpRequest) -> func.HttpResponse:
+    return plan_response(req)
+
+@app.route(route="results/rollup", methods=["GET"])
+@timed("results/rollup")
+def get_rollup_results(req: func.HttpRequest) -> func.HttpResponse:
     try:
-        # Calcule les statistiques
-        total_participants = len(votes_storage)
-        modules_voted = set()
-        priority_counts = {1: 0, 2: 0, 3: 0}
-        module_stats = {}
-        participant_details = []
-        
-        for participant, vote_data in votes_storage.items():
-            participant_votes = vote_data.get('votes', {})
-            vote_count = len(participant_votes)
-            
-            participant_details.append({
-                'participant': participant,
-                'vote_count': vote_count,
-                'timestamp': vote_data.get('timestamp', '')
-            })
-            
-            for module_id, priority in participant_votes.items():
-                modules_voted.add(module_id)
-                priority_counts[priority] += 1
-                
-                if module_id not in module_stats:
-                    module_stats[module_id] = {1: 0, 2: 0, 3: 0}
-                module_stats[module_id][priority] += 1
-        
-        # Prépare les données pour les graphiques
-        chart_data = []
-        for module in MODULES:
-            module_id = module['id']
-            stats = module_stats.get(module_id, {1: 0, 2: 0, 3: 0})
-            total_votes = stats[1] + stats[2] + stats[3]
-            
-            if total_votes > 0:  # Seulement les modules avec des votes
-                chart_data.append({
-                    'module': module['title'][:30] + '...' if len(module['title']) > 30 else module['title'],
-                    'priority_1': stats[1],
-                    'priority_2': stats[2], 
-                    'priority_3': stats[3],
-                    'total': total_votes
-                })
-        
-        # Données pour le graphique circulaire
-        total_priority_votes = sum(priority_counts.values())
-        pie_data = []
-        if total_priority_votes > 0:
-            pie_data = [
-                {'name': 'Priorité 1 (Important)', 'value': priority_counts[1], 'color': '#dc2626'},
-                {'name': 'Priorité 2 (Moyen)', 'value': priority_counts[2], 'color': '#2563eb'},
-                {'name': 'Priorité 3 (Découverte)', 'value': priority_counts[3], 'color': '#16a34a'}
-            ]
-        
-        # Données détaillées pour le tableau
-        detailed_data = []
-        for module in MODULES:
-            module_id = module['id']
-            stats = module_stats.get(module_id, {1: 0, 2: 0, 3: 0})
-            total_module_votes = stats[1] + stats[2] + stats[3]
-            
-            if total_module_votes > 0:  # Seulement les modules avec des votes
-                detailed_data.append({
-                    'module': module['title'],
-                    'duration': module['duration'],
-                    'priority_1': stats[1],
-                    'priority_2': stats[2],
-                    'priority_3': stats[3],
-                    'total': total_module_votes
-                })
-        
-        results = {
-            'summary': {
-                'total_votes': sum(priority_counts.values()),
-                'participants': total_participants,
-                'modules_voted': len(modules_voted),
-                'total_modules': len(MODULES)
-            },
-            'chart_data': chart_data,
-            'pie_data': pie_data,
-            'detailed_data': detailed_data,
-            'participant_details': participant_details
-        }
-        
+        session_ids = [session_id for session_id in req.params.get('sessions', '').split(',') if session_id]
+        status, body, headers = get_sessions().rollup(session_ids, req.headers.get('If-None-Match'))
         return func.HttpResponse(
-            json.dumps(results),
+            body,
+            status_code=status,
+            headers=headers,
             mimetype="application/json"
         )
     
+    except KeyError:
+        return session_not_found()
     except Exception as e:
+        return error_response(e)
+
+@app.route(route="sessions", methods=["GET"])
+@timed("sessions")
+def get_sessions_list(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        sessions = get_sessions()
         return func.HttpResponse(
-            json.dumps({"error": str(e)}),
-            status_code=500,
+            json.dumps([sessions.get(session_id).summary() for session_id in sessions.ids()]),
             mimetype="application/json"
         )
+    
+    except Exception as e:
+        return error_response(e)
+
+@app.route(route="sessions/{session}/participants", methods=["GET"])
+@timed("sessions/{session}/participants")
+def get_session_participants(req: func.HttpRequest) -> func.HttpResponse:
+    session = find_session(req)
+    if session is None:
+        return session_not_found()
+    return func.HttpResponse(
+        session.catalog.encoded('participants', lambda catalog: catalog.participants),
+        mimetype="application/json"
+    )
+
+@app.route(route="sessions/{session}/modules", methods=["GET"])
+@timed("sessions/{session}/modules")
+def get_session_modules(req: func.HttpRequest) -> func.HttpResponse:
+    session = find_session(req)
+    if session is None:
+        return session_not_found()
+    return func.HttpResponse(
+        session.catalog.encoded('modules', lambda catalog: catalog.modules),
+        mimetype="application/json"
+    )
 
+@app.route(route="sessions/{session}/votes/{participant}", methods=["GET"])
+@timed("sessions/{session}/votes/{participant}")
+def get_session_participant_votes(req: func.HttpRequest) -> func.HttpResponse:
+    return participant_votes_response(req)
+
+@app.route(route="sessions/{session}/votes", methods=["POST"])
+@timed("sessions/{session}/votes")
+def submit_session_votes(req: func.HttpRequest) -> func.HttpResponse:
+    return submit_votes_response(req)
+
+@app.route(route="sessions/{session}/votes/{participant}", methods=["DELETE"])
+@timed("sessions/{session}/votes/{participant}")
+def reset_session_participant_votes(req: func.HttpRequest) -> func.HttpResponse:
+    return reset_votes_response(req)
+
+@app.route(route="sessions/{session}/results", methods=["GET"])
+@timed("sessions/{session}/results")
+def get_session_results(req: func.HttpRequest) -> func.HttpResponse:
+    return results_response(req)
+
+@app.route(route="sessions/{session}/results/timeline", methods=["GET"])
+@timed("sessions/{session}/results/timeline")
+def get_session_results_timeline(req: func.HttpRequest) -> func.HttpResponse:
+    return timeline_response(req)
+
+@app.route(route="sessions/{session}/plan", methods=["GET"])
+@timed("sessions/{session}/plan")
+def get_session_plan(req: func.HttpRequest) -> func.HttpResponse:
+    return plan_response(req)
+
+
+if VOTES_INGESTION == 'queue':
+    @app.queue_trigger(arg_name="msg", queue_name=VOTES_QUEUE, connection="AzureWebJobsStorage")
+    def ingest_votes(msg: func.QueueMessage) -> None:
+        """Enregistre le bulletin reçu et ceux en attente dans la file, en une écriture par session"""
+        report = get_ingestor().drain(received=[msg.get_body().decode('utf-8')])
+        logging.info("Bulletins enregistrés : %d, rejetés : %d", report['imported'], report['error_count'])
+
+if RESULTS_MATERIALIZE:
+    @app.timer_trigger(schedule=RESULTS_SCHEDULE, arg_name="timer")
+    def materialize_results(timer: func.TimerRequest) -> None:
+        """Enregistre les résultats de chaque session dans le stockage, avec leur version"""
+        sessions = get_sessions()
+        for session_id in sessions.ids():
+            try:
+                version = sessions.get(session_id).materialize()
+                logging.info("Résultats matérialisés : session %s, version %s", session_id, version)
+            except Exception:
+                logging.exception("Échec de la matérialisation des résultats de la session %s", session_id)
+
+@app.route(route="metrics", methods=["GET"])
+def get_metrics(req: func.HttpRequest) -> func.HttpResponse:
+    if not metrics.enabled:
+        return func.HttpResponse(
+            json.dumps({"error": "Métriques désactivées"}),
+            status_code=404,
+            mimetype="application/json"
+        )
+    return func.HttpResponse(
+        metrics.render(),
+        headers={"Content-Type": METRICS_CONTENT_TYPE}
+    )
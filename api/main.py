@@ -1,324 +1,292 @@
 import os
-import json
+import time
 from datetime import datetime
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 
+from core import (DEFAULT_SESSION, METRICS_CONTENT_TYPE, Metrics, PayloadCache, ResultsBroadcaster, Session,
+                  SessionRegistry, StaticAssets, VotingService, create_storage, load_catalog, parse_budget,
+                  parse_weights)
+
 app = Flask(__name__, static_folder='static')
 CORS(app)
 
-# Liste des participants autorisés
-PARTICIPANTS = [
-    "Julien.R",
-    "Cathy.D", 
-    "Az-Eddine.E",
-    "Gaëlline.L",
-    "Olivier.M",
-    "Stéphanie.P",
-    "Pierre-Louis.W"
-]
-
-# Données des modules
-MODULES = [
-    {
-        "id": "m1_1",
-        "title": "Introduction au Cloud Azure",
-        "description": "Concepts fondamentaux du cloud computing, les modèles de service (IaaS, PaaS, SaaS) et les avantages d'Azure.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m1_2", 
-        "title": "Panorama des services PaaS Azure",
-        "description": "Présentation des principaux services PaaS d'Azure : App Service, Azure SQL Database, Azure Storage, Azure Functions, etc.",
-        "duration": "5 heures"
-    },
-    {
-        "id": "m1_3",
-        "title": "Mise en place d'un environnement de démonstration", 
-        "description": "Création et configuration d'un environnement Azure pour les démonstrations pratiques.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m1_4",
-        "title": "Gestion des environnements multiples",
-        "description": "Stratégies et outils pour gérer efficacement plusieurs environnements (développement, test, production) sur Azure.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m2_1",
-        "title": "Gestion des identités et des accès (RBAC)",
-        "description": "Mise en œuvre du contrôle d'accès basé sur les rôles (RBAC) pour sécuriser les ressources Azure.",
-        "duration": "5 heures"
-    },
-    {
-        "id": "m2_2",
-        "title": "Sécurisation des secrets avec Azure Key Vault",
-        "description": "Utilisation d'Azure Key Vault pour stocker et gérer de manière sécurisée les clés, secrets et certificats.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m2_3",
-        "title": "Gouvernance et conformité avec Azure Policy",
-        "description": "Application des politiques Azure pour assurer la conformité et la gouvernance des ressources.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m2_4",
-        "title": "Audit et surveillance des accès",
-        "description": "Mise en place de l'audit et de la surveillance pour suivre les activités et les accès aux ressources Azure.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m2_5",
-        "title": "Intégration avec Azure AD Connect",
-        "description": "Synchronisation des identités entre l'Active Directory on-premise et Azure Active Directory.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m3_1",
-        "title": "Monitoring et alertes avec Azure Monitor",
-        "description": "Utilisation d'Azure Monitor pour collecter, analyser et agir sur les données de télémétrie de vos environnements Azure.",
-        "duration": "5 heures"
-    },
-    {
-        "id": "m3_2",
-        "title": "Analyse des logs avec KQL",
-        "description": "Apprentissage du langage de requête Kusto (KQL) pour interroger les logs dans Azure Log Analytics.",
-        "duration": "5 heures"
-    },
-    {
-        "id": "m3_3",
-        "title": "Création de tableaux de bord personnalisés",
-        "description": "Conception et implémentation de tableaux de bord Azure pour visualiser les métriques et les logs clés.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m3_4",
-        "title": "Optimisation des coûts Azure",
-        "description": "Stratégies et outils pour analyser et optimiser les dépenses liées à l'utilisation des services Azure.",
-        "duration": "4 heures"
-    },
-    {
-        "id": "m4_1",
-        "title": "Déploiement Continu avec Azure DevOps",
-        "description": "Intégration d'Azure DevOps dans les projets Azure PaaS pour automatiser les déploiements et améliorer la qualité du code.",
-        "duration": "7 heures"
-    },
-    {
-        "id": "m4_2",
-        "title": "Infrastructure as Code (IaC) avec ARM Templates et Bicep",
-        "description": "Principes de l'Infrastructure as Code et l'utilisation d'ARM Templates et Bicep pour déployer des infrastructures Azure reproductibles.",
-        "duration": "8 heures"
-    },
-    {
-        "id": "m4_3",
-        "title": "Fonctions Serverless et Logic Apps",
-        "description": "Développement serverless sur Azure avec Azure Functions et l'automatisation des workflows avec Logic Apps.",
-        "duration": "8 heures"
-    },
-    {
-        "id": "m5_1",
-        "title": "Azure Virtual Networks (VNets)",
-        "description": "Configuration et gestion des réseaux virtuels Azure pour sécuriser et optimiser les services PaaS.",
-        "duration": "8 heures"
-    }
-]
-
-# Fichier de stockage des votes
-VOTES_FILE = 'data/votes.json'
-
-def load_votes():
-    """Charge les votes depuis le fichier JSON"""
-    if os.path.exists(VOTES_FILE):
-        with open(VOTES_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
-
-def save_votes(votes):
-    """Sauvegarde les votes dans le fichier JSON"""
-    os.makedirs(os.path.dirname(VOTES_FILE), exist_ok=True)
-    with open(VOTES_FILE, 'w', encoding='utf-8') as f:
-        json.dump(votes, f, ensure_ascii=False, indent=2)
+# Participants autorisés et modules, lus depuis data/participants.json et data/modules.json
+catalog = load_catalog()
+PARTICIPANTS = catalog.participants
+MODULES = catalog.modules
+
+# Stockage des votes : 'journal' (data/votes.json et son journal, par défaut),
+# 'sql' (table vote via SQLAlchemy), 'sqlite', 'table' ou 'memory'
+VOTES_STORAGE = os.environ.get('VOTES_STORAGE', 'journal')
+votes_storage = create_storage(VOTES_STORAGE)
+
+if VOTES_STORAGE == 'sql':
+    from models.engine import init_db
+    from models.user import db
+
+    # Moteur et pool selon DATABASE_PROFILE (WAL, busy_timeout, pool...)
+    init_db(app)
+    with app.app_context():
+        db.create_all()
+
+# Métriques des requêtes et du chemin critique, exposées sur /api/metrics
+# (METRICS_ENABLED=0 pour les désactiver)
+metrics = Metrics.from_environ()
+
+# Règles du sondage et agrégat des résultats, communs à tous les front-ends
+voting = VotingService(catalog, votes_storage, metrics)
+
+# Réponses sérialisées des résultats, par version des votes
+results_cache = PayloadCache(metrics)
+
+def compute_results():
+    """Retourne les résultats du tableau de bord"""
+    aggregate = voting.aggregate()
+    with metrics.stage('aggregate'):
+        return aggregate.results(MODULES)
+
+def results_body():
+    """Corps JSON des résultats courants, partagé via le cache"""
+    return results_cache.get('results', voting.version(), compute_results)[0]
+
+# Sessions de sondage : data/sessions/<id>/ avec leurs propres participants,
+# modules et fragment de votes ; la session 'default' est celle de data/
+sessions = SessionRegistry(
+    VOTES_STORAGE, Session(DEFAULT_SESSION, catalog, voting, results_cache), metrics=metrics)
+
+# Diffusion des résultats en direct (SSE) : un seul diffuseur pour tous les clients
+results_broadcaster = ResultsBroadcaster(results_body)
+voting.subscribe(results_broadcaster)
+
+# Fichiers statiques chargés et compressés une seule fois au démarrage
+static_assets = StaticAssets(app.static_folder)
+
+if metrics.enabled:
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('request_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            metrics.observe_request(request.method, route, response.status_code, time.perf_counter() - start)
+        return response
+
+def error_response(e):
+    """Réponse 500 d'une exception, comptée dans les métriques"""
+    metrics.observe_exception(e)
+    return jsonify({"error": str(e)}), 500
+
+def session_not_found():
+    return jsonify({"error": "Session inconnue"}), 404
+
+def serve_static(path):
+    """Sert un fichier statique précompressé, avec ses en-têtes de cache"""
+    result = static_assets.response(
+        path, request.headers.get('Accept-Encoding'), request.headers.get('If-None-Match'))
+    if result is None:
+        # Fichier ajouté après le démarrage
+        return send_from_directory(app.static_folder, path)
+    status, body, headers = result
+    return Response(body, status=status, headers=headers)
 
 @app.route('/')
 def index():
     """Sert la page principale"""
-    return send_from_directory(app.static_folder, 'index.html')
+    return serve_static('index.html')
 
 @app.route('/<path:path>')
 def static_files(path):
     """Sert les fichiers statiques"""
-    return send_from_directory(app.static_folder, path)
+    return serve_static(path)
 
 @app.route('/api/health')
 def health():
     """Point de santé de l'API"""
     return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()})
 
-@app.route('/api/participants')
-def get_participants():
+@app.route('/api/sessions')
+def get_sessions():
+    """Retourne la liste des sessions de sondage"""
+    try:
+        return jsonify([sessions.get(session_id).summary() for session_id in sessions.ids()])
+
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/participants', defaults={'session_id': DEFAULT_SESSION})
+@app.route('/api/sessions/<session_id>/participants')
+def get_participants(session_id):
     """Retourne la liste des participants"""
-    return jsonify(PARTICIPANTS)
+    session = sessions.get(session_id)
+    if session is None:
+        return session_not_found()
+    return jsonify(session.catalog.participants)
 
-@app.route('/api/modules')
-def get_modules():
+@app.route('/api/modules', defaults={'session_id': DEFAULT_SESSION})
+@app.route('/api/sessions/<session_id>/modules')
+def get_modules(session_id):
     """Retourne la liste des modules"""
-    return jsonify(MODULES)
+    session = sessions.get(session_id)
+    if session is None:
+        return session_not_found()
+    return jsonify(session.catalog.modules)
 
-@app.route('/api/votes/<participant>', methods=['GET'])
-def get_participant_votes(participant):
+@app.route('/api/votes/<participant>', methods=['GET'], defaults={'session_id': DEFAULT_SESSION})
+@app.route('/api/sessions/<session_id>/votes/<participant>', methods=['GET'])
+def get_participant_votes(session_id, participant):
     """Retourne les votes d'un participant spécifique"""
-    if participant not in PARTICIPANTS:
+    session = sessions.get(session_id)
+    if session is None:
+        return session_not_found()
+    if not session.catalog.is_participant(participant):
         return jsonify({"error": "Participant non autorisé"}), 400
     
-    votes = load_votes()
-    participant_votes = votes.get(participant, {})
-    return jsonify(participant_votes.get('votes', {}))
+    return jsonify(session.voting.participant_votes(participant) or {})
 
-@app.route('/api/votes', methods=['POST'])
-def submit_votes():
+@app.route('/api/votes', methods=['POST'], defaults={'session_id': DEFAULT_SESSION})
+@app.route('/api/sessions/<session_id>/votes', methods=['POST'])
+def submit_votes(session_id):
     """Soumet les votes d'un participant"""
     try:
+        session = sessions.get(session_id)
+        if session is None:
+            return session_not_found()
         data = request.get_json()
         participant = data.get('participant')
         votes = data.get('votes', {})
         
-        if not participant:
-            return jsonify({"error": "Participant requis"}), 400
-            
-        if participant not in PARTICIPANTS:
-            return jsonify({"error": "Participant non autorisé"}), 400
-        
-        if not votes:
-            return jsonify({"error": "Aucun vote fourni"}), 400
+        error = session.voting.validate(participant, votes)
+        if error:
+            return jsonify({"error": error}), 400
         
-        # Charge les votes existants
-        all_votes = load_votes()
-        
-        # Met à jour ou ajoute les votes du participant
-        all_votes[participant] = {
-            "timestamp": datetime.now().isoformat(),
-            "votes": votes
-        }
-        
-        # Sauvegarde
-        save_votes(all_votes)
+        # Enregistre le bulletin ; l'agrégat reçoit le delta
+        session.voting.submit(participant, votes)
         
         return jsonify({"message": "Votes enregistrés avec succès", "count": len(votes)})
     
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
+
+@app.route('/api/votes/bulk', methods=['POST'])
+def import_votes():
+    """Importe des bulletins en masse (NDJSON : un bulletin par ligne)"""
+    try:
+        # Le corps est lu ligne par ligne, sans être chargé en mémoire
+        return jsonify(voting.import_ballots(request.stream))
+
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/votes/export')
+def export_votes():
+    """Exporte tous les bulletins en NDJSON, en flux"""
+    return Response(
+        stream_with_context(voting.export_ballots()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=votes.ndjson'}
+    )
 
-@app.route('/api/votes/<participant>', methods=['DELETE'])
-def reset_participant_votes(participant):
+@app.route('/api/votes/<participant>', methods=['DELETE'], defaults={'session_id': DEFAULT_SESSION})
+@app.route('/api/sessions/<session_id>/votes/<participant>', methods=['DELETE'])
+def reset_participant_votes(session_id, participant):
     """Réinitialise les votes d'un participant"""
     try:
-        if participant not in PARTICIPANTS:
+        session = sessions.get(session_id)
+        if session is None:
+            return session_not_found()
+        if not session.catalog.is_participant(participant):
             return jsonify({"error": "Participant non autorisé"}), 400
         
-        # Charge les votes existants
-        all_votes = load_votes()
-        
         # Supprime les votes du participant
-        if participant in all_votes:
-            del all_votes[participant]
-            save_votes(all_votes)
-            return jsonify({"message": "Votes réinitialisés avec succès"})
-        else:
+        if not session.voting.reset(participant):
             return jsonify({"message": "Aucun vote à réinitialiser"})
+        
+        return jsonify({"message": "Votes réinitialisés avec succès"})
     
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
-@app.route('/api/results')
-def get_results():
+@app.route('/api/results', defaults={'session_id': DEFAULT_SESSION})
+@app.route('/api/sessions/<session_id>/results')
+def get_results(session_id):
     """Retourne les résultats du sondage"""
     try:
-        votes = load_votes()
-        
-        # Calcule les statistiques
-        total_participants = len(votes)
-        modules_voted = set()
-        priority_counts = {1: 0, 2: 0, 3: 0}
-        module_stats = {}
-        participant_details = []
-        
-        for participant, vote_data in votes.items():
-            participant_votes = vote_data.get('votes', {})
-            vote_count = len(participant_votes)
-            
-            participant_details.append({
-                'participant': participant,
-                'vote_count': vote_count,
-                'timestamp': vote_data.get('timestamp', '')
-            })
-            
-            for module_id, priority in participant_votes.items():
-                modules_voted.add(module_id)
-                priority_counts[priority] += 1
-                
-                if module_id not in module_stats:
-                    module_stats[module_id] = {1: 0, 2: 0, 3: 0}
-                module_stats[module_id][priority] += 1
-        
-        # Prépare les données pour les graphiques
-        chart_data = []
-        for module in MODULES:
-            module_id = module['id']
-            stats = module_stats.get(module_id, {1: 0, 2: 0, 3: 0})
-            total_votes = stats[1] + stats[2] + stats[3]
-            
-            if total_votes > 0:  # Seulement les modules avec des votes
-                chart_data.append({
-                    'module': module['title'][:30] + '...' if len(module['title']) > 30 else module['title'],
-                    'priority_1': stats[1],
-                    'priority_2': stats[2], 
-                    'priority_3': stats[3],
-                    'total': total_votes
-                })
-        
-        # Données pour le graphique circulaire
-        total_priority_votes = sum(priority_counts.values())
-        pie_data = []
-        if total_priority_votes > 0:
-            pie_data = [
-                {'name': 'Priorité 1 (Important)', 'value': priority_counts[1], 'color': '#dc2626'},
-                {'name': 'Priorité 2 (Moyen)', 'value': priority_counts[2], 'color': '#2563eb'},
-                {'name': 'Priorité 3 (Découverte)', 'value': priority_counts[3], 'color': '#16a34a'}
-            ]
-        
-        # Données détaillées pour le tableau
-        detailed_data = []
-        for module in MODULES:
-            module_id = module['id']
-            stats = module_stats.get(module_id, {1: 0, 2: 0, 3: 0})
-            total_module_votes = stats[1] + stats[2] + stats[3]
-            
-            if total_module_votes > 0:  # Seulement les modules avec des votes
-                detailed_data.append({
-                    'module': module['title'],
-                    'duration': module['duration'],
-                    'priority_1': stats[1],
-                    'priority_2': stats[2],
-                    'priority_3': stats[3],
-                    'total': total_module_votes
-                })
-        
-        return jsonify({
-            'summary': {
-                'total_votes': sum(priority_counts.values()),
-                'participants': total_participants,
-                'modules_voted': len(modules_voted),
-                'total_modules': len(MODULES)
-            },
-            'chart_data': chart_data,
-            'pie_data': pie_data,
-            'detailed_data': detailed_data,
-            'participant_details': participant_details
-        })
+        session = sessions.get(session_id)
+        if session is None:
+            return session_not_found()
+        status, body, headers = session.results(request.headers.get('If-None-Match'))
+        return Response(body, status=status, headers=headers, mimetype='application/json')
     
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
+
+@app.route('/api/results/timeline', defaults={'session_id': DEFAULT_SESSION})
+@app.route('/api/sessions/<session_id>/results/timeline')
+def get_results_timeline(session_id):
+    """Chronologie des votes par intervalle (?bucket=1m|1h|1d, 1h par défaut)"""
+    try:
+        session = sessions.get(session_id)
+        if session is None:
+            return session_not_found()
+        status, body, headers = session.timeline(
+            request.args.get('bucket', '1h'), request.headers.get('If-None-Match'))
+        return Response(body, status=status, headers=headers, mimetype='application/json')
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/plan', defaults={'session_id': DEFAULT_SESSION})
+@app.route('/api/sessions/<session_id>/plan')
+def get_plan(session_id):
+    """Plan de formation optimal (?budget_hours=N[&weights=3,2,1])"""
+    try:
+        session = sessions.get(session_id)
+        if session is None:
+            return session_not_found()
+        budget_hours = parse_budget(request.args.get('budget_hours'))
+        weights = parse_weights(request.args.get('weights'))
+        status, body, headers = session.plan(budget_hours, weights, request.headers.get('If-None-Match'))
+        return Response(body, status=status, headers=headers, mimetype='application/json')
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/results/rollup')
+def get_rollup_results():
+    """Résultats consolidés des sessions (?sessions=a,b ; toutes par défaut)"""
+    try:
+        session_ids = [session_id for session_id in request.args.get('sessions', '').split(',') if session_id]
+        status, body, headers = sessions.rollup(session_ids, request.headers.get('If-None-Match'))
+        return Response(body, status=status, headers=headers, mimetype='application/json')
+
+    except KeyError:
+        return session_not_found()
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/results/stream')
+def stream_results():
+    """Flux SSE des résultats : agrégat complet à la connexion, puis deltas"""
+    return Response(
+        stream_with_context(results_broadcaster.stream(on_idle=voting.version)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Métriques au format texte Prometheus"""
+    if not metrics.enabled:
+        return jsonify({"error": "Métriques désactivées"}), 404
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
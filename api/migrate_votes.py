@@ -0,0 +1,27 @@
+"""Migration unique des votes JSON vers la table vote de SQLite.
+
+Usage (depuis le dossier api) :
+    python migrate_votes.py [data/votes.json]
+
+La migration ne fait rien si la table vote contient déjà des votes.
+"""
+import sys
+
+from flask import Flask
+
+from core import sql_store
+from models.engine import init_db
+from models.user import db
+
+def create_app():
+    app = Flask(__name__)
+    init_db(app)
+    return app
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else 'data/votes.json'
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        count = sql_store.migrate_json_votes(path)
+        print(f"{path} : {count} votes importés")
@@ -0,0 +1,146 @@
+"""Configuration du moteur SQLAlchemy et du pool de connexions de la base.
+
+Les réglages dépendent de l'environnement (DATABASE_PROFILE) et chacun
+peut être surchargé par une variable DB_<RÉGLAGE> (ex. DB_BUSY_TIMEOUT_MS).
+Pour SQLite, les PRAGMA sont appliqués à chaque nouvelle connexion.
+"""
+import os
+import sqlite3
+
+from sqlalchemy import event
+
+from models.user import db
+
+# Réglages par environnement. 'baseline' reproduit les valeurs par défaut
+# de SQLite (journal DELETE, sans attente sur verrou) pour les benchmarks.
+PROFILES = {
+    'development': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout_ms': 5000,
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_recycle': 3600,
+        'pool_pre_ping': False,
+        'statement_cache_size': 128,
+        'query_cache_size': 500,
+    },
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout_ms': 15000,
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        'statement_cache_size': 256,
+        'query_cache_size': 1000,
+    },
+    'test': {
+        'journal_mode': 'MEMORY',
+        'synchronous': 'OFF',
+        'busy_timeout_ms': 1000,
+        'pool_size': 2,
+        'max_overflow': 5,
+        'pool_recycle': -1,
+        'pool_pre_ping': False,
+        'statement_cache_size': 128,
+        'query_cache_size': 500,
+    },
+    'baseline': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout_ms': 0,
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_recycle': -1,
+        'pool_pre_ping': False,
+        'statement_cache_size': 128,
+        'query_cache_size': 500,
+    },
+}
+
+DEFAULT_PROFILE = 'development'
+
+JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SYNCHRONOUS_LEVELS = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+
+# Base SQLite par défaut, dans le dossier de l'application quel que soit le dossier courant
+DEFAULT_DATABASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'app.db')
+
+
+def database_uri(environ=os.environ):
+    """URI de la base : DATABASE_URL, sinon DEFAULT_DATABASE (api/database/app.db)"""
+    return environ.get('DATABASE_URL', 'sqlite:///' + DEFAULT_DATABASE)
+
+
+def database_settings(environ=os.environ):
+    """Réglages du profil DATABASE_PROFILE, surchargés par les variables DB_*"""
+    profile = environ.get('DATABASE_PROFILE', DEFAULT_PROFILE)
+    if profile not in PROFILES:
+        raise ValueError(f"Profil de base de données inconnu : {profile}")
+    settings = dict(PROFILES[profile])
+    for name, default in settings.items():
+        value = environ.get('DB_' + name.upper())
+        if value is None:
+            continue
+        if isinstance(default, bool):
+            settings[name] = value.lower() in ('1', 'true', 'yes')
+        elif isinstance(default, int):
+            settings[name] = int(value)
+        else:
+            settings[name] = value.upper()
+    if settings['journal_mode'] not in JOURNAL_MODES:
+        raise ValueError(f"Mode de journal SQLite inconnu : {settings['journal_mode']}")
+    if settings['synchronous'] not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Niveau synchronous SQLite inconnu : {settings['synchronous']}")
+    return settings
+
+
+def engine_options(uri, settings):
+    """Options de create_engine (SQLALCHEMY_ENGINE_OPTIONS) pour ces réglages"""
+    options = {
+        'pool_recycle': settings['pool_recycle'],
+        'pool_pre_ping': settings['pool_pre_ping'],
+        'query_cache_size': settings['query_cache_size'],
+    }
+    if uri.startswith('sqlite'):
+        options['connect_args'] = {
+            # Attente sur verrou du pilote, en secondes ; PRAGMA busy_timeout la remplace ensuite
+            'timeout': settings['busy_timeout_ms'] / 1000,
+            'cached_statements': settings['statement_cache_size'],
+            'check_same_thread': False,
+        }
+        # Base en mémoire : pool statique géré par Flask-SQLAlchemy
+        if uri in ('sqlite://', 'sqlite:///:memory:'):
+            return options
+    options['pool_size'] = settings['pool_size']
+    options['max_overflow'] = settings['max_overflow']
+    return options
+
+
+def apply_sqlite_pragmas(engine, settings):
+    """Applique journal, synchronous et busy_timeout à chaque connexion SQLite du moteur"""
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous={settings['synchronous']}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings['busy_timeout_ms'])}")
+        cursor.close()
+
+
+def init_db(app, environ=os.environ):
+    """Configure l'URI, le moteur et le pool de l'application, puis initialise db"""
+    uri = app.config.setdefault('SQLALCHEMY_DATABASE_URI', database_uri(environ))
+    settings = database_settings(environ)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(uri, settings)
+    if uri.startswith('sqlite:///') and uri != 'sqlite:///:memory:':
+        os.makedirs(os.path.dirname(os.path.abspath(uri[len('sqlite:///'):])), exist_ok=True)
+    db.init_app(app)
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            apply_sqlite_pragmas(db.engine, settings)
+    return settings
@@ -0,0 +1,32 @@
+from models.user import db
+
+class Vote(db.Model):
+    __tablename__ = 'vote'
+    __table_args__ = (
+        # Couvre le GROUP BY module_id, priority des résultats
+        db.Index('ix_vote_module_priority', 'module_id', 'priority'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    participant = db.Column(db.String(80), index=True)
+    module_id = db.Column(db.String(20), nullable=False)
+    priority = db.Column(db.SmallInteger, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<Vote {self.participant} {self.module_id}={self.priority}>'
+
+    def to_dict(self):
+        return {
+            'participant': self.participant,
+            'moduleId': self.module_id,
+            'priority': self.priority,
+            'timestamp': self.timestamp.isoformat()
+        }
+
+class VoteVersion(db.Model):
+    """Ligne unique dont la version augmente à chaque modification des votes"""
+    __tablename__ = 'vote_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
@@ -1,41 +1,39 @@
-import os
-import json
 from datetime import datetime
-from flask import Blueprint, jsonify, request
-from collections import defaultdict
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from core import CatalogCache, PayloadCache, VotingService, anonymous_participant, create_storage, normalize_module_id
 
 modules_bp = Blueprint('modules', __name__)
 
-def get_data_file_path(filename):
-    """Get the full path to a data file"""
-    return os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', filename)
+# Catalog parsed once and reloaded only when participants.json or modules.json change
+catalog_cache = CatalogCache()
 
-def load_json_file(filename):
-    """Load data from a JSON file"""
-    file_path = get_data_file_path(filename)
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
-    except json.JSONDecodeError:
-        return []
-
-def save_json_file(filename, data):
-    """Save data to a JSON file"""
-    file_path = get_data_file_path(filename)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def get_voting():
+    """The voting service of the current app, created on first use.
+
+    Votes live in the store named by the VOTES_STORAGE config key
+    ('journal' by default, shared with main.py through data/votes.json).
+    The service follows catalog reloads, so modules added to modules.json
+    can be voted on without a restart.
+    """
+    catalog = catalog_cache.get()
+    voting = current_app.extensions.get('voting')
+    if voting is None:
+        voting = VotingService(catalog, create_storage(current_app.config.get('VOTES_STORAGE', 'journal')))
+        current_app.extensions['voting'] = voting
+    elif voting.catalog.version != catalog.version:
+        voting.catalog = catalog
+    return voting
 
 @modules_bp.route('/modules', methods=['GET'])
 def get_modules():
     """Get all available modules"""
     try:
-        modules = load_json_file('modules.json')
-        return jsonify({
+        body = catalog_cache.get().encoded('modules', lambda catalog: {
             'success': True,
-            'data': modules
+            'data': catalog.modules
         })
+        return Response(body, mimetype='application/json')
     except Exception as e:
         return jsonify({
             'success': False,
@@ -64,25 +62,31 @@ def submit_votes():
                     'error': 'Invalid vote format. Each vote must have moduleId and priority'
                 }), 400
             
-            if vote['priority'] not in [1, 2, 3]:
+            if type(vote['priority']) is not int or vote['priority'] not in [1, 2, 3]:
                 return jsonify({
                     'success': False,
                     'error': 'Priority must be 1, 2, or 3'
                 }), 400
         
-        # Load existing votes
-        existing_votes = load_json_file('votes.json')
-        
-        # Add timestamp to each vote
+        # Named ballots go through the same checks as main.py; anonymous ones only need known modules
+        voting = get_voting()
+        ballot = {vote['moduleId']: vote['priority'] for vote in votes}
+        participant = data.get('participant')
+        if participant is not None:
+            error = voting.validate(participant, ballot)
+        else:
+            unknown = [module_id for module_id in ballot
+                       if normalize_module_id(module_id) not in voting.catalog.module_index]
+            error = f'Unknown module: {unknown[0]}' if unknown else None
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+
+        # Store the submission as one ballot; anonymous ones are keyed by timestamp
         timestamp = datetime.now().isoformat()
-        for vote in votes:
-            vote['timestamp'] = timestamp
-        
-        # Append new votes
-        existing_votes.extend(votes)
-        
-        # Save updated votes
-        save_json_file('votes.json', existing_votes)
+        voting.submit(participant or anonymous_participant(timestamp), ballot, timestamp)
         
         return jsonify({
             'success': True,
@@ -95,61 +99,41 @@ def submit_votes():
             'error': str(e)
         }), 500
 
+# Serialized results bodies, keyed by data version; concurrent misses share one computation
+results_cache = PayloadCache()
+
+def data_version():
+    """Version key of the cached results: vote store version and catalog files state"""
+    voting = get_voting()
+    return (current_app.config.get('VOTES_STORAGE'), voting.version(), catalog_cache.get().version)
+
+def cached_response(view, build):
+    """Serve a cached JSON body with its ETag, or 304 if the client already has it"""
+    status, body, headers = results_cache.conditional(
+        view, data_version(), build, request.headers.get('If-None-Match'))
+    return Response(body, status=status, headers=headers, mimetype='application/json')
+
+def build_results():
+    """Build the aggregated voting results"""
+    modules = catalog_cache.get().modules
+    return {
+        'success': True,
+        'data': get_voting().aggregate().module_results(modules)
+    }
+
+def build_chart_data():
+    """Build the results formatted for charts"""
+    modules = catalog_cache.get().modules
+    return {
+        'success': True,
+        'data': get_voting().aggregate().chart_data(modules)
+    }
+
 @modules_bp.route('/results', methods=['GET'])
 def get_results():
     """Get aggregated voting results"""
     try:
-        # Load modules and votes
-        modules = load_json_file('modules.json')
-        votes = load_json_file('votes.json')
-        
-        # Create module lookup
-        module_lookup = {module['id']: module for module in modules}
-        
-        # Aggregate votes by module and priority
-        results = defaultdict(lambda: {'priority_1': 0, 'priority_2': 0, 'priority_3': 0, 'total': 0})
-        
-        for vote in votes:
-            module_id = vote['moduleId']
-            priority = vote['priority']
-            
-            if module_id in module_lookup:
-                results[module_id][f'priority_{priority}'] += 1
-                results[module_id]['total'] += 1
-        
-        # Format results for frontend
-        formatted_results = []
-        for module_id, vote_counts in results.items():
-            if module_id in module_lookup:
-                module_info = module_lookup[module_id]
-                formatted_results.append({
-                    'moduleId': module_id,
-                    'title': module_info['title'],
-                    'duration': module_info['duration'],
-                    'votes': vote_counts
-                })
-        
-        # Sort by total votes (descending)
-        formatted_results.sort(key=lambda x: x['votes']['total'], reverse=True)
-        
-        # Calculate summary statistics
-        total_votes = len(votes)
-        total_participants = len(set(vote.get('timestamp', '') for vote in votes))
-        
-        summary = {
-            'totalVotes': total_votes,
-            'totalParticipants': total_participants,
-            'totalModules': len(modules),
-            'modulesWithVotes': len(results)
-        }
-        
-        return jsonify({
-            'success': True,
-            'data': {
-                'results': formatted_results,
-                'summary': summary
-            }
-        })
+        return cached_response('results', build_results)
         
     except Exception as e:
         return jsonify({
@@ -161,74 +145,7 @@ def get_results():
 def get_chart_data():
     """Get data formatted for charts"""
     try:
-        # Load modules and votes
-        modules = load_json_file('modules.json')
-        votes = load_json_file('votes.json')
-        
-        # Create module lookup
-        module_lookup = {module['id']: module for module in modules}
-        
-        # Aggregate votes by module and priority
-        results = defaultdict(lambda: {'priority_1': 0, 'priority_2': 0, 'priority_3': 0, 'total': 0})
-        
-        for vote in votes:
-            module_id = vote['moduleId']
-            priority = vote['priority']
-            
-            if module_id in module_lookup:
-                results[module_id][f'priority_{priority}'] += 1
-                results[module_id]['total'] += 1
-        
-        # Format for Chart.js
-        labels = []
-        priority_1_data = []
-        priority_2_data = []
-        priority_3_data = []
-        total_data = []
-        
-        # Sort modules by total votes
-        sorted_modules = sorted(results.items(), key=lambda x: x[1]['total'], reverse=True)
-        
-        for module_id, vote_counts in sorted_modules:
-            if module_id in module_lookup:
-                module_info = module_lookup[module_id]
-                labels.append(f"{module_info['title']} ({vote_counts['total']} votes)")
-                priority_1_data.append(vote_counts['priority_1'])
-                priority_2_data.append(vote_counts['priority_2'])
-                priority_3_data.append(vote_counts['priority_3'])
-                total_data.append(vote_counts['total'])
-        
-        chart_data = {
-            'labels': labels,
-            'datasets': [
-                {
-                    'label': 'Priorité 1 (Important)',
-                    'data': priority_1_data,
-                    'backgroundColor': 'rgba(220, 38, 127, 0.8)',
-                    'borderColor': 'rgba(220, 38, 127, 1)',
-                    'borderWidth': 1
-                },
-                {
-                    'label': 'Priorité 2 (Moyen)',
-                    'data': priority_2_data,
-                    'backgroundColor': 'rgba(59, 130, 246, 0.8)',
-                    'borderColor': 'rgba(59, 130, 246, 1)',
-                    'borderWidth': 1
-                },
-                {
-                    'label': 'Priorité 3 (Découverte)',
-                    'data': priority_3_data,
-                    'backgroundColor': 'rgba(16, 185, 129, 0.8)',
-                    'borderColor': 'rgba(16, 185, 129, 1)',
-                    'borderWidth': 1
-                }
-            ]
-        }
-        
-        return jsonify({
-            'success': True,
-            'data': chart_data
-        })
+        return cached_response('chart-data', build_chart_data)
         
     except Exception as e:
         return jsonify({
@@ -242,6 +159,7 @@ def health_check():
     return jsonify({
         'success': True,
         'message': 'API is running',
-        'timestamp': datetime.now().isoformat()
+        'timestamp': datetime.now().isoformat(),
+        'coalescedRequests': results_cache.coalesced
     })
 
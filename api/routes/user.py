@@ -1,12 +1,78 @@
-from flask import Blueprint, jsonify, request
+import json
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context, url_for
+from sqlalchemy.exc import IntegrityError
 from src.models.user import User, db
 
 user_bp = Blueprint('user', __name__)
 
+# Page size of GET /users when no limit is given, and its upper bound
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Rows fetched per round trip by the streamed export
+EXPORT_BATCH_SIZE = 1000
+
+# Maximum number of rows accepted by one bulk request
+MAX_BULK_SIZE = 1000
+
+# Unique user fields and their maximum length
+UNIQUE_FIELDS = {'username': 80, 'email': 120}
+
+# Plain column tuples: listing rows skips ORM object hydration and to_dict
+USER_COLUMNS = (User.id, User.username, User.email)
+
+def user_row(row):
+    return {'id': row.id, 'username': row.username, 'email': row.email}
+
+def parse_page_args(args):
+    """Returns (limit, after) from the query string; raises ValueError if invalid"""
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        after = int(args.get('after', 0))
+    except ValueError:
+        raise ValueError('limit and after must be integers')
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    if after < 0:
+        raise ValueError('after must be a non-negative user id')
+    return limit, after
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """Lists users by ascending id, one page at a time.
+
+    Keyset pagination: `after` is the last id of the previous page, so every
+    page is an index range scan on the primary key whatever its position.
+    The next page is announced in the Link header (rel="next").
+    """
+    try:
+        limit, after = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    rows = db.session.execute(
+        db.select(*USER_COLUMNS).where(User.id > after).order_by(User.id).limit(limit)
+    ).all()
+    response = jsonify([user_row(row) for row in rows])
+    if len(rows) == limit:
+        next_url = url_for('.get_users', after=rows[-1].id, limit=limit)
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
+
+@user_bp.route('/users/export', methods=['GET'])
+def export_users():
+    """Streams every user as one JSON array, without loading the table in memory"""
+    def generate():
+        result = db.session.execute(
+            db.select(*USER_COLUMNS).order_by(User.id).execution_options(yield_per=EXPORT_BATCH_SIZE))
+        separator = '['
+        for row in result:
+            yield separator + json.dumps(user_row(row))
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -37,3 +103,168 @@ def delete_user(user_id):
     db.session.delete(user)
     db.session.commit()
     return '', 204
+
+def read_bulk_body():
+    """Returns the JSON array of a bulk request; raises ValueError if invalid"""
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        raise ValueError('body must be a JSON array')
+    if len(items) > MAX_BULK_SIZE:
+        raise ValueError(f'at most {MAX_BULK_SIZE} rows per request')
+    return items
+
+def check_user_fields(item, required):
+    """Returns the error of a user row, or None"""
+    if not isinstance(item, dict):
+        return 'row must be an object'
+    for field, max_length in UNIQUE_FIELDS.items():
+        if field not in item:
+            if required:
+                return f'{field} is required'
+            continue
+        value = item[field]
+        if not isinstance(value, str) or not value or len(value) > max_length:
+            return f'{field} must be a non-empty string of at most {max_length} characters'
+    return None
+
+def find_conflicts(rows):
+    """Returns {index: error} for rows whose username or email is taken.
+
+    A value is taken if another user already holds it, or if an earlier row
+    of the same batch claims it. Existing owners are fetched in one query.
+    """
+    values = {field: {row[field] for row in rows.values() if field in row} for field in UNIQUE_FIELDS}
+    owners = {field: {} for field in UNIQUE_FIELDS}
+    if any(values.values()):
+        existing = db.session.execute(db.select(*USER_COLUMNS).where(db.or_(
+            User.username.in_(values['username']), User.email.in_(values['email'])
+        )))
+        for row in existing:
+            for field in UNIQUE_FIELDS:
+                owners[field][getattr(row, field)] = row.id
+
+    conflicts = {}
+    claimed = {field: set() for field in UNIQUE_FIELDS}
+    for index, row in rows.items():
+        for field in UNIQUE_FIELDS:
+            value = row.get(field)
+            if value is None:
+                continue
+            owner = owners[field].get(value)
+            if value in claimed[field]:
+                conflicts[index] = f'{field} appears twice in the batch'
+            elif owner is not None and owner != row.get('id'):
+                conflicts[index] = f'{field} already exists'
+            if index in conflicts:
+                break
+        else:
+            for field in UNIQUE_FIELDS:
+                if field in row:
+                    claimed[field].add(row[field])
+    return conflicts
+
+def commit_bulk(statement, rows):
+    """Runs one executemany statement and commits; returns its result, or None on a conflict"""
+    try:
+        result = db.session.execute(statement, rows)
+        db.session.commit()
+        return result
+    except IntegrityError:
+        # A concurrent request took a value between the check and the write
+        db.session.rollback()
+        return None
+
+@user_bp.route('/users/bulk', methods=['POST'])
+def create_users():
+    """Creates users from an array of {username, email} in one transaction.
+
+    Rows that are invalid or whose username/email is already taken are
+    skipped and reported by index; the others are inserted together.
+    """
+    try:
+        items = read_bulk_body()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    errors = {}
+    rows = {}
+    for index, item in enumerate(items):
+        error = check_user_fields(item, required=True)
+        if error:
+            errors[index] = error
+        else:
+            rows[index] = {'username': item['username'], 'email': item['email']}
+    for index, error in find_conflicts(rows).items():
+        errors[index] = error
+        del rows[index]
+
+    created = []
+    if rows:
+        result = commit_bulk(
+            db.insert(User).returning(User.id, sort_by_parameter_order=True), list(rows.values()))
+        if result is None:
+            return jsonify({'error': 'username or email conflict, retry the request'}), 409
+        created = [dict(row, id=user_id) for row, user_id in zip(rows.values(), result.scalars())]
+    return jsonify({
+        'created': created,
+        'errors': [{'index': index, 'error': error} for index, error in sorted(errors.items())]
+    }), 201 if created else 200
+
+@user_bp.route('/users/bulk', methods=['PUT'])
+def update_users():
+    """Updates users from an array of {id, username?, email?} in one transaction"""
+    try:
+        items = read_bulk_body()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    errors = {}
+    rows = {}
+    for index, item in enumerate(items):
+        error = check_user_fields(item, required=False)
+        if error is None and (not isinstance(item.get('id'), int) or isinstance(item['id'], bool)):
+            error = 'id must be an integer'
+        if error is None and not any(field in item for field in UNIQUE_FIELDS):
+            error = 'nothing to update'
+        if error:
+            errors[index] = error
+        else:
+            rows[index] = {field: item[field] for field in ('id', *UNIQUE_FIELDS) if field in item}
+
+    # Only the first row of an id is applied, as for a repeated username or email
+    seen = set()
+    for index in list(rows):
+        if rows[index]['id'] in seen:
+            errors[index] = 'id appears twice in the batch'
+            del rows[index]
+        else:
+            seen.add(rows[index]['id'])
+
+    known = set(db.session.scalars(db.select(User.id).where(User.id.in_([row['id'] for row in rows.values()]))))
+    for index in [index for index, row in rows.items() if row['id'] not in known]:
+        errors[index] = 'user not found'
+        del rows[index]
+    for index, error in find_conflicts(rows).items():
+        errors[index] = error
+        del rows[index]
+
+    if rows and commit_bulk(db.update(User), list(rows.values())) is None:
+        return jsonify({'error': 'username or email conflict, retry the request'}), 409
+    return jsonify({
+        'updated': [row['id'] for row in rows.values()],
+        'errors': [{'index': index, 'error': error} for index, error in sorted(errors.items())]
+    })
+
+@user_bp.route('/users/bulk', methods=['DELETE'])
+def delete_users():
+    """Deletes the users of an array of ids with a single DELETE ... WHERE id IN"""
+    try:
+        ids = read_bulk_body()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not all(isinstance(user_id, int) and not isinstance(user_id, bool) for user_id in ids):
+        return jsonify({'error': 'body must be an array of user ids'}), 400
+
+    deleted = list(db.session.scalars(db.delete(User).where(User.id.in_(ids)).returning(User.id)))
+    db.session.commit()
+    return jsonify({'deleted': sorted(deleted), 'not_found': sorted(set(ids) - set(deleted))})
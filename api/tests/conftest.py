@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+# Les front-ends lisent leur configuration à l'import : votes en mémoire,
+# sessions dans un dossier temporaire, jamais dans data/
+os.environ['VOTES_STORAGE'] = 'memory'
+os.environ['SESSIONS_DIR'] = tempfile.mkdtemp(prefix='sessions-')
@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+from core.aggregate import PRIORITIES, VoteAggregate, as_priority
+
+MODULES = [
+    {'id': f'm{index}', 'title': f'Module {index} au titre assez long pour être raccourci', 'duration': '4 heures'}
+    for index in range(12)
+]
+
+
+def recount(votes):
+    """Compteurs {module_id: {priorité: nombre}} recalculés naïvement depuis les bulletins"""
+    stats = {}
+    for vote_data in votes.values():
+        for module_id, priority in vote_data['votes'].items():
+            stats.setdefault(module_id, {priority: 0 for priority in PRIORITIES})[priority] += 1
+    return stats
+
+
+def expected_results(votes):
+    """Résultats attendus, calculés comme l'implémentation à dictionnaires d'avant la matrice"""
+    stats = recount(votes)
+    detailed = [
+        {
+            'module': module['title'],
+            'duration': module['duration'],
+            'priority_1': stats[module['id']][1],
+            'priority_2': stats[module['id']][2],
+            'priority_3': stats[module['id']][3],
+            'total': sum(stats[module['id']].values())
+        }
+        for module in MODULES if sum(stats.get(module['id'], {}).values())
+    ]
+    totals = {priority: sum(module_stats[priority] for module_stats in stats.values()) for priority in PRIORITIES}
+    return {
+        'summary': {
+            'total_votes': sum(totals.values()),
+            'participants': len(votes),
+            'modules_voted': sum(1 for module_stats in stats.values() if any(module_stats.values())),
+            'total_modules': len(MODULES)
+        },
+        'detailed_data': detailed,
+        'pie_values': [totals[priority] for priority in PRIORITIES] if sum(totals.values()) else [],
+    }
+
+
+def observed_results(aggregate):
+    results = aggregate.results(MODULES)
+    return {
+        'summary': results['summary'],
+        'detailed_data': results['detailed_data'],
+        'pie_values': [slice_['value'] for slice_ in results['pie_data']],
+    }
+
+
+def random_ballot(rng):
+    modules = rng.sample(MODULES, rng.randint(1, 6))
+    return {
+        'timestamp': f'2025-01-01T10:{rng.randint(0, 59):02d}:00',
+        'votes': {module['id']: rng.choice(PRIORITIES) for module in modules}
+    }
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_deltas_match_a_full_recount(seed):
+    rng = random.Random(seed)
+    participants = [f'p{index}' for index in range(30)]
+    votes = {}
+    aggregate = VoteAggregate()
+    for _ in range(300):
+        participant = rng.choice(participants)
+        previous = votes.get(participant)
+        if previous is not None and rng.random() < 0.25:
+            del votes[participant]
+            aggregate.apply_change(participant, previous, None)
+        else:
+            votes[participant] = random_ballot(rng)
+            aggregate.apply_change(participant, previous, votes[participant])
+
+    assert observed_results(aggregate) == expected_results(votes)
+    assert observed_results(VoteAggregate.from_votes(votes)) == expected_results(votes)
+    rebuilt = VoteAggregate.from_votes(votes)
+    assert aggregate.module_results(MODULES) == rebuilt.module_results(MODULES)
+    assert aggregate.chart_data(MODULES) == rebuilt.chart_data(MODULES)
+
+
+def test_module_results_are_ranked_by_total():
+    votes = {
+        'a': {'timestamp': '', 'votes': {'m0': 1, 'm1': 2, 'm2': 3}},
+        'b': {'timestamp': '', 'votes': {'m2': 1}},
+    }
+    results = VoteAggregate.from_votes(votes).module_results(MODULES)
+
+    assert [row['moduleId'] for row in results['results']] == ['m2', 'm0', 'm1']
+    assert results['results'][0]['votes'] == {'priority_1': 1, 'priority_2': 0, 'priority_3': 1, 'total': 2}
+    assert results['summary'] == {'totalVotes': 4, 'totalParticipants': 2, 'totalModules': 12, 'modulesWithVotes': 3}
+
+
+def test_stored_priorities_are_normalized_or_skipped():
+    assert as_priority(2) == 2
+    assert as_priority(2.0) == 2
+    for value in (0, 4, 1.5, True, '1', None):
+        assert as_priority(value) is None
+
+    aggregate = VoteAggregate.from_votes({
+        'a': {'timestamp': '', 'votes': {'m0': 1.0, 'm1': True, 'm2': 'x', 'm3': 7}},
+    })
+    aggregate.apply_change('b', None, {'timestamp': '', 'votes': {'m0': 3.0, 'm1': 2.5}})
+
+    summary = aggregate.results(MODULES)['summary']
+    assert summary['total_votes'] == 2
+    assert summary['modules_voted'] == 1
+
+
+def test_legacy_list_format_is_accepted():
+    aggregate = VoteAggregate.from_votes([
+        {'moduleId': 'm0', 'priority': 1, 'timestamp': 't1'},
+        {'moduleId': 'm1', 'priority': 2, 'timestamp': 't1'},
+        {'moduleId': 'm1', 'priority': 3, 'timestamp': 't2'},
+    ])
+
+    assert aggregate.results(MODULES)['summary']['participants'] == 2
+    assert aggregate.module_votes(MODULES) == [(MODULES[0], 1, 0, 0, 1), (MODULES[1], 0, 1, 1, 2)]
+
+
+def test_merge_sums_sessions():
+    first = VoteAggregate.from_votes({'a': {'timestamp': '', 'votes': {'m0': 1}}})
+    second = VoteAggregate.from_votes({'a': {'timestamp': '', 'votes': {'m0': 2, 'm1': 1}}})
+
+    merged = VoteAggregate.merge({'s1': first, 's2': second})
+
+    assert merged.module_votes(MODULES) == [(MODULES[0], 1, 1, 0, 2), (MODULES[1], 1, 0, 0, 1)]
+    assert sorted(merged.participants) == ['s1/a', 's2/a']
@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import pytest
+
+import asgi
+
+
+def call(method, path, body=None, headers=None, query=''):
+    """Requête en processus sur l'application ASGI : (statut, en-têtes, corps)"""
+    async def run():
+        raw = body if isinstance(body, bytes) else b'' if body is None else json.dumps(body).encode('utf-8')
+        messages = [{'type': 'http.request', 'body': raw, 'more_body': False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': query.encode('latin-1'),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in (headers or {}).items()],
+        }
+        await asgi.app(scope, receive, send)
+        return sent
+
+    sent = asyncio.run(run())
+    start = sent[0]
+    response_headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in start['headers']}
+    return start['status'], response_headers, b''.join(message.get('body', b'') for message in sent[1:])
+
+
+def call_json(method, path, body=None, **kwargs):
+    status, headers, raw = call(method, path, body, **kwargs)
+    return status, json.loads(raw) if raw else None
+
+
+@pytest.fixture
+def participant():
+    participant = asgi.catalog.participants[0]
+    yield participant
+    asgi.voting.reset(participant)
+
+
+def test_health():
+    status, body = call_json('GET', '/api/health')
+
+    assert status == 200
+    assert body['status'] == 'healthy'
+
+
+def test_submit_then_read_votes_and_results(participant):
+    before = call_json('GET', '/api/results')[1]['summary']['total_votes']
+
+    status, body = call_json('POST', '/api/votes', {'participant': participant, 'votes': {'m1_1': 1, 'm2_1': 3}})
+
+    assert status == 200
+    assert body['count'] == 2
+    assert call_json('GET', f'/api/votes/{participant}')[1] == {'m1_1': 1, 'm2_1': 3}
+    assert call_json('GET', '/api/results')[1]['summary']['total_votes'] == before + 2
+
+    assert call_json('DELETE', f'/api/votes/{participant}')[0] == 200
+    assert call_json('GET', f'/api/votes/{participant}')[1] == {}
+
+
+def test_results_revalidate_with_etag(participant):
+    status, headers, _ = call('GET', '/api/results')
+    assert status == 200
+
+    assert call('GET', '/api/results', headers={'If-None-Match': headers['etag']})[0] == 304
+
+    call('POST', '/api/votes', {'participant': participant, 'votes': {'m1_2': 2}})
+    assert call('GET', '/api/results', headers={'If-None-Match': headers['etag']})[0] == 200
+
+
+@pytest.mark.parametrize('body, error', [
+    (b'{not json', 'JSON invalide'),
+    ({'participant': 'Personne', 'votes': {'m1_1': 1}}, 'Participant non autorisé'),
+    ({'participant': asgi.catalog.participants[0], 'votes': {'m1_1': 1.0}}, 'La priorité doit être 1, 2 ou 3'),
+])
+def test_invalid_submissions_are_rejected(body, error):
+    status, payload = call_json('POST', '/api/votes', body)
+
+    assert status == 400
+    assert payload['error'] == error
+
+
+def test_timeline_and_plan(participant):
+    call('POST', '/api/votes', {'participant': participant, 'votes': {'m1_1': 1}})
+
+    status, timeline = call_json('GET', '/api/results/timeline', query='bucket=1d')
+    assert status == 200
+    assert timeline['summary']['total_votes'] >= 1
+    assert call_json('GET', '/api/results/timeline', query='bucket=2w')[0] == 400
+
+    status, plan = call_json('GET', '/api/plan', query='budget_hours=8')
+    assert status == 200
+    assert plan['summary']['total_hours'] <= 8
+    assert call_json('GET', '/api/plan', query='budget_hours=zero')[0] == 400
+
+
+def test_unknown_session_and_route():
+    assert call_json('GET', '/api/sessions/nope/results')[0] == 404
+    assert call_json('GET', '/api/nothing')[0] == 404
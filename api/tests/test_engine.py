@@ -0,0 +1,12 @@
+import os
+
+from models.engine import database_uri
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_default_database_does_not_depend_on_the_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    assert database_uri({}) == 'sqlite:///' + os.path.join(API_DIR, 'database', 'app.db')
+    assert database_uri({'DATABASE_URL': 'sqlite://'}) == 'sqlite://'
@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+
+import pytest
+
+from core.journal import BallotJournal
+
+
+def ballot(priority=1, module_id='m1_1'):
+    return {'timestamp': '2025-01-01T10:00:00', 'votes': {module_id: priority}}
+
+
+def open_journal(path, compact_threshold=1024 * 1024):
+    journal = BallotJournal(path, compact_threshold)
+    journal.load()
+    return journal
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'votes.json')
+
+
+def test_replay_applies_puts_and_deletes(path):
+    journal = open_journal(path)
+    journal.put('a', ballot(1))
+    journal.put('b', ballot(2))
+    journal.put('a', ballot(3))
+    journal.delete('b')
+
+    assert journal.state == {'a': ballot(3)}
+    assert open_journal(path).state == {'a': ballot(3)}
+
+
+def test_compaction_moves_the_journal_into_the_snapshot(path):
+    journal = open_journal(path)
+    for index in range(20):
+        journal.put(f'p{index}', ballot())
+    journal.compact(wait=True)
+
+    assert not os.path.exists(journal.journal_path)
+    assert not os.path.exists(journal.compacting_path)
+    with open(path, encoding='utf-8') as f:
+        assert len(json.load(f)) == 20
+
+    journal.put('after', ballot(2))
+    assert set(open_journal(path).state) == {f'p{index}' for index in range(20)} | {'after'}
+
+
+def test_other_process_follows_appends_and_rotations(path):
+    reader = open_journal(path)
+    writer = open_journal(path)
+    writer.put('a', ballot())
+    assert set(reader.sync()) == {'a'}
+
+    writer.compact(wait=True)
+    writer.put('b', ballot())
+    assert set(reader.sync()) == {'a', 'b'}
+
+
+def test_reused_inode_is_detected_by_the_journal_header(path):
+    reader = open_journal(path)
+    writer = open_journal(path)
+    for index in range(3):
+        writer.put(f'old{index}', ballot())
+    assert len(reader.sync()) == 3
+
+    # Bascule qui réutilise l'inode : instantané réécrit, journal vidé en place puis réécrit plus long
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({**writer.sync(), 'snapshot': ballot()}, f)
+    with open(writer.journal_path, 'r+b') as f:
+        f.truncate(0)
+    rewriter = open_journal(path)
+    for index in range(3):
+        rewriter.put(f'new{index}', ballot(2))
+    assert os.path.getsize(writer.journal_path) >= reader._offset
+
+    assert set(reader.sync()) == {'old0', 'old1', 'old2', 'snapshot', 'new0', 'new1', 'new2'}
+
+
+def test_torn_last_line_is_dropped_before_the_next_write(path):
+    journal = open_journal(path)
+    journal.put('a', ballot())
+    with open(journal.journal_path, 'ab') as f:
+        f.write(b'{"op":"put","participant":"b","times')
+
+    journal.put('c', ballot())
+
+    assert set(journal.sync()) == {'a', 'c'}
+    assert set(open_journal(path).state) == {'a', 'c'}
+
+
+def test_torn_last_line_is_dropped_at_load(path):
+    open_journal(path).put('a', ballot())
+    with open(os.path.splitext(path)[0] + '.journal', 'ab') as f:
+        f.write(b'{"op":"put","participant":"b","times')
+
+    journal = open_journal(path)
+    journal.put('c', ballot())
+
+    assert set(open_journal(path).state) == {'a', 'c'}
+
+
+def test_undecodable_line_is_skipped(path):
+    journal = open_journal(path)
+    journal.put('a', ballot())
+    with open(journal.journal_path, 'ab') as f:
+        f.write(b'not json\n[1, 2]\n')
+    journal.put('b', ballot())
+
+    assert set(open_journal(path).state) == {'a', 'b'}
+
+
+def test_stale_compacting_file_is_recovered(path):
+    compacting_path = os.path.splitext(path)[0] + '.journal.compacting'
+    with open(compacting_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'op': 'put', 'participant': 'crashed', **ballot(2)}) + '\n')
+
+    journal = open_journal(path)
+    journal.put('after', ballot())
+    journal.compact(wait=True)
+
+    assert not os.path.exists(compacting_path)
+    assert set(open_journal(path).state) == {'crashed', 'after'}
+
+
+def test_legacy_list_snapshot_is_read_as_anonymous_ballots(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([
+            {'moduleId': 'm1.1', 'priority': 1, 'timestamp': 't1'},
+            {'moduleId': 'm1.2', 'priority': 2, 'timestamp': 't1'},
+            {'moduleId': 'm2.1', 'priority': 3, 'timestamp': 't2'},
+        ], f)
+
+    assert open_journal(path).state == {
+        'anonyme:t1': {'timestamp': 't1', 'votes': {'m1_1': 1, 'm1_2': 2}},
+        'anonyme:t2': {'timestamp': 't2', 'votes': {'m2_1': 3}},
+    }
+
+
+def test_concurrent_writers_lose_no_ballot(path):
+    journal = open_journal(path, compact_threshold=4096)
+
+    def write(thread):
+        for index in range(50):
+            journal.put(f't{thread}-{index}', ballot())
+
+    threads = [threading.Thread(target=write, args=(thread,)) for thread in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.compact(wait=True)
+
+    assert len(open_journal(path).state) == 400
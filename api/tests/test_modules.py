@@ -0,0 +1,43 @@
+import json
+
+import pytest
+from flask import Flask
+
+from core import CatalogCache
+from routes import modules
+
+
+def write_catalog(data_dir, module_ids):
+    with open(data_dir / 'participants.json', 'w', encoding='utf-8') as f:
+        json.dump(['alice'], f)
+    with open(data_dir / 'modules.json', 'w', encoding='utf-8') as f:
+        json.dump([{'id': module_id, 'title': module_id, 'duration': '1 heure'} for module_id in module_ids], f)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    write_catalog(tmp_path, ['m1_1'])
+    monkeypatch.setattr(modules, 'catalog_cache', CatalogCache(str(tmp_path), check_interval=0))
+    return tmp_path
+
+
+@pytest.fixture
+def client(data_dir):
+    app = Flask(__name__)
+    app.config['VOTES_STORAGE'] = 'memory'
+    app.register_blueprint(modules.modules_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def vote(client, module_id):
+    return client.post('/api/votes', json={'participant': 'alice', 'votes': [{'moduleId': module_id, 'priority': 1}]})
+
+
+def test_modules_added_to_the_catalog_can_be_voted_on_without_restart(client, data_dir):
+    assert vote(client, 'm1_1').status_code == 200
+    assert vote(client, 'm9_9').status_code == 400
+
+    write_catalog(data_dir, ['m1_1', 'm9_9'])
+
+    assert vote(client, 'm9_9').status_code == 200
+    assert [module['id'] for module in client.get('/api/modules').get_json()['data']] == ['m1_1', 'm9_9']
@@ -0,0 +1,94 @@
+import itertools
+import random
+
+import pytest
+
+from core.plan import TrainingPlanner, parse_budget, parse_duration, parse_weights
+
+DURATIONS = ['30 minutes', '45 minutes', '1 heure', '1h30', '2 heures', '2h15', '3 heures', '4 heures', '5 hours']
+
+
+def module_votes(rng, count):
+    rows = []
+    for index in range(count):
+        p1, p2, p3 = (rng.randint(0, 4) for _ in range(3))
+        module = {'id': f'm{index}', 'title': f'Module {index}', 'duration': rng.choice(DURATIONS)}
+        rows.append((module, p1, p2, p3, p1 + p2 + p3))
+    return rows
+
+
+def best_score(rows, budget_hours, weights):
+    """Meilleur score par énumération de tous les sous-ensembles de modules"""
+    items = [(parse_duration(module['duration']), weights[0] * p1 + weights[1] * p2 + weights[2] * p3)
+             for module, p1, p2, p3, _ in rows]
+    best = 0
+    for size in range(len(items) + 1):
+        for subset in itertools.combinations(items, size):
+            if sum(hours for hours, _ in subset) <= budget_hours + 1e-9:
+                best = max(best, sum(score for _, score in subset))
+    return best
+
+
+@pytest.mark.parametrize('seed', range(15))
+def test_plan_matches_exhaustive_search(seed):
+    rng = random.Random(seed)
+    rows = module_votes(rng, 9)
+    budget_hours = rng.choice([1, 2.5, 4, 7.75, 12])
+    weights = (3.0, 2.0, 1.0) if seed % 2 else (1.0, 1.0, 1.0)
+
+    plan = TrainingPlanner().plan(seed, rows, budget_hours, weights)
+
+    assert plan['summary']['total_score'] == pytest.approx(best_score(rows, budget_hours, weights))
+    assert plan['summary']['total_hours'] <= budget_hours + 1e-9
+    assert plan['summary']['remaining_hours'] >= -1e-9
+
+
+def test_durations_between_quarter_hours_never_exceed_the_budget():
+    rows = [({'id': f'm{index}', 'title': f'Module {index}', 'duration': '35 minutes'}, 1, 0, 0, 1)
+            for index in range(2)]
+
+    plan = TrainingPlanner().plan(0, rows, 1)
+
+    assert len(plan['modules']) == 1
+    assert plan['summary']['total_hours'] <= 1
+
+
+def test_plan_is_cached_per_version_weights_and_budget():
+    rows = module_votes(random.Random(0), 6)
+    planner = TrainingPlanner(cache_size=2)
+
+    first = planner.plan(1, rows, 4, (3.0, 2.0, 1.0))
+    assert planner.plan(1, rows, 4, (3.0, 2.0, 1.0)) == first
+    planner.plan(1, rows, 5, (3.0, 2.0, 1.0))
+    planner.plan(2, rows, 4, (3.0, 2.0, 1.0))
+
+    assert list(planner._tables) == [(1, (3.0, 2.0, 1.0), 20), (2, (3.0, 2.0, 1.0), 16)]
+
+
+def test_unreadable_durations_are_reported():
+    rows = [({'id': 'm0', 'title': 'Sans durée', 'duration': 'variable'}, 1, 0, 0, 1)]
+
+    plan = TrainingPlanner().plan(0, rows, 10)
+
+    assert plan['modules'] == []
+    assert plan['summary']['unreadable_durations'] == ['Sans durée']
+
+
+@pytest.mark.parametrize('text, hours', [
+    ('4 heures', 4), ('1 heure', 1), ('1h30', 1.5), ('1,5 h', 1.5), ('90 minutes', 1.5), ('2 hours', 2),
+    ('variable', None), ('', None), (None, None),
+])
+def test_parse_duration(text, hours):
+    assert parse_duration(text) == hours
+
+
+def test_parse_weights_and_budget():
+    assert parse_weights('') == (3.0, 2.0, 1.0)
+    assert parse_weights('1,0,0.5') == (1.0, 0.0, 0.5)
+    assert parse_budget('7.5') == 7.5
+    for text in ('1,2', 'a,b,c', '-1,2,3', 'nan,1,1'):
+        with pytest.raises(ValueError):
+            parse_weights(text)
+    for text in ('0', '-3', '1e9', 'abc', None):
+        with pytest.raises(ValueError):
+            parse_budget(text)
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from core import Catalog, MemoryVoteStorage, VotingService
+from core import timeline as timeline_module
+from core.timeline import BUCKETS, VoteTimeline
+
+MODULES = [{'id': f'm{index}', 'title': f'Module {index}', 'duration': '1 heure'} for index in range(6)]
+PARTICIPANTS = [f'p{index}' for index in range(15)]
+CATALOG = Catalog(PARTICIPANTS, MODULES)
+
+
+def series(timeline):
+    return {bucket: timeline.series(bucket, MODULES) for bucket in BUCKETS}
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_timeline_follows_own_and_foreign_writes(seed):
+    rng = random.Random(seed)
+    storage = MemoryVoteStorage()
+    voting = VotingService(CATALOG, storage)
+    # Un autre service sur le même stockage joue les écritures d'un autre processus
+    other = VotingService(CATALOG, storage)
+    for step in range(200):
+        writer = voting if rng.random() < 0.7 else other
+        participant = rng.choice(PARTICIPANTS)
+        if rng.random() < 0.2:
+            writer.reset(participant)
+        else:
+            votes = {module['id']: rng.randint(1, 3) for module in rng.sample(MODULES, rng.randint(1, 4))}
+            writer.submit(participant, votes, f'2025-01-0{rng.randint(1, 3)}T{rng.randint(0, 23):02d}:{step % 60:02d}:00')
+        if step % 17 == 0:
+            assert series(voting.timeline()) == series(VoteTimeline.from_votes(storage.snapshot()[1]))
+
+    assert series(voting.timeline()) == series(VoteTimeline.from_votes(storage.snapshot()[1]))
+
+
+def test_timeline_recounts_only_changed_ballots(monkeypatch):
+    voting = VotingService(CATALOG, MemoryVoteStorage())
+    for participant in PARTICIPANTS:
+        voting.submit(participant, {'m0': 1}, '2025-01-01T10:00:00')
+    voting.timeline()
+
+    parsed = []
+    bucket_starts = timeline_module.bucket_starts
+    monkeypatch.setattr(timeline_module, 'bucket_starts', lambda timestamp: parsed.append(timestamp) or bucket_starts(timestamp))
+    voting.submit('p0', {'m1': 2}, '2025-01-02T10:00:00')
+
+    assert voting.timeline().series('1d', MODULES)['summary']['buckets'] == 2
+    assert parsed == ['2025-01-02T10:00:00']
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from core import Catalog, MemoryVoteStorage, Session, SessionRegistry, VotingService, make_etag
+
+CATALOG = Catalog(['alice', 'bob'], [{'id': 'm1_1', 'title': 'Module 1', 'duration': '1 heure'}])
+
+
+class CountingStorage(MemoryVoteStorage):
+    def __init__(self):
+        super().__init__()
+        self.document_reads = 0
+
+    def get_document(self, name):
+        self.document_reads += 1
+        return super().get_document(name)
+
+
+@pytest.fixture
+def session():
+    return Session('s1', CATALOG, VotingService(CATALOG, CountingStorage()))
+
+
+def test_materialized_results_are_served_from_memory(session):
+    session.voting.submit('alice', {'m1_1': 1})
+    session.materialize()
+    storage = session.voting.storage
+
+    status, body, headers = session.materialized_results(60)
+    assert status == 200
+    assert headers['X-Results-Source'] == 'materialized'
+    assert headers['ETag'] == make_etag(body)
+    assert session.materialized_results(60, headers['ETag'])[0] == 304
+    assert storage.document_reads == 0
+
+
+def test_materialized_document_is_reread_after_its_ttl(session, monkeypatch):
+    session.materialize()
+    monkeypatch.setattr('core.sessions.DOCUMENT_TTL', 0.0)
+    session.materialize()
+
+    session.materialized_results(60)
+    session.materialized_results(60)
+
+    assert session.voting.storage.document_reads == 2
+
+
+def test_missing_or_stale_document_falls_back_to_computed_results(session):
+    assert session.materialized_results(60)[2]['X-Results-Source'] == 'computed'
+
+    session.materialize()
+    assert session.materialized_results(-1)[2]['X-Results-Source'] == 'computed'
+
+
+@pytest.fixture
+def sessions_dir(tmp_path):
+    session_dir = tmp_path / 'cohorte-1'
+    session_dir.mkdir()
+    with open(session_dir / 'participants.json', 'w', encoding='utf-8') as f:
+        json.dump(['carol'], f)
+    with open(session_dir / 'modules.json', 'w', encoding='utf-8') as f:
+        json.dump([{'id': 'm2_1', 'title': 'Module 2', 'duration': '2 heures'}], f)
+    return str(tmp_path)
+
+
+def test_session_folders_are_opened_on_demand(session, sessions_dir):
+    registry = SessionRegistry('memory', session, environ={'SESSIONS_DIR': sessions_dir})
+
+    assert registry.ids() == ['default', 'cohorte-1']
+    assert registry.get('cohorte-1').catalog.participants == ['carol']
+    assert registry.rollup()[0] == 200
+
+
+def test_unsharded_storage_only_serves_the_default_session(session, sessions_dir):
+    registry = SessionRegistry('sql', session, environ={'SESSIONS_DIR': sessions_dir})
+
+    assert registry.ids() == ['default']
+    assert registry.get('cohorte-1') is None
+    assert registry.rollup()[0] == 200
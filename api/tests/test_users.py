@@ -0,0 +1,107 @@
+import os
+import sys
+import types
+
+import pytest
+from flask import Flask
+
+# routes/user.py importe src.models.user : le dossier api y est publié sous le nom src
+if 'src' not in sys.modules:
+    src = types.ModuleType('src')
+    src.__path__ = [os.path.dirname(os.path.dirname(os.path.abspath(__file__)))]
+    sys.modules['src'] = src
+
+from routes.user import user_bp  # noqa: E402
+from src.models.user import User, db  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    app.register_blueprint(user_bp, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+
+def create(client, *names):
+    response = client.post('/api/users/bulk', json=[{'username': name, 'email': f'{name}@example.com'} for name in names])
+    return [user['id'] for user in response.get_json()['created']]
+
+
+def test_bulk_create_reports_invalid_and_conflicting_rows(client):
+    create(client, 'alice')
+
+    response = client.post('/api/users/bulk', json=[
+        {'username': 'bob', 'email': 'bob@example.com'},
+        {'username': 'alice', 'email': 'other@example.com'},
+        {'username': 'carol'},
+        {'username': 'bob', 'email': 'bob2@example.com'},
+        'not an object',
+    ])
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert [user['username'] for user in body['created']] == ['bob']
+    assert body['errors'] == [
+        {'index': 1, 'error': 'username already exists'},
+        {'index': 2, 'error': 'email is required'},
+        {'index': 3, 'error': 'username appears twice in the batch'},
+        {'index': 4, 'error': 'row must be an object'},
+    ]
+    assert User.query.count() == 2
+
+
+def test_bulk_update_applies_the_first_row_of_a_repeated_id(client):
+    alice, bob = create(client, 'alice', 'bob')
+
+    response = client.put('/api/users/bulk', json=[
+        {'id': alice, 'username': 'alice2'},
+        {'id': alice, 'username': 'alice3'},
+        {'id': bob, 'email': 'alice@example.com'},
+        {'id': 999, 'username': 'ghost'},
+        {'id': bob},
+    ])
+
+    body = response.get_json()
+    assert body['updated'] == [alice]
+    assert body['errors'] == [
+        {'index': 1, 'error': 'id appears twice in the batch'},
+        {'index': 2, 'error': 'email already exists'},
+        {'index': 3, 'error': 'user not found'},
+        {'index': 4, 'error': 'nothing to update'},
+    ]
+    assert db.session.get(User, alice).username == 'alice2'
+
+
+def test_bulk_delete_reports_unknown_ids(client):
+    alice, bob = create(client, 'alice', 'bob')
+
+    response = client.delete('/api/users/bulk', json=[alice, 999])
+
+    assert response.get_json() == {'deleted': [alice], 'not_found': [999]}
+    assert [user.id for user in User.query.all()] == [bob]
+
+
+@pytest.mark.parametrize('method', ['post', 'put', 'delete'])
+def test_bulk_rejects_a_body_that_is_not_an_array(client, method):
+    response = getattr(client, method)('/api/users/bulk', json={'username': 'alice'})
+
+    assert response.status_code == 400
+
+
+def test_listing_pages_by_id_cursor(client):
+    ids = create(client, *(f'user{index}' for index in range(5)))
+
+    first = client.get('/api/users?limit=2')
+    assert [user['id'] for user in first.get_json()] == ids[:2]
+    assert f'after={ids[1]}' in first.headers['Link']
+
+    last = client.get(f'/api/users?limit=2&after={ids[3]}')
+    assert [user['id'] for user in last.get_json()] == ids[4:]
+    assert 'Link' not in last.headers
+    assert client.get('/api/users/export').get_json() == client.get('/api/users?limit=10').get_json()